@@ -2,8 +2,21 @@
 import languages.french as French
 import languages.spanish as Spanish
 from collections import OrderedDict
-import sqlite3 as sql3
-import itertools
+import argparse
+import asyncio
+import sys
+import anki_package
+import conjugation_table
+import deck_output
+import exporter
+import irregular
+import paradigm_file
+import profiling
+import reverse_index
+import schema
+import server
+import verb_loader
+import verb_store
 
 def main():
 
@@ -56,13 +69,7 @@ def conjugate_verb(language):
 
 
 def get_tenses(language):
-    with sql3.connect('verb_trainer.db') as con:
-        cur = con.cursor()
-        cur.execute("SELECT tense_name FROM tenses WHERE language_id = "
-                    "(SELECT language_id FROM languages WHERE language_name = ?)",
-                    (language,))
-        rows = cur.fetchall()
-        return list(itertools.chain(*rows))
+    return verb_store.get_store().tense_names(language)
 
 
 def get_language_tools(language):
@@ -133,5 +140,296 @@ def construct_tense_menu(tenses, how_many=None):
     num = [str(i) for i in range(1, how_many+1)]
     return OrderedDict(zip(num, tenses))
 
+
+def split_tenses(value):
+    return [tense.strip() for tense in value.split(',') if tense.strip()]
+
+
+def parse_command(argv):
+    parser = argparse.ArgumentParser(prog='VerbTrainer.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export',
+                                 help='conjugate a verb list into an '
+                                      'Anki cloze import file')
+    export.add_argument('verbs',
+                        help="file with one infinitive per line, "
+                             "'-' for stdin")
+    export.add_argument('--lang', choices=sorted(exporter.LANGUAGES),
+                        required=True)
+    export.add_argument('--tenses', type=split_tenses,
+                        help='comma-separated tenses to export '
+                             '(default: all supported)')
+    export.add_argument('-o', '--output',
+                        help='output file (default: stdout); a path ending '
+                             'in .apkg writes an Anki package')
+    export.add_argument('--deck',
+                        help='deck name for an .apkg output '
+                             '(default: VerbTrainer::LANGUAGE)')
+    export.add_argument('-j', '--workers', type=int, default=1,
+                        help='worker processes, 0 for one per CPU '
+                             '(default: 1); on a single CPU more than one '
+                             'only adds overhead')
+    export.add_argument('--chunk-size', type=int,
+                        default=exporter.DEFAULT_CHUNK_SIZE,
+                        help='infinitives per worker task')
+    export.add_argument('--threads', action='store_true',
+                        help='run the workers as threads in this process '
+                             'rather than as separate processes; with the '
+                             'GIL this is no faster than one worker')
+    export.add_argument('--gzip', action='store_true',
+                        help='gzip-compress the output (implied by an '
+                             'output path ending in .gz)')
+    export.add_argument('--max-notes', type=int,
+                        help='split the output into numbered shards of '
+                             'at most this many notes')
+    export.add_argument('--max-size', type=deck_output.parse_size,
+                        help='split the output into numbered shards of '
+                             'at most this size before compression, '
+                             'e.g. 20M')
+    mode = export.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', action='store_true',
+                      help='only write notes that are new or changed '
+                           'since earlier exports to the same output')
+    mode.add_argument('--reuse', action='store_true',
+                      help='rewrite the whole output, but only conjugate '
+                           'entries whose inputs changed since the last '
+                           'build')
+    export.add_argument('--index',
+                        help='note index for --incremental '
+                             '(default: OUTPUT.index)')
+    export.add_argument('--manifest',
+                        help='build manifest for --reuse '
+                             '(default: OUTPUT.manifest)')
+
+    commands.add_parser('migrate',
+                        help='create the database, or bring it up to the '
+                             'current schema')
+
+    load = commands.add_parser('load-verbs',
+                               help='add or update verbs in the verbs '
+                                    'table from a CSV or TSV verb list')
+    load.add_argument('verbs',
+                      help="CSV or TSV file, one verb per row with the "
+                           "columns {}, '-' for stdin".format(
+                               ', '.join(verb_loader.COLUMNS)))
+    load.add_argument('--lang', choices=sorted(verb_loader.LANGUAGE_NAMES),
+                      required=True)
+    load.add_argument('--batch-size', type=int,
+                      default=verb_loader.BATCH_SIZE,
+                      help='rows per transaction')
+
+    build = commands.add_parser('build-conjugations',
+                                help='fill the conjugations table from '
+                                     'the verbs table')
+    build.add_argument('--full', action='store_true',
+                       help='rebuild every verb, not just changed ones')
+
+    index = commands.add_parser('build-index',
+                                help='build a reverse index from '
+                                     'conjugated forms to infinitives')
+    index.add_argument('verbs', help='file with one infinitive per line')
+    index.add_argument('--lang', choices=sorted(exporter.LANGUAGES),
+                       required=True)
+    index.add_argument('--tenses', type=split_tenses,
+                       help='comma-separated tenses to index '
+                            '(default: all supported)')
+    index.add_argument('-o', '--output', required=True,
+                       help='index file to write')
+    index.add_argument('--update', action='store_true',
+                       help='add to an existing index file')
+
+    paradigms = commands.add_parser('build-paradigms',
+                                    help='write conjugated paradigms to a '
+                                         'memory-mappable paradigm file')
+    paradigms.add_argument('verbs', help="file with one infinitive per line, "
+                                         "'-' for stdin")
+    paradigms.add_argument('--lang', choices=sorted(exporter.LANGUAGES),
+                           required=True)
+    paradigms.add_argument('--tenses', type=split_tenses,
+                           help='comma-separated tenses to include '
+                                '(default: all supported)')
+    paradigms.add_argument('-o', '--output', required=True,
+                           help='paradigm file to write')
+
+    lookup = commands.add_parser('lookup',
+                                 help='analyse conjugated forms using '
+                                      'a reverse index')
+    lookup.add_argument('index', help='index file from build-index')
+    lookup.add_argument('forms', nargs='+')
+    lookup.add_argument('--fold', action='store_true',
+                        help='ignore case and accents')
+
+    serve = commands.add_parser('serve',
+                                help='answer conjugation requests as '
+                                     'JSON over HTTP')
+    serve.add_argument('--host', default=server.DEFAULT_HOST)
+    serve.add_argument('--port', type=int, default=server.DEFAULT_PORT)
+    serve.add_argument('-j', '--workers', type=int,
+                       default=server.DEFAULT_WORKERS,
+                       help='threads running conjugations '
+                            '(default: %(default)s)')
+    args = parser.parse_args(argv)
+    if getattr(args, 'tenses', None):
+        unknown = exporter.unknown_tenses(args.lang, args.tenses)
+        if unknown:
+            parser.error('unknown tenses for --lang {}: {} (choose from {})'
+                         .format(args.lang, ', '.join(unknown),
+                                 ', '.join(exporter.default_tenses(
+                                     args.lang))))
+    if args.command == 'export' and args.reuse and (
+            args.gzip or args.max_notes or args.max_size or
+            args.output and args.output.endswith('.gz')):
+        parser.error('--reuse needs an uncompressed output without shards')
+    if args.command == 'export':
+        package = anki_package.is_package(args.output)
+        if package and (args.incremental or args.reuse or args.gzip or
+                        args.max_notes or args.max_size):
+            parser.error('an .apkg output is always written whole and '
+                         'uncompressed')
+        if args.deck and not package:
+            parser.error('--deck needs an .apkg output')
+    return args
+
+
+def run_command(argv):
+    '''
+    Non-interactive entry point, used when VerbTrainer.py is
+    given command line arguments
+    '''
+    args = parse_command(argv)
+    try:
+        return dispatch_command(args)
+    except irregular.MissingForms as e:
+        print('{}: {}; add them to the irregular_forms table or leave '
+              'the verb out'.format(args.command, e), file=sys.stderr)
+        return 2
+
+
+def dispatch_command(args):
+    '''
+    Runs the command parse_command returned
+    '''
+    if args.command == 'export':
+        options = deck_output.OutputOptions(args.gzip or None, args.max_notes,
+                                            args.max_size)
+        package = anki_package.is_package(args.output)
+        if package:
+            stats, _ = anki_package.export_file(
+                args.verbs, args.lang, args.output, args.tenses, args.deck,
+                report_skipped)
+        elif args.incremental:
+            try:
+                stats, _ = exporter.export_file_incremental(
+                    args.verbs, args.lang, args.tenses, args.output,
+                    args.index, options, report_skipped)
+            except ValueError as e:
+                print('export: {}'.format(e), file=sys.stderr)
+                return 2
+        elif args.reuse:
+            stats, _ = exporter.export_file_manifest(
+                args.verbs, args.lang, args.output, args.tenses,
+                args.manifest, report_skipped)
+        else:
+            written, _ = exporter.export_file(args.verbs, args.lang,
+                                              args.tenses, args.output,
+                                              args.workers or None,
+                                              args.chunk_size, args.threads,
+                                              options, report_skipped)
+        if package:
+            print('{} notes and {} cards written to {}'
+                  .format(*stats, args.output), file=sys.stderr)
+        elif args.incremental:
+            print('{} notes added, {} changed, {} unchanged'.format(*stats),
+                  file=sys.stderr)
+        elif args.reuse:
+            print('{} entries regenerated, {} reused, {} removed'
+                  .format(*stats), file=sys.stderr)
+        else:
+            print('{} notes written'.format(written), file=sys.stderr)
+    elif args.command == 'migrate':
+        path = verb_store.get_store().path
+        applied = schema.migrate(path)
+        if applied:
+            print('{}: applied migrations {}'.format(
+                path, ', '.join(map(str, applied))), file=sys.stderr)
+        else:
+            print('{}: up to date'.format(path), file=sys.stderr)
+    elif args.command == 'load-verbs':
+        try:
+            stats = verb_loader.load_file(args.verbs, args.lang,
+                                          report_rejected, args.batch_size)
+        except ValueError as e:
+            print('load-verbs: {}'.format(e), file=sys.stderr)
+            return 2
+        loaded = stats.inserted + stats.updated + stats.unchanged
+        print('{} verbs added, {} updated, {} unchanged, {} rejected '
+              '({:,.0f} rows/s)'.format(
+                  *stats[:4], loaded / stats.seconds if stats.seconds else 0),
+              file=sys.stderr)
+    elif args.command == 'build-conjugations':
+        stats = conjugation_table.build(args.full)
+        print('{} verbs rebuilt, {} unchanged, {} removed, {} skipped'
+              .format(*stats), file=sys.stderr)
+    elif args.command == 'build-index':
+        build_reverse_index(args)
+    elif args.command == 'build-paradigms':
+        module = exporter.LANGUAGES[args.lang]
+        infile = (sys.stdin if args.verbs == '-'
+                  else open(args.verbs, encoding='utf-8'))
+        try:
+            count = paradigm_file.build_from_verbs(
+                args.output, args.lang,
+                exporter.read_infinitives(infile, module.VERB_TYPES,
+                                          report_skipped),
+                args.tenses)
+        finally:
+            if infile is not sys.stdin:
+                infile.close()
+        print('{} paradigms written'.format(count), file=sys.stderr)
+    elif args.command == 'lookup':
+        index = reverse_index.ReverseIndex.load(args.index)
+        find = index.lookup_folded if args.fold else index.lookup
+        for form in args.forms:
+            for analysis in find(form):
+                print('{}\t{}'.format(form, '\t'.join(analysis)))
+    elif args.command == 'serve':
+        def ready(srv):
+            print('Serving on http://{}:{}/'.format(srv.host, srv.port),
+                  file=sys.stderr)
+        try:
+            asyncio.run(server.serve(args.host, args.port, ready,
+                                     args.workers))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def report_skipped(infinitive):
+    print('Skipped {!r}: not a regular infinitive'.format(infinitive),
+          file=sys.stderr)
+
+
+def report_rejected(rejected):
+    print('Skipped line {} {!r}: {}'.format(*rejected), file=sys.stderr)
+
+
+def build_reverse_index(args):
+    if args.update:
+        index = reverse_index.ReverseIndex.load(args.output)
+    else:
+        index = reverse_index.ReverseIndex()
+    module = exporter.LANGUAGES[args.lang]
+    with open(args.verbs, encoding='utf-8') as f:
+        index.add_verbs(args.lang,
+                        exporter.read_infinitives(f, module.VERB_TYPES),
+                        args.tenses)
+    index.save(args.output)
+    print('{} forms indexed'.format(len(index)), file=sys.stderr)
+
+
 if __name__ == "__main__":
+    profiling.enable_from_environment()
+    if len(sys.argv) > 1:
+        sys.exit(run_command(sys.argv[1:]))
     main()
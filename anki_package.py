@@ -0,0 +1,298 @@
+# Name:    anki_package.py
+# Purpose: write conjugation decks straight to an Anki package (.apkg)
+#
+# An .apkg is a zip holding a SQLite collection (collection.anki2, the
+# schema 11 layout every Anki version imports) and a JSON media map.
+# Each conjugated person becomes one note of a cloze note type with
+# Text, Translation and Audio fields, the same fields as the import
+# text, tagged with its infinitive, and one new card.
+#
+# Notes and cards are inserted with executemany in batches, inside the
+# single transaction of a collection that only exists in a temporary
+# directory until it is complete, so journalling and syncing are off.
+#
+# Note GUIDs, and the note type and deck ids, are derived from what
+# they describe rather than from the clock, so importing a rebuilt
+# package updates the notes of the previous one instead of adding
+# duplicates.
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+from collections import namedtuple
+import exporter
+
+# Notes inserted per executemany call
+BATCH_SIZE = 5000
+
+MODEL_NAME = 'VerbTrainer Cloze'
+FIELDS = ('Text', 'Translation', 'Audio')
+
+PackageStats = namedtuple('PackageStats', 'notes cards')
+
+SUFFIX = '.apkg'
+
+_SCHEMA_VERSION = 11
+# A collection deflates smaller as well as faster at level 1 than at
+# the usual 6
+_COMPRESSLEVEL = 1
+
+_SCHEMA = '''
+CREATE TABLE col (
+    id integer primary key, crt integer not null, mod integer not null,
+    scm integer not null, ver integer not null, dty integer not null,
+    usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null,
+    tags text not null);
+CREATE TABLE notes (
+    id integer primary key, guid text not null, mid integer not null,
+    mod integer not null, usn integer not null, tags text not null,
+    flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null);
+CREATE TABLE cards (
+    id integer primary key, nid integer not null, did integer not null,
+    ord integer not null, mod integer not null, usn integer not null,
+    type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null,
+    lapses integer not null, left integer not null, odue integer not null,
+    odid integer not null, flags integer not null, data text not null);
+CREATE TABLE revlog (
+    id integer primary key, cid integer not null, usn integer not null,
+    ease integer not null, ivl integer not null, lastIvl integer not null,
+    factor integer not null, time integer not null, type integer not null);
+CREATE TABLE graves (
+    usn integer not null, oid integer not null, type integer not null);
+'''
+
+# Built once the rows are in, which is much faster than keeping them up
+# to date row by row
+_INDEXES = (
+    'CREATE INDEX ix_notes_usn ON notes (usn)',
+    'CREATE INDEX ix_cards_usn ON cards (usn)',
+    'CREATE INDEX ix_revlog_usn ON revlog (usn)',
+    'CREATE INDEX ix_cards_nid ON cards (nid)',
+    'CREATE INDEX ix_cards_sched ON cards (did, queue, due)',
+    'CREATE INDEX ix_revlog_cid ON revlog (cid)',
+    'CREATE INDEX ix_notes_csum ON notes (csum)')
+
+_INSERT_NOTE = "INSERT INTO notes VALUES (?, ?, ?, ?, -1, ?, ?, ?, ?, 0, '')"
+_INSERT_CARD = ("INSERT INTO cards VALUES "
+                "(?, ?, ?, 0, ?, -1, 0, 0, ?, 0, 0, 0, 0, 0, 0, 0, 0, '')")
+
+_MODEL_TYPE_CLOZE = 1
+_DEFAULT_DECK_ID = 1
+_DEFAULT_CONF_ID = 1
+
+_CSS = ('.card { font-family: arial; font-size: 20px; text-align: center; '
+        'color: black; background-color: white; }\n'
+        '.cloze { font-weight: bold; color: blue; }')
+
+
+def is_package(path):
+    '''
+    Whether an export to path (None for stdout) writes a package
+    '''
+    return path is not None and path.endswith(SUFFIX)
+
+
+def _stable_id(*parts):
+    '''
+    A positive id below 2**53 (so JSON readers keep it exact) derived
+    from parts
+    '''
+    digest = hashlib.blake2b('\x1f'.join(parts).encode('utf-8'),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'little') >> 11 or 1
+
+
+def note_guid(language, infinitive, tense, person):
+    '''
+    The GUID of the note for one person of a paradigm, the same in
+    every build
+    '''
+    # Anki only needs GUIDs to be unique strings; its own are base91
+    return hashlib.blake2b(
+        '\x1f'.join((language, infinitive, tense, person)).encode('utf-8'),
+        digest_size=8).hexdigest()
+
+
+def _checksum(text):
+    '''
+    Anki's duplicate check: the first 8 hex digits of the SHA-1 of
+    the sort field
+    '''
+    return int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:4],
+                          'big')
+
+
+def _model(model_id, deck_id, now):
+    return {
+        'id': model_id, 'name': MODEL_NAME, 'type': _MODEL_TYPE_CLOZE,
+        'mod': now, 'usn': -1, 'sortf': 0, 'did': deck_id,
+        'tmpls': [{'name': 'Cloze', 'ord': 0,
+                   'qfmt': '{{cloze:Text}}',
+                   'afmt': '{{cloze:Text}}<br>\n{{Translation}}\n{{Audio}}',
+                   'did': None, 'bqfmt': '', 'bafmt': ''}],
+        'flds': [{'name': name, 'ord': i, 'sticky': False, 'rtl': False,
+                  'font': 'Arial', 'size': 20, 'media': []}
+                 for i, name in enumerate(FIELDS)],
+        'css': _CSS,
+        'latexPre': ('\\documentclass[12pt]{article}\n\\special{papersize=3in,'
+                     '5in}\n\\usepackage[utf8]{inputenc}\n\\usepackage'
+                     '{amssymb,amsmath}\n\\pagestyle{empty}\n\\setlength'
+                     '{\\parindent}{0in}\n\\begin{document}\n'),
+        'latexPost': '\\end{document}',
+        'tags': [], 'vers': [], 'req': [[0, 'any', [0]]]}
+
+
+def _deck(deck_id, name, now):
+    return {'id': deck_id, 'name': name, 'mod': now, 'usn': -1,
+            'lrnToday': [0, 0], 'revToday': [0, 0], 'newToday': [0, 0],
+            'timeToday': [0, 0], 'collapsed': False, 'desc': '', 'dyn': 0,
+            'conf': _DEFAULT_CONF_ID, 'extendNew': 10, 'extendRev': 50}
+
+
+def _deck_conf(now):
+    return {'id': _DEFAULT_CONF_ID, 'name': 'Default', 'mod': now,
+            'usn': -1, 'maxTaken': 60, 'autoplay': True, 'timer': 0,
+            'replayq': True, 'dyn': False,
+            'new': {'delays': [1, 10], 'ints': [1, 4, 7], 'initialFactor': 2500,
+                    'order': 1, 'perDay': 20, 'bury': True, 'separate': True},
+            'rev': {'perDay': 100, 'ease4': 1.3, 'fuzz': 0.05,
+                    'maxIvl': 36500, 'bury': True, 'minSpace': 1},
+            'lapse': {'delays': [10], 'mult': 0, 'minInt': 1,
+                      'leechFails': 8, 'leechAction': 0}}
+
+
+def _collection_row(model_id, deck_id, deck_name, now):
+    conf = {'nextPos': 1, 'estTimes': True, 'activeDecks': [deck_id],
+            'sortType': 'noteFld', 'timeLim': 0, 'sortBackwards': False,
+            'addToCur': True, 'curDeck': deck_id, 'newBury': True,
+            'newSpread': 0, 'dueCounts': True, 'curModel': str(model_id),
+            'collapseTime': 1200}
+    decks = {str(_DEFAULT_DECK_ID): _deck(_DEFAULT_DECK_ID, 'Default', now)}
+    decks[str(deck_id)] = _deck(deck_id, deck_name, now)
+    return (1, now, now * 1000, now * 1000, _SCHEMA_VERSION, 0, 0, 0,
+            json.dumps(conf),
+            json.dumps({str(model_id): _model(model_id, deck_id, now)}),
+            json.dumps(decks),
+            json.dumps({str(_DEFAULT_CONF_ID): _deck_conf(now)}),
+            json.dumps({}))
+
+
+def _notes(paradigms, language, module, model_id, now):
+    '''
+    Yields a notes row for every person of every paradigm, with ids
+    counting up from the current time in milliseconds as Anki's do
+    '''
+    guid = note_guid
+    checksum = _checksum
+    note_id = now * 1000
+    for infinitive, tense, conj in paradigms:
+        texts = module.output_cloze(infinitive, tense, conj)
+        tags = ' {} '.format(infinitive.replace(' ', '_'))
+        for person, text in zip(texts._fields, texts):
+            yield (note_id, guid(language, infinitive, tense, person),
+                   model_id, now, tags, text + '\x1f\x1f', text,
+                   checksum(text))
+            note_id += 1
+
+
+def write_package(path, paradigms, language, deck_name,
+                  batch_size=BATCH_SIZE):
+    '''
+    Writes the (infinitive, tense, inflection) paradigms of language,
+    as conjugate_many yields them, to an Anki package at path, in a
+    deck called deck_name.  The package only appears at path once it
+    is complete.  Returns a PackageStats
+    '''
+    module = exporter.LANGUAGES[language]
+    now = int(time.time())
+    model_id = _stable_id('model', MODEL_NAME)
+    deck_id = _stable_id('deck', deck_name)
+    tmp = tempfile.mkdtemp(prefix='apkg_',
+                           dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        collection = os.path.join(tmp, 'collection.anki2')
+        con = sqlite3.connect(collection)
+        try:
+            con.execute('PRAGMA journal_mode = OFF')
+            con.execute('PRAGMA synchronous = OFF')
+            con.executescript(_SCHEMA)
+            notes = cards = 0
+            with con:
+                con.execute('INSERT INTO col VALUES '
+                            '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            _collection_row(model_id, deck_id, deck_name,
+                                            now))
+                rows = _notes(paradigms, language, module, model_id, now)
+                for batch in exporter._chunked(rows, batch_size):
+                    con.executemany(_INSERT_NOTE, batch)
+                    # one card per note, sharing its id, new cards due in
+                    # the order they were exported
+                    con.executemany(_INSERT_CARD, [
+                        (row[0], row[0], deck_id, now, notes + i + 1)
+                        for i, row in enumerate(batch)])
+                    notes += len(batch)
+                    cards += len(batch)
+                for statement in _INDEXES:
+                    con.execute(statement)
+        finally:
+            con.close()
+
+        package = os.path.join(tmp, 'package.apkg')
+        with zipfile.ZipFile(package, 'w', zipfile.ZIP_DEFLATED,
+                             compresslevel=_COMPRESSLEVEL) as z:
+            z.write(collection, 'collection.anki2')
+            z.writestr('media', '{}')
+        os.replace(package, path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return PackageStats(notes, cards)
+
+
+def default_deck_name(language):
+    return 'VerbTrainer::{}'.format(
+        exporter.LANGUAGES[language].__name__.split('.')[-1].capitalize())
+
+
+def export_package(infinitives, language, tenses, path, deck_name=None):
+    '''
+    Conjugates each infinitive in tenses (all supported tenses by
+    default) and writes the results to an Anki package at path.  The
+    deck is named after the language unless deck_name is given
+    '''
+    module = exporter.LANGUAGES[language]
+    if not tenses:
+        tenses = exporter.default_tenses(language)
+    if deck_name is None:
+        deck_name = default_deck_name(language)
+    return write_package(path, module.conjugate_many(infinitives, tenses),
+                         language, deck_name)
+
+
+def export_file(verbs_path, language, path, tenses=None, deck_name=None,
+                skipped=None):
+    '''
+    Conjugates the verb list at verbs_path ('-' for stdin) into an
+    Anki package at path.  Returns (PackageStats, lines skipped);
+    skipped(infinitive) is called for each skipped line
+    '''
+    module = exporter.LANGUAGES[language]
+    skipped = exporter.SkipCount(skipped)
+    infile = (sys.stdin if verbs_path == '-'
+              else open(verbs_path, encoding='utf-8'))
+    try:
+        stats = export_package(
+            exporter.read_infinitives(infile, module.VERB_TYPES, skipped),
+            language, tenses, path, deck_name)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+    return stats, skipped.count
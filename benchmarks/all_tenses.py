@@ -0,0 +1,96 @@
+# Name:    all_tenses.py
+# Purpose: conjugating every French tense of each verb in a list
+#
+# Usage (from the repository root):
+#   python -m benchmarks.all_tenses
+#   python -m benchmarks.all_tenses -n 5000 --repeat 20
+#
+# Compares construct_inflection called once per tense (with the
+# inflection caches off), conjugate_many over every tense and
+# conjugate_all_tenses, against a freshly seeded temporary database.
+# Garbage collection is off while timing, and each figure is the best
+# of repeat runs.
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import inflection_cache
+import languages.french as French
+import verb_store
+from benchmarks.threads import verb_list
+
+
+def _best(function, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(verbs=2000, repeat=10):
+    '''
+    Returns {'verbs', 'tenses', name: seconds} for each way of
+    conjugating verbs in every tense
+    '''
+    infinitives = verb_list('fr', verbs)
+    old_size = inflection_cache.default_size()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'verb_trainer.db')
+        verb_store.create_database(path)
+        verb_store.configure(path, preload=True)
+        inflection_cache.configure(0)
+        try:
+            tenses = verb_store.get_store().tense_names('française')
+            # compiled outside the timing
+            French._RULES.table()
+            ways = {'construct_inflection':
+                    lambda: [French.construct_inflection(infinitive, tense)
+                             for infinitive in infinitives
+                             for tense in tenses],
+                    'conjugate_many':
+                    lambda: list(French.conjugate_many(infinitives, tenses)),
+                    'conjugate_all_tenses':
+                    lambda: [French.conjugate_all_tenses(infinitive)
+                             for infinitive in infinitives]}
+            result = {name: _best(function, repeat)
+                      for name, function in ways.items()}
+        finally:
+            inflection_cache.configure(old_size)
+            verb_store.get_store().close()
+    result.update(verbs=len(infinitives), tenses=len(tenses))
+    return result
+
+
+def report(result, out=sys.stdout):
+    print('{verbs:,} verbs x {tenses} tenses'.format(**result), file=out)
+    baseline = result['construct_inflection']
+    for name in ('construct_inflection', 'conjugate_many',
+                 'conjugate_all_tenses'):
+        seconds = result[name]
+        print('{:<22}{:>8.1f} us/verb  {:+.1%}'
+              .format(name, seconds * 1e6 / result['verbs'],
+                      seconds / baseline - 1), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.all_tenses')
+    parser.add_argument('-n', '--verbs', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+    report(run(args.verbs, args.repeat))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
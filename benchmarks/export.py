@@ -0,0 +1,137 @@
+# Name:    export.py
+# Purpose: throughput and peak memory of the export output targets
+#
+# Usage (from the repository root):
+#   python -m benchmarks.export                      about 1,000,000 notes
+#   python -m benchmarks.export -n 200000 --max-notes 50000
+#
+# Exports a synthetic verb list of about the requested number of notes
+# once per target, each in a fresh process so its peak RSS is its own:
+#
+#   joined   every note joined into one string in memory and written in
+#            one go, as the interactive cloze.txt output does
+#   text     export_file to a plain text file
+#   gzip     export_file through a gzip DeckWriter
+#   shards   the same, split into numbered shards of --max-notes notes
+#   apkg     anki_package.export_file to an Anki package
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import anki_package
+import deck_output
+import exporter
+import inflection_cache
+import verb_store
+from benchmarks.threads import verb_list
+
+TARGETS = ('joined', 'text', 'gzip', 'shards', 'apkg')
+
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _export(target, db, verbs_path, tmp, language, max_notes, results):
+    verb_store.configure(db, preload=True)
+    inflection_cache.configure(0)
+    tenses = exporter.default_tenses(language)
+    base = _peak_rss_kb()
+    start = time.perf_counter()
+    if target == 'joined':
+        module = exporter.LANGUAGES[language]
+        with open(verbs_path, encoding='utf-8') as f:
+            infinitives = list(exporter.read_infinitives(f,
+                                                         module.VERB_TYPES))
+        notes = [note for infinitive, tense, conj
+                 in module.conjugate_many(infinitives, tenses)
+                 for note in module.output_cloze_import(infinitive, tense,
+                                                        [], [], conj)]
+        with open(os.path.join(tmp, 'joined.txt'), 'w',
+                  encoding='utf-8') as f:
+            f.write('\n'.join(notes))
+        written = len(notes)
+    elif target == 'apkg':
+        written = anki_package.export_file(
+            verbs_path, language, os.path.join(tmp, 'apkg.apkg'),
+            tenses)[0].notes
+    else:
+        options = {'text': None,
+                   'gzip': deck_output.OutputOptions(True),
+                   'shards': deck_output.OutputOptions(True, max_notes)}
+        written, _ = exporter.export_file(
+            verbs_path, language, tenses,
+            os.path.join(tmp, target + '.txt'),
+            output_options=options[target])
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(tmp, name))
+               for name in os.listdir(tmp) if name.startswith(target + '.'))
+    results.put((target, written, elapsed, size, base, _peak_rss_kb()))
+
+
+def run(notes=1000000, language='fr', max_notes=100000, targets=TARGETS):
+    '''
+    Returns [(target, notes, seconds, output bytes, baseline RSS kB,
+    peak RSS kB)]
+    '''
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, 'verb_trainer.db')
+        verb_store.create_database(db)
+        verb_store.configure(db, preload=True)
+        try:
+            per_verb = sum(len(exporter.LANGUAGES[language]
+                               .construct_inflection(verb_list(language, 1)[0],
+                                                     tense))
+                           for tense in exporter.default_tenses(language))
+        finally:
+            verb_store.get_store().close()
+        verbs_path = os.path.join(tmp, 'verbs.txt')
+        with open(verbs_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(verb_list(language, -(-notes // per_verb))))
+        context = multiprocessing.get_context('spawn')
+        for target in targets:
+            out = os.path.join(tmp, target)
+            os.mkdir(out)
+            queue = context.Queue()
+            worker = context.Process(target=_export,
+                                     args=(target, db, verbs_path, out,
+                                           language, max_notes, queue))
+            worker.start()
+            results.append(queue.get())
+            worker.join()
+    return results
+
+
+def report(results, out=sys.stdout):
+    print('{:<8} {:>10} {:>12} {:>10} {:>13} {:>13}'.format(
+        'target', 'notes', 'notes/s', 'MB out', 'peak RSS MB',
+        'growth MB'), file=out)
+    for target, notes, elapsed, size, base, peak in results:
+        print('{:<8} {:>10,} {:>12,.0f} {:>10.1f} {:>13.1f} {:>13.1f}'.format(
+            target, notes, notes / elapsed, size / 1e6, peak / 1024,
+            (peak - base) / 1024), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.export')
+    parser.add_argument('-n', '--notes', type=int, default=1000000)
+    parser.add_argument('--max-notes', type=int, default=100000,
+                        help='notes per shard for the shards target')
+    parser.add_argument('--lang', choices=sorted(exporter.LANGUAGES),
+                        default='fr')
+    parser.add_argument('--targets', nargs='+', choices=TARGETS,
+                        default=list(TARGETS))
+    args = parser.parse_args(argv)
+    report(run(args.notes, args.lang, args.max_notes, args.targets))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
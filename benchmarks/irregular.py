@@ -0,0 +1,144 @@
+# Name:    irregular.py
+# Purpose: what the irregular forms overlay costs regular verbs
+#
+# Usage (from the repository root):
+#   python -m benchmarks.irregular                  5,000 overlay entries
+#   python -m benchmarks.irregular --entries 50000
+#
+# Conjugates regular verbs one at a time (construct_inflection, with
+# the inflection caches off) and in batches (conjugate_many), against
+# two freshly migrated temporary databases: one with only the seeded
+# irregular forms and one with entries more.
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import inflection_cache
+import languages.french as French
+import languages.spanish as Spanish
+import verb_store
+
+_LANGUAGES = {'fr': ('française', French, ('er', 'ir', 're'),
+                     ['présent', 'imparfait', 'futur', 'passé composé']),
+              'es': ('español', Spanish, ('ar', 'er', 'ir'),
+                     ['presente', 'pretérito imperfecto', 'futuro simple',
+                      'pretérito perfecto'])}
+
+
+def _verbs(prefix, verb_types, count):
+    return ['{}{}{}'.format(prefix, i, verb_types[i % len(verb_types)])
+            for i in range(count)]
+
+
+def _fill_overlay(path, language_name, verbs, tenses):
+    '''
+    One irregular first person per verb and tense, for verbs none of
+    the timed ones are among
+    '''
+    compound = French._COMPOUND_TENSE if language_name == 'française' \
+        else ()
+    con = sqlite3.connect(path)
+    with con:
+        language_id = con.execute('SELECT language_id FROM languages '
+                                  'WHERE language_name = ?',
+                                  (language_name,)).fetchone()[0]
+        con.executemany('INSERT INTO irregular_forms(language_id, verb, '
+                        'tense_name, person, form) VALUES (?, ?, ?, ?, ?)',
+                        [(language_id, verb, tense, 'fps',
+                          'ai x' if tense in compound else 'x')
+                         for verb in verbs for tense in tenses])
+    con.close()
+
+
+def _time(module, verbs, tenses):
+    '''
+    Conjugations/sec for (construct_inflection, conjugate_many)
+    '''
+    clock = time.perf_counter
+    count = len(verbs) * len(tenses)
+    start = clock()
+    for verb in verbs:
+        for tense in tenses:
+            module.construct_inflection(verb, tense)
+    single = count / (clock() - start)
+    start = clock()
+    for _ in module.conjugate_many(verbs, tenses):
+        pass
+    return single, count / (clock() - start)
+
+
+def run(language='fr', entries=5000, verbs=5000, repeat=10):
+    '''
+    Returns the regular verb throughput without and with entries
+    irregular forms in the overlay.  The two are timed in turn, best
+    of repeat each, so drift in the machine's speed affects both alike
+    '''
+    language_name, module, verb_types, tenses = _LANGUAGES[language]
+    regular = _verbs('reg', verb_types, verbs)
+    irregular = _verbs('irr', verb_types, -(-entries // len(tenses)))
+    old_size = inflection_cache.default_size()
+    best = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for name in ('without', 'with'):
+            paths[name] = os.path.join(tmp, name + '.db')
+            verb_store.create_database(paths[name])
+        _fill_overlay(paths['with'], language_name, irregular, tenses)
+        inflection_cache.configure(0)
+        try:
+            for _ in range(repeat):
+                for name, path in paths.items():
+                    verb_store.configure(path, preload=True)
+                    # compiled outside the timing
+                    overlay = module.irregular_overlay()
+                    module._RULES.table()
+                    rates = _time(module, regular, tenses)
+                    best[name] = [max(pair) for pair in
+                                  zip(best.get(name, rates), rates)]
+        finally:
+            inflection_cache.configure(old_size)
+            verb_store.get_store().close()
+    return {'language': language,
+            'entries': len(overlay),
+            'irregular_verbs': len(overlay.verbs),
+            'conjugations': len(regular) * len(tenses),
+            'single_without': best['without'][0],
+            'single_with': best['with'][0],
+            'batch_without': best['without'][1],
+            'batch_with': best['with'][1]}
+
+
+def report(result, out=sys.stdout):
+    print('{language}: {conjugations:,} regular conjugations, overlay of '
+          '{entries:,} entries ({irregular_verbs:,} verbs)'.format(**result),
+          file=out)
+    for name, label in (('single', 'construct_inflection'),
+                        ('batch', 'conjugate_many')):
+        without = result[name + '_without']
+        with_overlay = result[name + '_with']
+        print('{:<22}{:>12,.0f}/s empty {:>12,.0f}/s loaded  {:+.1%}'
+              .format(label, without, with_overlay,
+                      with_overlay / without - 1), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.irregular')
+    parser.add_argument('--lang', choices=sorted(_LANGUAGES),
+                        help='default: both')
+    parser.add_argument('--entries', type=int, default=5000,
+                        help='irregular (verb, tense) entries to load '
+                             '(default: 5000)')
+    parser.add_argument('--verbs', type=int, default=5000,
+                        help='regular verbs to conjugate (default: 5000)')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+    for language in [args.lang] if args.lang else list(_LANGUAGES):
+        report(run(language, args.entries, args.verbs, args.repeat))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
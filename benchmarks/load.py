@@ -0,0 +1,162 @@
+# Name:    load.py
+# Purpose: load test for the conjugation server
+#
+# Usage (from the repository root):
+#   python -m benchmarks.load                        in-process server
+#   python -m benchmarks.load --url http://127.0.0.1:8765
+#   python -m benchmarks.load --batch 50 -c 32       50 pairs per request
+#
+# Without --url a server is started in this process against a freshly
+# seeded temporary database.  Each of the concurrent clients keeps one
+# connection open and sends its requests back to back.
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+import server
+import verb_store
+
+_VERBS = {'fr': ['parler', 'finir', 'vendre', 'abandonner', 'choisir'],
+          'es': ['hablar', 'vender', 'vivir', 'amar', 'comer']}
+_TENSES = {'fr': ['présent', 'imparfait', 'futur', 'passé composé'],
+           'es': ['presente', 'pretérito imperfecto', 'futuro simple',
+                  'pretérito perfecto']}
+
+
+async def fetch(reader, writer, method, path, payload=None):
+    '''
+    Sends one request over an open keep-alive connection and returns
+    (status, decoded JSON body)
+    '''
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    writer.write('{} {} HTTP/1.1\r\nHost: localhost\r\n'
+                 'Content-Type: application/json\r\n'
+                 'Content-Length: {}\r\n\r\n'
+                 .format(method, path, len(body)).encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def _payloads(language, batch):
+    '''
+    Endless cycle of request bodies over the sample verbs and tenses
+    '''
+    pairs = [(verb, tense) for verb in _VERBS[language]
+             for tense in _TENSES[language]]
+    i = 0
+    while True:
+        if batch:
+            items = [pairs[(i + k) % len(pairs)] for k in range(batch)]
+            yield '/batch', {'lang': language, 'format': 'cloze',
+                             'items': [list(item) for item in items]}
+        else:
+            infinitive, tense = pairs[i % len(pairs)]
+            yield '/conjugate', {'lang': language, 'infinitive': infinitive,
+                                 'tense': tense, 'format': 'cloze'}
+        i += 1
+
+
+async def _client(host, port, payloads, count, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    clock = time.perf_counter
+    try:
+        for _ in range(count):
+            path, payload = next(payloads)
+            start = clock()
+            status, _ = await fetch(reader, writer, 'POST', path, payload)
+            latencies.append(clock() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, requests=2000, concurrency=16, language='fr',
+              batch=0):
+    '''
+    Sends requests spread over concurrency connections and returns
+    requests/sec, conjugations/sec and latency percentiles in ms
+    '''
+    latencies, errors = [], []
+    per_client = max(1, requests // concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _client(host, port, _payloads(language, batch), per_client,
+                latencies, errors)
+        for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {'requests': len(latencies),
+            'errors': len(errors),
+            'seconds': elapsed,
+            'requests_per_sec': len(latencies) / elapsed,
+            'conjugations_per_sec': len(latencies) * (batch or 1) / elapsed,
+            'p50_ms': _percentile(latencies, 50) * 1e3,
+            'p99_ms': _percentile(latencies, 99) * 1e3}
+
+
+def _percentile(ordered, pct):
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run_in_process(args):
+    srv = server.Server(port=0)
+    await srv.start()
+    try:
+        return await run(srv.host, srv.port, args.requests, args.concurrency,
+                         args.lang, args.batch)
+    finally:
+        await srv.close()
+
+
+def report(result, out=sys.stdout):
+    print('{requests:,} requests ({errors} errors) in {seconds:.2f}s\n'
+          '{requests_per_sec:,.0f} requests/sec, '
+          '{conjugations_per_sec:,.0f} conjugations/sec\n'
+          'p50 {p50_ms:.2f} ms, p99 {p99_ms:.2f} ms'.format(**result),
+          file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load')
+    parser.add_argument('--url', help='server to load (default: start one '
+                                      'in-process on a temporary database)')
+    parser.add_argument('-n', '--requests', type=int, default=2000)
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('--lang', choices=sorted(_VERBS), default='fr')
+    parser.add_argument('--batch', type=int, default=0,
+                        help='pairs per /batch request, 0 to use '
+                             '/conjugate (default: 0)')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url = urlsplit(args.url)
+        result = asyncio.run(run(url.hostname, url.port or 80, args.requests,
+                                 args.concurrency, args.lang, args.batch))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'verb_trainer.db')
+            verb_store.create_database(path)
+            verb_store.configure(path, preload=True)
+            result = asyncio.run(_run_in_process(args))
+    report(result)
+    return 1 if result['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# Name:    micro.py
+# Purpose: micro-benchmarks for every conjugator and formatter
+#
+# Usage (from the repository root):
+#   python -m benchmarks.micro                      run and print
+#   python -m benchmarks.micro -o results.json      also save results
+#   python -m benchmarks.micro --save-baseline      store as the baseline
+#   python -m benchmarks.micro --compare            flag regressions
+#
+# The benchmarks run against a freshly migrated verb_trainer database
+# in a temporary directory, with the inflection caches switched off,
+# so they need neither a network nor an existing verb_trainer.db.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import inflection_cache
+import languages.french as French
+import languages.spanish as Spanish
+import verb_store
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'baseline.json')
+
+# A case regresses when its ops/sec falls this far below the baseline
+DEFAULT_THRESHOLD = 0.10
+
+_FRENCH_VERBS = ['parler', 'finir', 'vendre', 'abandonner']
+_SPANISH_VERBS = ['hablar', 'vender', 'vivir', 'amar']
+
+
+def french_cases():
+    for tense in French._STEM_RULES:
+        yield ('french.construct_stem_and_ending', tense,
+               French.construct_stem_and_ending)
+    for tense in list(French._STEM_RULES) + list(French._COMPOUND_TENSE):
+        yield 'french.construct_inflection', tense, French.construct_inflection
+    for tense in ['présent', 'passé composé', 'subjonctif présent']:
+        yield from _formatter_cases('french', French, tense)
+
+
+def spanish_cases():
+    tenses = list(Spanish._STEM_RULES) + ['pretérito perfecto']
+    for tense in tenses:
+        yield ('spanish.construct_stem_and_ending', tense,
+               Spanish.construct_stem_and_ending)
+    for tense in tenses:
+        yield ('spanish.construct_inflection', tense,
+               Spanish.construct_inflection)
+    for tense in ['presente', 'pretérito perfecto']:
+        yield from _formatter_cases('spanish', Spanish, tense)
+
+
+def _formatter_cases(prefix, module, tense):
+    '''
+    The formatters take a finished inflection, so it is computed once
+    outside the timed call
+    '''
+    conjugated = {}
+
+    def conj(infinitive):
+        if infinitive not in conjugated:
+            conjugated[infinitive] = module.construct_inflection(infinitive,
+                                                                 tense)
+        return conjugated[infinitive]
+
+    yield (prefix + '.output_cloze', tense,
+           lambda inf, tense: module.output_cloze(inf, tense, conj(inf)))
+    yield (prefix + '.output_cloze_import', tense,
+           lambda inf, tense: module.output_cloze_import(inf, tense, [], [],
+                                                         conj(inf)))
+    yield (prefix + '.output_normal_view', tense,
+           lambda inf, tense: module.output_normal_view(inf, tense,
+                                                        conj(inf)))
+
+
+def time_case(func, verbs, tense, batch=100, batches=50):
+    '''
+    Calls func(verb, tense) batch * batches times, cycling through
+    verbs.  Returns ops/sec over the whole run and percentiles of the
+    per-call time of each batch, in microseconds
+    '''
+    for verb in verbs:
+        func(verb, tense)
+    calls = [verbs[i % len(verbs)] for i in range(batch)]
+    per_call = []
+    clock = time.perf_counter
+    for _ in range(batches):
+        start = clock()
+        for verb in calls:
+            func(verb, tense)
+        per_call.append((clock() - start) / batch)
+    per_call.sort()
+    total = sum(per_call) * batch
+    return {'ops_per_sec': batch * batches / total,
+            'p50_us': _percentile(per_call, 50) * 1e6,
+            'p90_us': _percentile(per_call, 90) * 1e6,
+            'p99_us': _percentile(per_call, 99) * 1e6}
+
+
+def _percentile(ordered, pct):
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(batch=100, batches=50, preload=False):
+    '''
+    Runs every case against a freshly seeded database and returns
+    the results keyed by 'function[tense]'
+    '''
+    results = {}
+    old_size = inflection_cache.default_size()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'verb_trainer.db')
+        verb_store.create_database(path)
+        verb_store.configure(path, preload)
+        inflection_cache.configure(0)
+        try:
+            # output_normal_view prints for French
+            with contextlib.redirect_stdout(io.StringIO()):
+                for cases, verbs in [(french_cases(), _FRENCH_VERBS),
+                                     (spanish_cases(), _SPANISH_VERBS)]:
+                    for name, tense, func in cases:
+                        key = '{}[{}]'.format(name, tense)
+                        results[key] = time_case(func, verbs, tense,
+                                                 batch, batches)
+        finally:
+            inflection_cache.configure(old_size)
+            verb_store.get_store().close()
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    '''
+    Returns (case, baseline ops/sec, current ops/sec) for every case
+    that got more than threshold slower than the baseline
+    '''
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]['ops_per_sec']
+        after = result['ops_per_sec']
+        if after < before * (1 - threshold):
+            regressions.append((key, before, after))
+    return regressions
+
+
+def report(results, out=sys.stdout):
+    width = max(len(key) for key in results)
+    print('{:<{}} {:>12} {:>9} {:>9} {:>9}'.format(
+        'case', width, 'ops/sec', 'p50 us', 'p90 us', 'p99 us'), file=out)
+    for key, r in results.items():
+        print('{:<{}} {:>12,.0f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+            key, width, r['ops_per_sec'], r['p50_us'], r['p90_us'],
+            r['p99_us']), file=out)
+
+
+def _document(results):
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.micro')
+    parser.add_argument('-o', '--output', help='write results as JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='baseline JSON file (default: %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the baseline')
+    parser.add_argument('--compare', action='store_true',
+                        help='exit with status 1 if any case regressed')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown as a fraction '
+                             '(default: %(default)s)')
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--preload', action='store_true',
+                        help='preload tense_endings into memory')
+    args = parser.parse_args(argv)
+
+    results = run(args.batch, args.batches, args.preload)
+    report(results)
+    document = _document(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for key, before, after in regressions:
+            print('REGRESSION {}: {:,.0f} -> {:,.0f} ops/sec ({:+.0%})'
+                  .format(key, before, after, after / before - 1))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+# Name:    paradigms.py
+# Purpose: lookup latency and per-process memory of a memory-mapped
+#          paradigm file against a dict loaded into every process
+#
+# Usage (from the repository root):
+#   python -m benchmarks.paradigms                  4 processes, 20,000 verbs
+#   python -m benchmarks.paradigms -p 8 -n 50000 --lang es
+#
+# Builds a paradigm file for a synthetic verb list, then starts that
+# many processes at once.  Each one opens the paradigms, either by
+# mapping the file ('mmap') or by unpickling a dict of all of them
+# into its heap ('heap'), times random lookups and reports its memory.
+# RSS counts the shared page-cache pages in every process, PSS divides
+# them between the processes mapping them and is the fairer measure.
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+import exporter
+import inflection_cache
+import paradigm_file
+import verb_store
+from benchmarks.threads import verb_list
+
+MODES = ('mmap', 'heap')
+
+
+def memory():
+    '''
+    (RSS, PSS) of this process in kB, PSS None where the system
+    doesn't report it
+    '''
+    rss = pss = None
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Rss:'):
+                    rss = int(line.split()[1])
+                elif line.startswith('Pss:'):
+                    pss = int(line.split()[1])
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss, pss
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1,
+                             int(fraction * len(sorted_values)))]
+
+
+def _worker(mode, path, keys, lookups, seed, start, results):
+    '''
+    One process: opens the paradigms, waits for the others, then does
+    lookups at random keys
+    '''
+    before = memory()[0]
+    if mode == 'mmap':
+        paradigms = paradigm_file.ParadigmFile(path)
+        lookup = paradigms.lookup
+    else:
+        with open(path, 'rb') as f:
+            paradigms = pickle.load(f)
+        lookup = lambda *key: paradigms.get(key)
+    rng = random.Random(seed)
+    sample = [rng.choice(keys) for _ in range(lookups)]
+    start.wait()
+    latencies = []
+    clock = time.perf_counter
+    for key in sample:
+        t = clock()
+        lookup(*key)
+        latencies.append(clock() - t)
+    # everything the processes have touched is resident by now
+    start.wait()
+    rss, pss = memory()
+    latencies.sort()
+    results.put({'mean_us': 1e6 * sum(latencies) / len(latencies),
+                 'p50_us': 1e6 * _percentile(latencies, 0.50),
+                 'p99_us': 1e6 * _percentile(latencies, 0.99),
+                 'rss_kb': rss, 'pss_kb': pss, 'base_kb': before})
+
+
+def run(language='fr', verbs=20000, processes=4, lookups=20000):
+    '''
+    Returns (paradigm file size, {mode: [per-process results]})
+    '''
+    infinitives = verb_list(language, verbs)
+    results = {}
+    old_size = inflection_cache.default_size()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, 'verb_trainer.db')
+        verb_store.create_database(db)
+        verb_store.configure(db, preload=True)
+        inflection_cache.configure(0)
+        try:
+            tenses = exporter.default_tenses(language)
+            paths = {'mmap': os.path.join(tmp, 'paradigms.vtp'),
+                     'heap': os.path.join(tmp, 'paradigms.pickle')}
+            paradigm_file.build_from_verbs(paths['mmap'], language,
+                                           infinitives, tenses)
+            module = exporter.LANGUAGES[language]
+            with open(paths['heap'], 'wb') as f:
+                pickle.dump({(language, infinitive, tense): inflection
+                             for infinitive, tense, inflection
+                             in module.conjugate_many(infinitives, tenses)},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(paths['mmap'])
+        finally:
+            inflection_cache.configure(old_size)
+            verb_store.get_store().close()
+
+        keys = [(language, infinitive, tense)
+                for infinitive in infinitives for tense in tenses]
+        context = multiprocessing.get_context('spawn')
+        for mode in MODES:
+            start = context.Barrier(processes)
+            queue = context.Queue()
+            workers = [context.Process(target=_worker,
+                                       args=(mode, paths[mode], keys,
+                                             lookups, seed, start, queue))
+                       for seed in range(processes)]
+            for worker in workers:
+                worker.start()
+            results[mode] = [queue.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+    return size, results
+
+
+def report(size, results, out=sys.stdout):
+    print('paradigm file: {:,} kB'.format(size // 1024), file=out)
+    print('{:<6} {:>9} {:>9} {:>9} {:>12} {:>12} {:>12}'.format(
+        'mode', 'mean us', 'p50 us', 'p99 us', 'RSS kB', 'PSS kB',
+        '+RSS kB'), file=out)
+    for mode, rows in results.items():
+        n = len(rows)
+
+        def mean(name):
+            values = [row[name] for row in rows]
+            if None in values:
+                return float('nan')
+            return sum(values) / n
+        print('{:<6} {:>9.2f} {:>9.2f} {:>9.2f} {:>12,.0f} {:>12,.0f} '
+              '{:>12,.0f}'.format(mode, mean('mean_us'), mean('p50_us'),
+                                  mean('p99_us'), mean('rss_kb'),
+                                  mean('pss_kb'),
+                                  mean('rss_kb') - mean('base_kb')),
+              file=out)
+    print('(per-process means over {} processes)'.format(
+        len(next(iter(results.values())))), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.paradigms')
+    parser.add_argument('-n', '--verbs', type=int, default=20000)
+    parser.add_argument('-p', '--processes', type=int, default=4)
+    parser.add_argument('-l', '--lookups', type=int, default=20000,
+                        help='lookups per process')
+    parser.add_argument('--lang', choices=sorted(exporter.LANGUAGES),
+                        default='fr')
+    args = parser.parse_args(argv)
+    report(*run(args.lang, args.verbs, args.processes, args.lookups))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# Name:    parallel.py
+# Purpose: export throughput against number of worker processes
+#
+# Usage (from the repository root):
+#   python -m benchmarks.parallel                   1, 2 and 4 workers
+#   python -m benchmarks.parallel -j 1 2 4 8 -n 60000 --lang es
+#
+# Times export_deck_parallel writing to os.devnull with each worker
+# count, against a freshly seeded temporary database.  Workers only pay
+# for themselves with more than one CPU: on a single CPU the pool is
+# pure overhead (60,000 French verbs x 3 tenses took 3.74 s with one
+# worker and 4.98 s with four), and the report says so.  Figures from
+# a multi-core machine are still to be recorded.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import exporter
+import inflection_cache
+import verb_store
+from benchmarks.threads import verb_list
+
+
+def run(language, worker_counts, verbs=20000, chunk_size=None,
+        threads=False):
+    '''
+    Returns [(workers, notes/sec)]
+    '''
+    chunk_size = chunk_size or exporter.DEFAULT_CHUNK_SIZE
+    results = []
+    old_size = inflection_cache.default_size()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'verb_trainer.db')
+        verb_store.create_database(path)
+        verb_store.configure(path, preload=True)
+        inflection_cache.configure(0)
+        try:
+            infinitives = verb_list(language, verbs)
+            tenses = exporter.default_tenses(language)
+            for workers in worker_counts:
+                with open(os.devnull, 'w', encoding='utf-8') as out:
+                    start = time.perf_counter()
+                    written = exporter.export_deck_parallel(
+                        infinitives, language, tenses, out, workers,
+                        chunk_size, threads)
+                    elapsed = time.perf_counter() - start
+                results.append((workers, written / elapsed))
+        finally:
+            inflection_cache.configure(old_size)
+            verb_store.get_store().close()
+    return results
+
+
+def report(results, out=sys.stdout):
+    print('{} CPUs'.format(os.cpu_count()), file=out)
+    print('{:>8} {:>12} {:>9}'.format('workers', 'notes/s', 'speed-up'),
+          file=out)
+    base = results[0][1]
+    for workers, rate in results:
+        print('{:>8} {:>12,.0f} {:>8.2f}x'.format(workers, rate, rate / base),
+              file=out)
+    if (os.cpu_count() or 1) < 2:
+        print('A single CPU: extra workers only add overhead here, and '
+              'say nothing of multi-core speed-up', file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.parallel')
+    parser.add_argument('-j', '--workers', type=int, nargs='+',
+                        default=[1, 2, 4])
+    parser.add_argument('-n', '--verbs', type=int, default=20000)
+    parser.add_argument('--lang', choices=sorted(exporter.LANGUAGES),
+                        default='fr')
+    parser.add_argument('--chunk-size', type=int,
+                        default=exporter.DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--threads', action='store_true',
+                        help='workers as threads in this process')
+    args = parser.parse_args(argv)
+    report(run(args.lang, args.workers, args.verbs, args.chunk_size,
+               args.threads))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
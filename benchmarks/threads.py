@@ -0,0 +1,139 @@
+# Name:    threads.py
+# Purpose: throughput of the conjugators against number of threads
+#
+# Usage (from the repository root):
+#   python -m benchmarks.threads                    1, 2, 4 and 8 threads
+#   python -m benchmarks.threads -t 1 2 4 8 16 --mode construct
+#
+# Every thread conjugates its own share of a synthetic verb list.  On
+# a GIL build the speed-up stays near 1x.  The report says which kind
+# of build ran it, and that a run on a GIL build or a single CPU can't
+# show scaling.  It has not been run on a free-threaded build
+# (python3.13t) yet, so whether the conjugators scale there is
+# unknown (see the README's plans).
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import exporter
+import inflection_cache
+import verb_store
+
+MODES = ('batch', 'construct')
+
+_STEMS = ['parl', 'aim', 'chant', 'donn', 'travaill', 'regard', 'mang',
+          'fin', 'chois', 'rempl', 'vend', 'répond', 'entend', 'perd']
+
+
+def gil_enabled():
+    '''
+    False only on a free-threaded build running with the GIL off
+    '''
+    check = getattr(sys, '_is_gil_enabled', None)
+    return True if check is None else check()
+
+
+def verb_list(language, count):
+    '''
+    count distinct made-up regular infinitives, so the work isn't
+    just cache hits
+    '''
+    types = exporter.LANGUAGES[language].VERB_TYPES
+    return ['{}{}{}'.format(_STEMS[i % len(_STEMS)], i, types[i % len(types)])
+            for i in range(count)]
+
+
+def _conjugate(language, infinitives, tenses, mode):
+    module = exporter.LANGUAGES[language]
+    count = 0
+    if mode == 'batch':
+        for _ in module.conjugate_many(infinitives, tenses):
+            count += 1
+    else:
+        for infinitive in infinitives:
+            for tense in tenses:
+                module.construct_inflection(infinitive, tense)
+                count += 1
+    return count
+
+
+def time_threads(language, infinitives, tenses, threads, mode='batch'):
+    '''
+    Splits infinitives over threads and returns conjugations/sec
+    '''
+    shares = [infinitives[i::threads] for i in range(threads)]
+    with ThreadPoolExecutor(threads) as pool:
+        # start every thread and open its connection before timing
+        list(pool.map(_conjugate, [language] * threads,
+                      [share[:1] for share in shares], [tenses] * threads,
+                      [mode] * threads))
+        start = time.perf_counter()
+        count = sum(pool.map(_conjugate, [language] * threads, shares,
+                             [tenses] * threads, [mode] * threads))
+        elapsed = time.perf_counter() - start
+    return count / elapsed
+
+
+def run(thread_counts, verbs=4000, mode='batch', preload=True):
+    '''
+    Returns {language: [(threads, conjugations/sec)]}, timed against
+    a freshly seeded database with the inflection caches off
+    '''
+    results = {}
+    old_size = inflection_cache.default_size()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'verb_trainer.db')
+        verb_store.create_database(path)
+        verb_store.configure(path, preload)
+        inflection_cache.configure(0)
+        try:
+            for language in sorted(exporter.LANGUAGES):
+                infinitives = verb_list(language, verbs)
+                tenses = exporter.default_tenses(language)
+                results[language] = [
+                    (threads, time_threads(language, infinitives, tenses,
+                                           threads, mode))
+                    for threads in thread_counts]
+        finally:
+            inflection_cache.configure(old_size)
+            verb_store.get_store().close()
+    return results
+
+
+def report(results, out=sys.stdout):
+    print('Python {} ({}), {} CPUs'.format(
+        sys.version.split()[0],
+        'GIL enabled' if gil_enabled() else 'free-threaded',
+        os.cpu_count()), file=out)
+    print('{:<8} {:>8} {:>16} {:>9}'.format(
+        'language', 'threads', 'conjugations/s', 'speed-up'), file=out)
+    for language, rows in results.items():
+        base = rows[0][1]
+        for threads, rate in rows:
+            print('{:<8} {:>8} {:>16,.0f} {:>8.2f}x'.format(
+                language, threads, rate, rate / base), file=out)
+    if gil_enabled() or (os.cpu_count() or 1) < 2:
+        print('A GIL build or a single CPU: flat speed-up is expected '
+              'here, and says nothing of free-threaded scaling', file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.threads')
+    parser.add_argument('-t', '--threads', type=int, nargs='+',
+                        default=[1, 2, 4, 8])
+    parser.add_argument('-n', '--verbs', type=int, default=4000)
+    parser.add_argument('--mode', choices=MODES, default='batch',
+                        help='conjugate_many per thread, or one '
+                             'construct_inflection call per form')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='read endings from SQLite on every lookup')
+    args = parser.parse_args(argv)
+    report(run(args.threads, args.verbs, args.mode, args.preload))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
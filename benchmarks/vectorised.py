@@ -0,0 +1,93 @@
+# Name:    vectorised.py
+# Purpose: whole-array conjugation backends against the per-verb loop
+#
+# Usage (from the repository root):
+#   python -m benchmarks.vectorised                 200,000 infinitives
+#   python -m benchmarks.vectorised -n 1000000 --lang es
+#
+# For every simple tense, times construct_inflection called once per
+# infinitive against vectorised.conjugate_columns with each
+# available backend, on a synthetic list mixing all verb types.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import exporter
+import inflection_cache
+import vectorised
+import verb_store
+from benchmarks.threads import verb_list
+
+
+def _loop(module, infinitives, tense):
+    construct = module.construct_inflection
+    for infinitive in infinitives:
+        construct(infinitive, tense)
+
+
+def run(language, count, tenses=None):
+    '''
+    Returns {tense: {method: forms/sec}}
+    '''
+    module = exporter.LANGUAGES[language]
+    backends = ['python'] + (['numpy'] if vectorised.numpy_available()
+                             else [])
+    results = {}
+    old_size = inflection_cache.default_size()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'verb_trainer.db')
+        verb_store.create_database(path)
+        verb_store.configure(path, preload=True)
+        inflection_cache.configure(0)
+        try:
+            infinitives = verb_list(language, count)
+            for tense in tenses or vectorised.tenses(language):
+                persons = len(module.construct_stem_and_ending(
+                    infinitives[0], tense))
+                rates = {}
+                start = time.perf_counter()
+                _loop(module, infinitives, tense)
+                rates['loop'] = count * persons / (time.perf_counter() - start)
+                for backend in backends:
+                    start = time.perf_counter()
+                    vectorised.conjugate_columns(language, infinitives, tense,
+                                                 backend)
+                    rates[backend] = count * persons / (time.perf_counter()
+                                                        - start)
+                results[tense] = rates
+        finally:
+            inflection_cache.configure(old_size)
+            verb_store.get_store().close()
+    return results
+
+
+def report(results, out=sys.stdout):
+    methods = list(next(iter(results.values())))
+    width = max(len(tense) for tense in results)
+    print('{:<{}} '.format('forms/sec', width)
+          + ' '.join('{:>12}'.format(m) for m in methods)
+          + ' {:>9}'.format('speed-up'), file=out)
+    for tense, rates in results.items():
+        best = max(rates[m] for m in methods if m != 'loop')
+        print('{:<{}} '.format(tense, width)
+              + ' '.join('{:>12,.0f}'.format(rates[m]) for m in methods)
+              + ' {:>8.1f}x'.format(best / rates['loop']), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.vectorised')
+    parser.add_argument('-n', '--verbs', type=int, default=200000)
+    parser.add_argument('--lang', choices=sorted(exporter.LANGUAGES),
+                        default='fr')
+    args = parser.parse_args(argv)
+    if not vectorised.numpy_available():
+        print('NumPy 2.3 or later not installed: timing the pure-Python '
+              'backend only', file=sys.stderr)
+    report(run(args.lang, args.verbs))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
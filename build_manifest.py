@@ -0,0 +1,158 @@
+# Name:    build_manifest.py
+# Purpose: record what every (language, infinitive, tense) of an export
+#          was generated from, so a rebuild regenerates only what changed
+#
+# The manifest sits next to the output it describes.  For every
+# infinitive it records where its lines start and how long each tense's
+# lines are, and for every verb type the hash of each tense's inputs
+# other than the infinitive: the ending rows and auxiliary table it is
+# built from, conjugation_table.BUILD_VERSION for the stem rules, and
+# the output format.  An entry (language, infinitive, tense) is reused
+# if its verb type's hash for the tense is unchanged, and as those are
+# shared by every infinitive of a verb type the check costs a list
+# comparison per infinitive.  An irregular verb has hashes of its own,
+# which take in its irregular forms as well.
+#
+# The size and modification time of the output are recorded too: if
+# anything else has touched it since, the manifest is ignored and
+# everything is regenerated.
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+import conjugation_table
+import languages.french as French
+import languages.spanish as Spanish
+import verb_store
+
+FORMAT_VERSION = 1
+# Part of every entry's inputs, so changing what is written for an
+# entry invalidates them all
+OUTPUT_FORMAT = 'cloze-import'
+
+ManifestStats = namedtuple('ManifestStats', 'regenerated reused removed')
+
+# Tenses whose stems come from the présent endings
+_FRENCH_FROM_PRESENT = ('imparfait', 'subjonctif présent')
+
+
+def _hash(source):
+    return hashlib.blake2b(source.encode('utf-8'), digest_size=8).hexdigest()
+
+
+# Prefix of the keys of irregular verbs' hashes, which can't be
+# mistaken for a verb type (Spanish ir is both)
+_IRREGULAR_KEY = 'irregular:'
+
+
+class RuleFingerprints:
+    '''
+    Hash of everything other than the infinitive that goes into the
+    output for a key and tense, worked out once per pair.  The key is
+    the verb type, or for an irregular verb one of its own
+    '''
+    def __init__(self, language):
+        self.language = language
+        self._fingerprints = {}
+        self._endings = None
+        module = French if language == 'fr' else Spanish
+        self._overlay = module.irregular_overlay()
+
+    def key(self, infinitive):
+        if infinitive in self._overlay.verbs:
+            return _IRREGULAR_KEY + infinitive
+        return infinitive[-2:]
+
+    def __call__(self, key, tense):
+        fingerprint = self._fingerprints.get((key, tense))
+        if fingerprint is None:
+            if key.startswith(_IRREGULAR_KEY):
+                infinitive = key[len(_IRREGULAR_KEY):]
+                sources = (self(infinitive[-2:], tense),
+                           self._overlay.get((infinitive, tense)))
+            else:
+                sources = self._sources(key, tense)
+            fingerprint = self._fingerprints[key, tense] = _hash(repr((
+                conjugation_table.BUILD_VERSION, OUTPUT_FORMAT, self.language,
+                key, tense, sources)))
+        return fingerprint
+
+    def _sources(self, verb_type, tense):
+        if self.language == 'es':
+            endings = Spanish._ENDINGS.get(verb_type, {}).get(tense)
+            aux = None if endings else Spanish.AUX_VERB['haber']
+            return endings, aux, Spanish._PRONOUNS
+        if tense in French._COMPOUND_TENSE:
+            return French._COMPOUND_TENSE[tense]
+        if self._endings is None:
+            self._endings = verb_store.get_store().endings_table()
+        present = (self._endings.get((verb_type, 'présent'))
+                   if tense in _FRENCH_FROM_PRESENT else None)
+        return self._endings.get((verb_type, tense)), present
+
+
+class BuildManifest:
+    '''
+    What the last build of the output at output_path wrote: the
+    tenses in output order, {key: [hash per tense]} and
+    {infinitive: [offset, [length per tense]]}.  All three are empty
+    if there was no usable last build
+    '''
+    def __init__(self, path, output_path, language):
+        self.path = path
+        self.output_path = output_path
+        self.language = language
+        self.tenses = []
+        self.fingerprints = {}
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if manifest.get('version') != FORMAT_VERSION or \
+                manifest.get('language') != self.language or \
+                manifest.get('output') != _output_stamp(self.output_path):
+            return
+        self.tenses = manifest['tenses']
+        self.fingerprints = manifest['fingerprints']
+        self.entries = manifest['entries']
+
+    def __len__(self):
+        '''
+        The number of (infinitive, tense) entries
+        '''
+        return len(self.tenses) * len(self.entries)
+
+    def save(self, tenses, fingerprints, entries):
+        '''
+        Records a build against the output as it is now, replacing
+        the file atomically
+        '''
+        manifest = {'version': FORMAT_VERSION,
+                    'language': self.language,
+                    'output': _output_stamp(self.output_path),
+                    'tenses': list(tenses),
+                    'fingerprints': fingerprints,
+                    'entries': entries}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            # dumps rather than dump, which encodes in pure Python
+            f.write(json.dumps(manifest, ensure_ascii=False,
+                               separators=(',', ':')))
+        os.replace(tmp, self.path)
+        self.tenses = list(tenses)
+        self.fingerprints = fingerprints
+        self.entries = entries
+
+
+def _output_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
@@ -0,0 +1,207 @@
+# Name:    conjugation_table.py
+# Purpose: materialise the conjugations of the verbs table into the
+#          conjugations table so readers can SELECT instead of
+#          recomputing
+
+import hashlib
+import sqlite3
+from collections import namedtuple
+import languages.french as French
+import languages.spanish as Spanish
+import verb_store
+
+# Bump when a conjugator's rules change in a way the ending tables
+# don't capture, to force every verb to be rebuilt
+BUILD_VERSION = 3
+
+LANGUAGES = {'française': French,
+             'español': Spanish}
+
+_CONJUNCTIONS = ('que', "qu'")
+
+BuildStats = namedtuple('BuildStats', 'rebuilt unchanged removed skipped')
+
+ConjugationRow = namedtuple('ConjugationRow', 'person pronoun form')
+
+_INSERT = ("INSERT INTO conjugations(language_id, verb_id, tense_id, "
+           "person, pronoun, form) VALUES (?, ?, ?, ?, ?, ?)")
+
+_LANGUAGE_ID = 'SELECT language_id FROM languages WHERE language_name = ?'
+
+_TENSE_IDS = ('SELECT tense_name, tense_id FROM tenses '
+              'WHERE language_id = ? ORDER BY tense_id')
+
+_VERBS = 'SELECT verb_id, verb, aux FROM verbs WHERE language_id = ?'
+
+_PREVIOUS_BUILDS = ('SELECT b.verb_id, b.fingerprint '
+                    'FROM conjugation_builds b JOIN verbs v ON b.verb_id = v.verb_id '
+                    'WHERE v.language_id = ?')
+
+# Conjugations of verbs that have been deleted, found through the
+# builds (one row per verb) rather than by going through every
+# conjugation
+_DELETE_REMOVED = ('DELETE FROM conjugations WHERE verb_id IN '
+                   '(SELECT verb_id FROM conjugation_builds '
+                   'WHERE verb_id NOT IN (SELECT verb_id FROM verbs))')
+
+_DELETE_REMOVED_BUILDS = ('DELETE FROM conjugation_builds WHERE verb_id '
+                          'NOT IN (SELECT verb_id FROM verbs)')
+
+_DELETE_VERB = 'DELETE FROM conjugations WHERE verb_id = ?'
+
+_ENDINGS_ROWS = ('SELECT t.tense_name, te.fps, te.sps, te.tps, te.fpp, '
+                 'te.spp, te.tpp FROM tense_endings te JOIN tenses t '
+                 'ON te.tense_id = t.tense_id '
+                 'WHERE te.verb_type = ? AND t.language_id = ? '
+                 'ORDER BY t.tense_name')
+
+_SELECT = ("SELECT person, pronoun, form FROM conjugations "
+           "WHERE verb_id IN (SELECT verb_id FROM verbs "
+           "WHERE language_id = ? AND verb = ?) "
+           "AND tense_id = (SELECT tense_id FROM tenses "
+           "WHERE language_id = ? AND tense_name = ?) "
+           "ORDER BY conjugation_id")
+
+
+def build(full=False):
+    '''
+    Brings the conjugations table up to date with the verbs table of
+    the current store's database, in a single transaction.  Only
+    verbs that are new, have changed, or whose verb type's endings
+    or irregular forms have changed since the last build are
+    regenerated, unless full is set.  Returns a BuildStats
+    '''
+    store = verb_store.get_store()
+    # the conjugators must see the endings as they are now, not as
+    # of the last throttled change check
+    store.reload()
+    con = sqlite3.connect(store.path)
+    try:
+        with con:
+            return _build(con, full)
+    finally:
+        con.close()
+
+
+def _build(con, full):
+    # read through the store's connection, so before this one starts
+    # writing
+    overlays = {module: module.irregular_overlay()
+                for module in LANGUAGES.values()}
+    if full:
+        con.execute('DELETE FROM conjugations')
+        con.execute('DELETE FROM conjugation_builds')
+
+    con.execute(_DELETE_REMOVED)
+    removed = con.execute(_DELETE_REMOVED_BUILDS).rowcount
+
+    rebuilt = unchanged = skipped = 0
+    for language_name, module in LANGUAGES.items():
+        row = con.execute(_LANGUAGE_ID, (language_name,)).fetchone()
+        if row is None:
+            continue
+        language_id = row[0]
+        tense_ids = con.execute(_TENSE_IDS, (language_id,)).fetchall()
+        if not tense_ids:
+            continue
+        endings = _endings_fingerprints(con, module, language_id)
+        overlay = overlays[module]
+        previous = dict(con.execute(_PREVIOUS_BUILDS, (language_id,)))
+
+        stale = []
+        for verb_id, verb, aux in con.execute(_VERBS, (language_id,)):
+            if verb[-2:] not in module.VERB_TYPES:
+                skipped += 1
+                continue
+            fingerprint = _fingerprint(verb, aux, endings[verb[-2:]]
+                                       + overlay.fingerprint(verb))
+            if previous.get(verb_id) == fingerprint:
+                unchanged += 1
+            else:
+                stale.append((verb_id, verb, fingerprint))
+
+        con.executemany(_DELETE_VERB,
+                        [(verb_id,) for verb_id, _, _ in stale])
+        con.executemany(_INSERT, _rows(module, language_id, tense_ids, stale,
+                                       overlay))
+        con.executemany('INSERT OR REPLACE INTO conjugation_builds '
+                        'VALUES (?, ?)',
+                        [(verb_id, fp) for verb_id, _, fp in stale])
+        rebuilt += len(stale)
+
+    return BuildStats(rebuilt, unchanged, removed, skipped)
+
+
+def _rows(module, language_id, tense_ids, stale, overlay):
+    '''
+    Yields one conjugations row per person for every stale verb.  A
+    verb with irregular forms only gets rows for the tenses it has
+    forms for, rather than regular ones guessed for the others
+    '''
+    tense_names = [name for name, _ in tense_ids]
+    results = module.conjugate_many([verb for _, verb, _ in stale
+                                     if verb not in overlay.verbs],
+                                    tense_names, overlay=overlay)
+    for verb_id, verb, _ in stale:
+        for tense_name, tense_id in tense_ids:
+            if verb in overlay.verbs:
+                inflection = overlay.get((verb, tense_name))
+                if inflection is None:
+                    continue
+            else:
+                _, _, inflection = next(results)
+            for person, parts in zip(inflection._fields, inflection):
+                pronoun, form = split_parts(parts)
+                yield language_id, verb_id, tense_id, person, pronoun, form
+
+
+def split_parts(parts):
+    '''
+    Splits one person of an inflection into its pronoun (including
+    any subjunctive conjunction) and its verb form
+    '''
+    count = 2 if parts[0] in _CONJUNCTIONS else 1
+    pronoun = parts[0]
+    if count == 2:
+        separator = '' if pronoun.endswith("'") else ' '
+        pronoun = pronoun + separator + parts[1]
+    return pronoun, ' '.join(parts[count:])
+
+
+def _endings_fingerprints(con, module, language_id):
+    '''
+    Hashes whatever determines the endings of each verb type, so a
+    change to one verb type's endings rebuilds only those verbs
+    '''
+    fingerprints = {}
+    for verb_type in module.VERB_TYPES:
+        if module is French:
+            rows = con.execute(_ENDINGS_ROWS,
+                               (verb_type, language_id)).fetchall()
+            source = repr((rows, sorted(module._COMPOUND_TENSE.items())))
+        else:
+            source = repr((sorted(module._ENDINGS[verb_type].items()),
+                           sorted(module.AUX_VERB.items())))
+        fingerprints[verb_type] = _hash(source)
+    return fingerprints
+
+
+def _fingerprint(verb, aux, endings):
+    return _hash('{}|{}|{}|{}'.format(BUILD_VERSION, verb, aux, endings))
+
+
+def _hash(source):
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def fetch(language_name, infinitive, tense):
+    '''
+    Reads one materialised conjugation back as a list of
+    ConjugationRow, empty if it hasn't been built
+    '''
+    con = verb_store.get_store().connection
+    row = con.execute(_LANGUAGE_ID, (language_name,)).fetchone()
+    if row is None:
+        return []
+    rows = con.execute(_SELECT, (row[0], infinitive, row[0], tense))
+    return [ConjugationRow._make(row) for row in rows]
@@ -0,0 +1,232 @@
+# Name:    deck_output.py
+# Purpose: export targets that buffer, gzip-compress and split decks
+#          into numbered shards
+#
+# A DeckWriter is written to like a text file.  It collects text into
+# large blocks before handing them to the file (or to gzip, which
+# compresses much better and faster a block at a time), and with a
+# note or size limit starts a new shard whenever the next note would
+# take the current one past it.  Notes are never split across shards.
+# Sizes are counted in uncompressed UTF-8 bytes, since that is what
+# Anki reads once a shard is unpacked.
+#
+# Shards are named after the output path with a three-digit number
+# before the extension: deck.txt.gz -> deck.001.txt.gz, deck.002.txt.gz.
+# Closing a writer removes the shards an earlier, longer export left.
+
+import gzip
+import os
+from collections import namedtuple
+
+# Characters collected before each write to the file
+DEFAULT_BUFFER_SIZE = 1 << 20
+# Speed matters more than the last few percent of size for decks
+DEFAULT_COMPRESSLEVEL = 3
+
+OutputStats = namedtuple('OutputStats', 'paths notes bytes')
+
+# How an export is written: compress None means by the path's suffix
+OutputOptions = namedtuple('OutputOptions', 'compress max_notes max_bytes')
+OutputOptions.__new__.__defaults__ = (None, None, None)
+
+_GZIP_SUFFIX = '.gz'
+
+
+def shard_path(path, number):
+    '''
+    The path of shard number (from 1) of the output at path
+    '''
+    compressed = path.endswith(_GZIP_SUFFIX)
+    if compressed:
+        path = path[:-len(_GZIP_SUFFIX)]
+    root, ext = os.path.splitext(path)
+    return '{}.{:03d}{}{}'.format(root, number, ext,
+                                  _GZIP_SUFFIX if compressed else '')
+
+
+def existing_paths(path):
+    '''
+    The files an earlier export to path left behind: path itself and
+    its numbered shards, with or without the .gz suffix
+    '''
+    bases = [path] if path.endswith(_GZIP_SUFFIX) else [path,
+                                                       path + _GZIP_SUFFIX]
+    paths = []
+    for base in bases:
+        if os.path.exists(base):
+            paths.append(base)
+        number = 1
+        while os.path.exists(shard_path(base, number)):
+            paths.append(shard_path(base, number))
+            number += 1
+    return paths
+
+
+def holds_notes(path):
+    '''
+    Whether the output file at path, gzip-compressed if it ends in
+    .gz, has anything in it
+    '''
+    if path.endswith(_GZIP_SUFFIX):
+        with gzip.open(path, 'rb') as f:
+            return bool(f.read(1))
+    return os.path.getsize(path) > 0
+
+
+def parse_size(text):
+    '''
+    '500000', '64K', '10M' or '1G' as a number of bytes
+    '''
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def wants_writer(path, options=None):
+    '''
+    Whether writing to path with options needs a DeckWriter rather
+    than a plain text file
+    '''
+    return path.endswith(_GZIP_SUFFIX) or (
+        options is not None and (options.compress or options.max_notes
+                                 or options.max_bytes))
+
+
+class DeckWriter:
+    '''
+    Writes notes to path, gzip-compressed if compress is set (by
+    default, if path ends in .gz), starting a new shard every
+    max_notes notes or max_bytes bytes if either is given.  Text is
+    passed to write() as it would be to a file, one or more whole
+    lines at a time or in pieces
+    '''
+    def __init__(self, path, compress=None, max_notes=None, max_bytes=None,
+                 buffer_size=DEFAULT_BUFFER_SIZE,
+                 compresslevel=DEFAULT_COMPRESSLEVEL):
+        if compress is None:
+            compress = path.endswith(_GZIP_SUFFIX)
+        elif compress and not path.endswith(_GZIP_SUFFIX):
+            path += _GZIP_SUFFIX
+        if max_notes is not None and max_notes < 1 or \
+                max_bytes is not None and max_bytes < 1:
+            raise ValueError('shard limits must be positive')
+        self.path = path
+        self.compress = compress
+        self.compresslevel = compresslevel
+        self.max_notes = max_notes
+        self.max_bytes = max_bytes
+        self.buffer_size = buffer_size
+        self.paths = []
+        self.notes = 0
+        self.bytes = 0
+        self._file = None
+        self._buffer = []
+        self._buffered = 0
+        # the unfinished last line of what has been written so far
+        self._partial = ''
+        self._open_line = False
+        # notes and bytes in the current shard
+        self._shard_notes = 0
+        self._shard_bytes = 0
+        self._rotating = max_notes is not None or max_bytes is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, text):
+        if not self._rotating:
+            if text:
+                self._add(text)
+                self.notes += text.count('\n')
+                self._open_line = not text.endswith('\n')
+            return
+        if self._partial:
+            text = self._partial + text
+        lines = text.split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._add_note(line + '\n')
+
+    def _add_note(self, note):
+        size = len(note.encode('utf-8')) if self.max_bytes else 0
+        if self._shard_notes and (
+                self.max_notes and self._shard_notes >= self.max_notes or
+                self.max_bytes and self._shard_bytes + size > self.max_bytes):
+            self._next_shard()
+        self._add(note)
+        self._shard_notes += 1
+        self._shard_bytes += size
+        self.notes += 1
+
+    def _add(self, text):
+        if self._file is None:
+            self._open()
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self._flush()
+
+    def _open(self):
+        number = len(self.paths) + 1
+        path = shard_path(self.path, number) if self._rotating else self.path
+        if self.compress:
+            self._file = gzip.open(path, 'wb',
+                                   compresslevel=self.compresslevel)
+        else:
+            self._file = open(path, 'wb')
+        self.paths.append(path)
+        self._shard_notes = self._shard_bytes = 0
+
+    def _flush(self):
+        if self._buffer:
+            data = ''.join(self._buffer).encode('utf-8')
+            self._file.write(data)
+            self.bytes += len(data)
+            self._buffer = []
+            self._buffered = 0
+
+    def _next_shard(self):
+        self._flush()
+        self._file.close()
+        self._file = None
+
+    def flush(self):
+        if self._file is not None:
+            self._flush()
+            self._file.flush()
+
+    def close(self):
+        '''
+        Writes out what is buffered, including an unterminated last
+        line, and closes the current shard.  Shards of path an earlier
+        export left beyond the last one written are removed, so they
+        aren't imported along with this export's
+        '''
+        if self._partial:
+            partial, self._partial = self._partial, ''
+            self._add_note(partial)
+        elif self._open_line:
+            self.notes += 1
+            self._open_line = False
+        if self._file is None and not self.paths:
+            # an empty export still leaves an (empty) output file
+            self._open()
+        if self._file is not None:
+            self._flush()
+            self._file.close()
+            self._file = None
+        self._remove_stale_shards()
+
+    def _remove_stale_shards(self):
+        number = len(self.paths) + 1 if self._rotating else 1
+        while os.path.exists(shard_path(self.path, number)):
+            os.remove(shard_path(self.path, number))
+            number += 1
+
+    def stats(self):
+        return OutputStats(list(self.paths), self.notes, self.bytes)
@@ -0,0 +1,417 @@
+# Name:    exporter.py
+# Purpose: headless bulk export of verb lists to Anki's import format
+
+import io
+import itertools
+import os
+import sys
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import build_manifest
+import deck_output
+import languages.french as French
+import languages.spanish as Spanish
+import note_index
+import verb_store
+
+LANGUAGES = {'fr': French,
+             'es': Spanish}
+
+# Number of infinitives handed to a worker process at a time
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def default_tenses(language):
+    '''
+    Every tense the conjugator for a language currently supports
+    '''
+    if language == 'fr':
+        return verb_store.get_store().tense_names('française')
+    return list(Spanish._STEM_RULES) + ['pretérito perfecto']
+
+
+def unknown_tenses(language, tenses):
+    '''
+    The tenses the conjugator for a language doesn't support
+    '''
+    supported = set(default_tenses(language))
+    return [tense for tense in tenses if tense not in supported]
+
+
+def read_infinitives(lines, verb_types, skipped=None):
+    '''
+    Yields one infinitive per non-blank line.  Lines that don't end
+    in one of verb_types are passed over and, if given, handed to
+    skipped(infinitive) as they are read
+    '''
+    for line in lines:
+        infinitive = line.strip()
+        if not infinitive or infinitive.startswith('#'):
+            continue
+        if infinitive[-2:] in verb_types:
+            yield infinitive
+        elif skipped is not None:
+            skipped(infinitive)
+
+
+class SkipCount:
+    '''
+    A skipped callback for read_infinitives (or rejected callback for
+    verb_loader.read_rows) that counts the lines passed over, and
+    hands each on to report if given, rather than keeping them: a
+    verb list can be any size
+    '''
+    def __init__(self, report=None):
+        self.count = 0
+        self._report = report
+
+    def __call__(self, infinitive):
+        self.count += 1
+        if self._report is not None:
+            self._report(infinitive)
+
+
+def export_deck(infinitives, language, tenses, out):
+    '''
+    Conjugates each infinitive in each tense and writes the
+    output_cloze_import lines to out as it goes, so only one
+    conjugation is held in memory at a time.  Returns the number
+    of notes written
+    '''
+    module = LANGUAGES[language]
+    written = 0
+    for infinitive, tense, conj in module.conjugate_many(infinitives,
+                                                        tenses):
+        notes = module.output_cloze_import(infinitive, tense, [], [], conj)
+        out.write('\n'.join(notes))
+        out.write('\n')
+        written += len(notes)
+    return written
+
+
+def export_deck_incremental(infinitives, language, tenses, out, index):
+    '''
+    Same as export_deck, but only writes the notes that index has no
+    record of, or records with different content.  Returns
+    note_index.ExportStats; call index.save() once the output is safe
+    '''
+    module = LANGUAGES[language]
+    key, digest = note_index.note_key, note_index.note_digest
+    added = changed = skipped = 0
+    for infinitive, tense, conj in module.conjugate_many(infinitives,
+                                                        tenses):
+        notes = module.output_cloze_import(infinitive, tense, [], [], conj)
+        for person, note in zip(notes._fields, notes):
+            state = index.check(key(infinitive, tense, person), digest(note))
+            if state is None:
+                skipped += 1
+                continue
+            out.write(note)
+            out.write('\n')
+            if state == note_index.ADDED:
+                added += 1
+            else:
+                changed += 1
+    return note_index.ExportStats(added, changed, skipped)
+
+
+def export_deck_parallel(infinitives, language, tenses, out,
+                         workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                         threads=False):
+    '''
+    Same output as export_deck, but chunks of chunk_size infinitives
+    are conjugated and formatted in a pool of worker processes, or of
+    threads in this process if threads is set.  Chunks are written
+    back in submission order, so the result is byte-identical to a
+    serial run, and only a couple of chunks per worker are in flight
+    at once so memory stays bounded
+    '''
+    tenses = list(tenses)
+    workers = workers or os.cpu_count() or 1
+    if threads:
+        pool = ThreadPoolExecutor(workers)
+    else:
+        db_path = os.path.abspath(verb_store.get_store().path)
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(db_path,))
+    written = 0
+    with pool:
+        max_pending = workers * 2
+        pending = deque()
+        for chunk in _chunked(infinitives, chunk_size):
+            pending.append(pool.submit(_export_chunk, chunk,
+                                       language, tenses))
+            if len(pending) >= max_pending:
+                written += _write_chunk(pending.popleft(), out)
+        while pending:
+            written += _write_chunk(pending.popleft(), out)
+    return written
+
+
+def _init_worker(db_path):
+    '''
+    Gives each worker process its own connection to the parent's
+    database, with the endings preloaded once per process
+    '''
+    verb_store.configure(db_path, preload=True)
+
+
+def _export_chunk(infinitives, language, tenses):
+    buf = io.StringIO()
+    written = export_deck(infinitives, language, tenses, buf)
+    return buf.getvalue(), written
+
+
+def _write_chunk(future, out):
+    text, written = future.result()
+    out.write(text)
+    return written
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def _open_files(verbs_path, output_path, output_options=None):
+    '''
+    The verb list at verbs_path ('-' for stdin) and output_path opened
+    for writing (stdout when None), through a deck_output.DeckWriter
+    if the path or output_options ask for compression or shards
+    '''
+    infile = (sys.stdin if verbs_path == '-'
+              else open(verbs_path, encoding='utf-8'))
+    try:
+        if output_path is None:
+            outfile = sys.stdout
+        elif deck_output.wants_writer(output_path, output_options):
+            outfile = deck_output.DeckWriter(
+                output_path, *(output_options or ()))
+        else:
+            outfile = open(output_path, 'w', encoding='utf-8')
+        try:
+            yield infile, outfile
+        finally:
+            if outfile is not sys.stdout:
+                outfile.close()
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+
+
+def export_file(verbs_path, language, tenses=None, output_path=None,
+                workers=1, chunk_size=DEFAULT_CHUNK_SIZE, threads=False,
+                output_options=None, skipped=None):
+    '''
+    Streams the verb list at verbs_path ('-' for stdin) to
+    output_path (stdout when None), compressed and split into shards
+    as deck_output.OutputOptions output_options say.  With more than
+    one worker the conjugation is spread over a process pool, or a
+    thread pool if threads is set.  Returns (notes written, lines
+    skipped); skipped(infinitive) is called for each skipped line
+    '''
+    module = LANGUAGES[language]
+    if not tenses:
+        tenses = default_tenses(language)
+    skipped = SkipCount(skipped)
+    with _open_files(verbs_path, output_path,
+                     output_options) as (infile, outfile):
+        infinitives = read_infinitives(infile, module.VERB_TYPES, skipped)
+        if workers == 1:
+            written = export_deck(infinitives, language, tenses, outfile)
+        else:
+            written = export_deck_parallel(infinitives, language, tenses,
+                                           outfile, workers, chunk_size,
+                                           threads)
+    return written, skipped.count
+
+
+def export_file_incremental(verbs_path, language, tenses=None,
+                            output_path=None, index_path=None,
+                            output_options=None, skipped=None):
+    '''
+    Like export_file, but output_path only receives the notes that
+    aren't already recorded in the index at index_path (by default
+    output_path + '.index').  Raises ValueError rather than overwrite
+    an output (or shard of one) that still holds the notes of an
+    earlier run, which the index already counts as exported: it has
+    to be imported and removed first.  Returns
+    (note_index.ExportStats, lines skipped)
+    '''
+    if index_path is None:
+        if output_path is None:
+            raise ValueError('an incremental export to stdout needs '
+                             'an index path')
+        index_path = output_path + '.index'
+    if output_path is not None:
+        for path in deck_output.existing_paths(output_path):
+            if deck_output.holds_notes(path):
+                raise ValueError('{} still holds notes from an earlier '
+                                 'incremental export; import it into Anki '
+                                 'and remove it first'.format(path))
+    module = LANGUAGES[language]
+    if not tenses:
+        tenses = default_tenses(language)
+    skipped = SkipCount(skipped)
+    index = note_index.NoteIndex(index_path)
+    with _open_files(verbs_path, output_path,
+                     output_options) as (infile, outfile):
+        infinitives = read_infinitives(infile, module.VERB_TYPES, skipped)
+        stats = export_deck_incremental(infinitives, language, tenses,
+                                        outfile, index)
+    index.save()
+    return stats, skipped.count
+
+
+def export_file_manifest(verbs_path, language, output_path, tenses=None,
+                         manifest_path=None, skipped=None):
+    '''
+    Like export_file, but keeps a build manifest (by default
+    output_path + '.manifest') and only conjugates the entries whose
+    inputs changed since the last build, copying the rest from the
+    previous output.  Returns (build_manifest.ManifestStats, lines
+    skipped)
+    '''
+    if output_path is None:
+        raise ValueError('a build with a manifest needs an output file')
+    if deck_output.wants_writer(output_path):
+        raise ValueError('a build with a manifest needs an uncompressed '
+                         'output file')
+    if manifest_path is None:
+        manifest_path = output_path + '.manifest'
+    module = LANGUAGES[language]
+    if not tenses:
+        tenses = default_tenses(language)
+    skipped = SkipCount(skipped)
+    infile = (sys.stdin if verbs_path == '-'
+              else open(verbs_path, encoding='utf-8'))
+    try:
+        infinitives = list(read_infinitives(infile, module.VERB_TYPES,
+                                            skipped))
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+
+    # the fingerprints must see the endings as they are now, not as
+    # of the last throttled change check
+    verb_store.get_store().reload()
+    manifest = build_manifest.BuildManifest(manifest_path, output_path,
+                                            language)
+    fingerprints = build_manifest.RuleFingerprints(language)
+    same_tenses = manifest.tenses == list(tenses)
+    old_index = {tense: i for i, tense in enumerate(manifest.tenses)}
+    digests_by_key = {}
+    # (infinitive, old entry if reused whole, else [(offset, length)
+    # or None per tense])
+    plan = []
+    stale = {}
+    for infinitive in infinitives:
+        key = fingerprints.key(infinitive)
+        digests = digests_by_key.get(key)
+        if digests is None:
+            digests = digests_by_key[key] = [
+                fingerprints(key, tense) for tense in tenses]
+        old = manifest.entries.get(infinitive)
+        old_digests = manifest.fingerprints.get(key)
+        if old is not None and same_tenses and old_digests == digests:
+            plan.append((infinitive, old, None))
+            continue
+        sources = []
+        if old is not None and old_digests is not None:
+            offset, lengths = old
+            starts = list(itertools.accumulate(lengths, initial=offset))
+        for tense, digest in zip(tenses, digests):
+            i = old_index.get(tense)
+            if old is not None and old_digests is not None and \
+                    i is not None and old_digests[i] == digest:
+                sources.append((starts[i], lengths[i]))
+            else:
+                sources.append(None)
+                stale.setdefault(tense, []).append(infinitive)
+        plan.append((infinitive, None, sources))
+
+    generated = {}
+    for tense, stale_infinitives in stale.items():
+        for infinitive, tense, conj in module.conjugate_many(
+                stale_infinitives, [tense]):
+            lines = module.output_cloze_import(infinitive, tense, [], [], conj)
+            generated[infinitive, tense] = ''.join(
+                line + '\n' for line in lines).encode('utf-8')
+
+    entries = {}
+    offset = 0
+    tmp = output_path + '.tmp'
+    old_file = open(output_path, 'rb') if manifest.entries else None
+    try:
+        with open(tmp, 'wb') as out:
+            # reused lines that were next to each other in the old
+            # output are copied as one block
+            copy = _BlockCopier(old_file, out)
+            for infinitive, old, sources in plan:
+                if old is not None:
+                    lengths = old[1]
+                    copy(old[0], sum(lengths))
+                else:
+                    lengths = []
+                    for tense, source in zip(tenses, sources):
+                        if source is None:
+                            data = generated[infinitive, tense]
+                            copy.write(data)
+                            lengths.append(len(data))
+                        else:
+                            copy(*source)
+                            lengths.append(source[1])
+                entries[infinitive] = [offset, lengths]
+                offset += sum(lengths)
+            copy.flush()
+    finally:
+        if old_file is not None:
+            old_file.close()
+    os.replace(tmp, output_path)
+
+    regenerated = sum(len(group) for group in stale.values())
+    reused = len(plan) * len(tenses) - regenerated
+    kept = sum(1 for infinitive in entries
+               if infinitive in manifest.entries)
+    removed = len(manifest) - kept * len(set(tenses) & set(manifest.tenses))
+    manifest.save(tenses, digests_by_key, entries)
+    return (build_manifest.ManifestStats(regenerated, reused, removed),
+            skipped.count)
+
+
+class _BlockCopier:
+    '''
+    Copies byte ranges of src to dst, merging adjacent ranges into one
+    read
+    '''
+    def __init__(self, src, dst, block=1 << 20):
+        self.src = src
+        self.dst = dst
+        self.block = block
+        self._start = self._end = 0
+
+    def __call__(self, start, length):
+        if start != self._end:
+            self.flush()
+            self._start = start
+        self._end = start + length
+
+    def write(self, data):
+        self.flush()
+        self.dst.write(data)
+
+    def flush(self):
+        start, end = self._start, self._end
+        if end > start:
+            self.src.seek(start)
+            while start < end:
+                data = self.src.read(min(self.block, end - start))
+                self.dst.write(data)
+                start += len(data)
+        self._start = self._end
@@ -0,0 +1,175 @@
+# Name:    inflection_cache.py
+# Purpose: bounded LRU memoization for the conjugators
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+# Environment variable holding the default number of entries per
+# cache; '0' turns caching off
+CACHE_SIZE_ENV = 'VERB_TRAINER_CACHE_SIZE'
+DEFAULT_CACHE_SIZE = 4096
+
+CacheStats = namedtuple('CacheStats',
+                        'hits misses evictions invalidations size maxsize')
+
+# Every cache created by memoize, by name, so they can be inspected,
+# resized or cleared together
+_CACHES = OrderedDict()
+
+
+def default_size():
+    return int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE))
+
+
+# Default for LRUCache.put's version
+_ANY = object()
+
+
+class LRUCache:
+    '''
+    Size-bounded mapping that evicts the least recently used entry
+    and counts hits, misses, evictions and invalidations.  Safe to
+    share between threads: every operation holds the cache's lock
+    '''
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.version = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=_ANY):
+        '''
+        Stores value unless version is given and the cache has moved
+        on to a different one while it was being computed
+        '''
+        with self._lock:
+            if version is not _ANY and version != self.version:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict(self.maxsize)
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict(maxsize)
+
+    def _evict(self, maxsize):
+        while len(self._data) > maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        '''
+        Drops every entry, e.g. because the data it was computed
+        from has changed
+        '''
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        if self._data:
+            self.invalidations += 1
+        self._data.clear()
+
+    def validate(self, version):
+        '''
+        Clears the cache if version differs from the one its entries
+        were computed under
+        '''
+        with self._lock:
+            if version != self.version:
+                self._clear()
+                self.version = version
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+            self.evictions = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions,
+                              self.invalidations, len(self._data),
+                              self.maxsize)
+
+
+_MISSING = object()
+# Separates positional from keyword arguments in a cache key
+_KWD_MARK = object()
+
+
+def memoize(name, version=None):
+    '''
+    Decorator that puts an LRUCache in front of a function of
+    hashable arguments.  If version is given it is called
+    on every lookup and the cache is cleared whenever its result
+    differs from the previous one.  A cache with maxsize 0 is
+    bypassed entirely
+    '''
+    def decorator(func):
+        cache = LRUCache(default_size())
+        _CACHES[name] = cache
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not cache.maxsize:
+                return func(*args, **kwargs)
+            current = _ANY
+            if version is not None:
+                current = version()
+                if current != cache.version:
+                    cache.validate(current)
+            key = args
+            if kwargs:
+                key += (_KWD_MARK,) + tuple(kwargs.items())
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(*args, **kwargs)
+                cache.put(key, result, current)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def stats():
+    '''
+    Returns the CacheStats of every cache, keyed by name
+    '''
+    return OrderedDict((name, cache.stats())
+                       for name, cache in _CACHES.items())
+
+
+def invalidate():
+    '''
+    Clears every cache
+    '''
+    for cache in _CACHES.values():
+        cache.clear()
+
+
+def configure(maxsize):
+    '''
+    Resizes every cache; 0 switches caching off
+    '''
+    for cache in _CACHES.values():
+        cache.resize(maxsize)
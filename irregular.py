@@ -0,0 +1,117 @@
+# Name:    irregular.py
+# Purpose: overlay of irregular forms on the regular conjugators
+#
+# The irregular_forms table holds the forms that replace the regular
+# ones, by language, verb, tense and person.  A verb that lists only
+# some persons of a tense keeps the regular forms for the others; one
+# that lists them all needn't follow a regular pattern at all.  A
+# tense a verb with irregular forms doesn't list at all is refused
+# with MissingForms: the regular rules would only guess at it (être
+# imparfait 'êtais').  Rows that can't be compiled, such as an
+# unknown person, raise ValueError rather than being dropped.
+#
+# Each conjugator compiles its language's rows into an Overlay of
+# finished inflections whenever the database changes, so conjugating
+# an irregular verb is one dict lookup and a regular verb pays for one
+# dict miss (or, in a batch, one set lookup per verb).
+
+# Key of the Overlay in a rule table compiled along with it, which
+# can't be mistaken for the (verb type, tense) of a rule
+OVERLAY = 'irregular'
+
+# Builds a namedtuple without going through its Python-level __new__
+_new = tuple.__new__
+
+
+class MissingForms(ValueError):
+    '''
+    A tense of a verb with irregular forms that has none stored
+    '''
+    def __init__(self, infinitive, tense):
+        super().__init__('no irregular forms of {!r} are stored for the {}'
+                         .format(infinitive, tense))
+        self.infinitive = infinitive
+        self.tense = tense
+
+
+class Overlay(dict):
+    '''
+    {(infinitive, tense): inflection} for the irregular verbs of one
+    language.  verbs holds every infinitive with irregular forms, for
+    callers that check once per verb rather than once per tense
+    '''
+    __slots__ = ('verbs', '_by_verb')
+
+    def __init__(self, inflections=()):
+        super().__init__(inflections)
+        by_verb = {}
+        for (infinitive, tense), inflection in sorted(self.items()):
+            by_verb.setdefault(infinitive, []).append((tense, inflection))
+        self.verbs = frozenset(by_verb)
+        self._by_verb = by_verb
+
+    def inflection(self, infinitive, tense):
+        '''
+        The inflection stored for a tense of one of verbs, raising
+        MissingForms if there is none
+        '''
+        inflection = self.get((infinitive, tense))
+        if inflection is None:
+            raise MissingForms(infinitive, tense)
+        return inflection
+
+    def fingerprint(self, infinitive):
+        '''
+        Identifies the irregular forms of one verb, '' for a regular one
+        '''
+        tenses = self._by_verb.get(infinitive)
+        return repr(tenses) if tenses else ''
+
+
+def forms(store, language_name):
+    '''
+    The irregular forms of a language as
+    {(infinitive, tense): {person: form}}
+    '''
+    found = {}
+    for verb, tense, person, form in store.irregular_forms(language_name):
+        found.setdefault((verb, tense), {})[person] = form
+    return found
+
+
+def compile_overlay(found, category, verb_types, builder, patch):
+    '''
+    Patches the forms returned by forms() into the regular inflections
+    they replace.  builder(verb_type, tense) is the regular builder, or
+    None for a tense the conjugator doesn't have; patch(parts, i, form)
+    returns person i's parts with its verb form replaced.  The persons
+    of a verb that isn't of one of verb_types have to be listed in
+    full, the regular builder then only giving the inflection's shape.
+    Raises ValueError for forms that can't be compiled: an unknown
+    tense or person, or a partial paradigm of such a verb
+    '''
+    persons = category._fields
+    inflections = {}
+    for (infinitive, tense), by_person in found.items():
+        def reject(reason):
+            return ValueError('irregular forms of {!r} in the {}: {}'
+                              .format(infinitive, tense, reason))
+        unknown = set(by_person) - set(persons)
+        if unknown:
+            raise reject('unknown persons {}'.format(
+                ', '.join(sorted(unknown))))
+        verb_type = infinitive[-2:]
+        if verb_type not in verb_types:
+            if len(by_person) < len(persons):
+                raise reject('not a regular infinitive, so every person '
+                             'has to be listed')
+            verb_type = verb_types[0]
+        build = builder(verb_type, tense)
+        if build is None:
+            raise reject('unknown tense')
+        parts = list(build(infinitive))
+        for person, form in by_person.items():
+            i = persons.index(person)
+            parts[i] = patch(parts[i], i, form)
+        inflections[infinitive, tense] = _new(category, parts)
+    return Overlay(inflections)
@@ -3,8 +3,13 @@
 # Purpose: conjugate french verb tenses
 
 from category import Category
-from collections import namedtuple
-import sqlite3
+from collections import OrderedDict, namedtuple
+import inflection_cache
+import irregular
+import paradigm
+import rule_table
+import stem_changes
+import verb_store
 
 # French pronouns - easy way to handle the j'/je problem
 # when the first letter of the verb is a vowel
@@ -24,9 +29,23 @@ _FPS_CLOZE_FORMAT = '{0}{{{{c1::{1}::{2}, {3}}}}}'
 _STD_CLOZE_FORMAT = '{0} {{{{c1::{1}::{2}, {3}}}}}'
 _VOWELS = ('a', 'e', 'i', 'o', 'u')
 
+# Infinitive endings of the regular verb groups
+VERB_TYPES = ('er', 'ir', 're')
+
 SimpleTenseParts = namedtuple("SimpleTenseParts", 'pronoun verb')
 CompoundTenseParts = namedtuple('CompoundTenseParts', 'pronoun aux past_participle')
 
+
+def _endings_version():
+    '''
+    Cached French results go stale when the store is swapped out or
+    its tense_endings change
+    '''
+    store = verb_store.get_store()
+    return store, store.endings_version()
+
+
+@inflection_cache.memoize('french.imparfait', _endings_version)
 def imparfait(infinitive):
     '''
     Creates the appropriate stem from the présent case
@@ -35,6 +54,7 @@ def imparfait(infinitive):
     return stem.rsplit('ons')[0]
 
 
+@inflection_cache.memoize('french.présent_subjonctif', _endings_version)
 def présent_subjonctif(infinitive):
     '''
     Creates the appropriate stem from the présent case
@@ -49,15 +69,20 @@ _SIMPLE_TENSES = ['présent',
                   'futur',
                   'conditionnel']
 
-# Logic for handling the different stem changes of regular verbs
+_root = (lambda x: x[:-2])
+_future_stem = (lambda x: x[:-1] if x[-2:] == 're' else x)
+
+# Logic for handling the different stem changes of regular verbs.
+# Tenses with the same stem share the function, so that
+# conjugate_all_tenses derives each stem once
 _STEM_RULES =\
-{'présent': (lambda x: x[:-2]),
- 'futur': (lambda x: x[:-1] if x[-2:] == 're' else x),
+{'présent': _root,
+ 'futur': _future_stem,
  'imparfait': imparfait,
- 'passé simple': (lambda x: x[:-2]),
- 'conditionnel': (lambda x: x[:-1] if x[-2:] == 're' else x),
+ 'passé simple': _root,
+ 'conditionnel': _future_stem,
  'subjonctif présent': présent_subjonctif,
- 'subjonctif imparfait': (lambda x: x[:-2])}
+ 'subjonctif imparfait': _root}
 
 
 def imparfait_subjonctif(infinitive):
@@ -76,14 +101,7 @@ def construct_stem_and_ending(infinitive, tense):
     '''
     stem = _STEM_RULES[tense](infinitive)
     verb_type = infinitive[-2:]
-    with sqlite3.connect('verb_trainer.db') as con:
-        cur = con.cursor()
-        cur.execute("SELECT fps, sps, tps, fpp, spp, tpp FROM tense_endings"
-                    "WHERE verb_type = ? AND tense_id = "
-                    "(SELECT tense_id FROM tenses WHERE tense_name = ?)",
-                    (verb_type, tense))
-
-        endings = cur.fetchone()
+    endings = verb_store.get_store().tense_endings(verb_type, tense)
     return Category._make([stem + end for end in endings])
 
 
@@ -139,11 +157,25 @@ def construct_compound_tense_subjunctive(infinitive, tense):
     return Category._make(inflection)
 
 
+@inflection_cache.memoize('french.construct_inflection', _endings_version)
 def construct_inflection(infinitive, tense):
     '''
     Given an infinitive and tense, constructs the combined
     stem and ending, and then prepends the appropriate pronoun
     '''
+    rules = _RULES.table()
+    overlay = rules[irregular.OVERLAY]
+    inflection = overlay.get((infinitive, tense))
+    if inflection is not None:
+        return inflection
+    if infinitive in overlay.verbs:
+        raise irregular.MissingForms(infinitive, tense)
+    build = rules.get((infinitive[-2:], tense))
+    if build is not None:
+        return _changed(infinitive, tense, build(infinitive))
+
+    # not a regular verb or a known tense: the step by step
+    # construction raises the appropriate error
     if tense in ['subjonctif présent',
                  'subjonctif imparfait']:
         return construct_simple_tense_subjunctive(infinitive, tense)
@@ -161,6 +193,356 @@ def construct_inflection(infinitive, tense):
         return construct_simple_tense(infinitive, tense)
 
 
+_SUBJUNCTIVE_TENSES = ['subjonctif présent', 'subjonctif imparfait']
+
+# Builds a namedtuple without going through its Python-level __new__
+_new = tuple.__new__
+
+
+def conjugate_many(infinitives, tenses, compact=False, overlay=None):
+    '''
+    Batch version of construct_inflection.  Yields
+    (infinitive, tense, inflection) for every infinitive and tense,
+    in input order, resolving the endings and stem rule once per
+    (verb type, tense) instead of once per call, and deriving the
+    stems the tenses share once per verb.  With compact set the
+    inflections are paradigm.CompactParadigms, except those of
+    irregular and stem- or spelling-changing verbs.  overlay is the
+    irregular forms to use, by default the current ones; a verb in it
+    without forms for one of the tenses raises irregular.MissingForms
+    before any of its tenses are yielded
+    '''
+    tenses = list(tenses)
+    paradigms = {}
+    compact_builders = {}
+    if overlay is None:
+        overlay = irregular_overlay()
+    irregular_verbs = overlay.verbs
+    # only a verb ending in one of these can have stem changes
+    suffixes, classify = _STEM_CHANGES.suffixes, _STEM_CHANGES.classify
+    for infinitive in infinitives:
+        verb_type = infinitive[-2:]
+        if infinitive in irregular_verbs:
+            inflections = [overlay.inflection(infinitive, tense)
+                           for tense in tenses]
+            for tense, inflection in zip(tenses, inflections):
+                yield infinitive, tense, inflection
+            continue
+        changes = infinitive.endswith(suffixes) and classify(infinitive)
+        if compact and not changes:
+            group = compact_builders.get(verb_type)
+            if group is None:
+                group = []
+                for tense in tenses:
+                    build = _builder(verb_type, tense)
+                    group.append((tense, paradigm.compact_builder(
+                        build, build.stem_of, _starts_with_vowel)))
+                compact_builders[verb_type] = group
+            for tense, build in group:
+                yield infinitive, tense, build(infinitive)
+            continue
+        build = paradigms.get(verb_type)
+        if build is None:
+            build = _paradigm_builder([_builder(verb_type, tense)
+                                       for tense in tenses])
+            paradigms[verb_type] = build
+        for tense, inflection in zip(tenses, build(infinitive)):
+            if changes:
+                inflection = _STEM_CHANGES.apply(changes, infinitive, tense,
+                                                 inflection, _replace_form)
+            yield infinitive, tense, inflection
+
+
+def conjugate_all_tenses(infinitive):
+    '''
+    Every tense of a verb as {tense: inflection}, in the store's
+    order of tense names, each inflection the same as
+    construct_inflection's.  The stems and the past participle that
+    several tenses share are derived once for all of them.  Raises
+    irregular.MissingForms for an irregular verb without forms for
+    every tense
+    '''
+    rules = _RULES.table()
+    overlay = rules[irregular.OVERLAY]
+    if infinitive in overlay.verbs:
+        return OrderedDict(
+            (tense, overlay.inflection(infinitive, tense))
+            for tense in verb_store.get_store().tense_names('française'))
+    build = rules[_PARADIGMS].get(infinitive[-2:])
+    if build is None:
+        raise ValueError('parameter not a verb infinitive')
+    changes = classify(infinitive)
+    inflections = OrderedDict()
+    for tense, inflection in zip(build.tenses, build(infinitive)):
+        if changes:
+            inflection = _STEM_CHANGES.apply(changes, infinitive, tense,
+                                             inflection, _replace_form)
+        inflections[tense] = inflection
+    return inflections
+
+
+def _builder(verb_type, tense):
+    '''
+    The compiled builder, falling back to _batch_builder (and the
+    error it raises) for anything the rule table doesn't cover
+    '''
+    build = _RULES.get(verb_type, tense)
+    if build is None:
+        endings = verb_store.get_store().endings_table()
+        build = _batch_builder(verb_type, tense, endings)
+    return build
+
+
+def _batch_builder(verb_type, tense, endings):
+    '''
+    Returns a function infinitive -> inflection for one verb type
+    and tense, with everything that doesn't depend on the
+    infinitive worked out up front.  Its stem_of(infinitive) is the
+    stem and from_stem(stem) the inflection built on it
+    '''
+    if tense in _COMPOUND_TENSE:
+        return _compound_builder(tense)
+
+    if tense not in _STEM_RULES:
+        raise KeyError(tense)
+    if (verb_type, tense) not in endings:
+        raise ValueError('parameter not a verb infinitive')
+    stem_rule = _batch_stem_rule(verb_type, tense, endings)
+    fps, sps, tps, fpp, spp, tpp = endings[verb_type, tense]
+    fps_pronoun = _PRONOUNS.fps
+    others = [f(None) for f in _PRONOUNS[1:]]
+
+    if tense in _SUBJUNCTIVE_TENSES:
+        conjunctions = ["qu'" if p[0] in _VOWELS else 'que' for p in others]
+
+        def from_stem(stem):
+            form = stem + fps
+            pronoun = fps_pronoun(form)
+            return _new(Category,
+                        (("qu'" if pronoun[0] in _VOWELS else 'que',
+                          pronoun, form),
+                         (conjunctions[0], others[0], stem + sps),
+                         (conjunctions[1], others[1], stem + tps),
+                         (conjunctions[2], others[2], stem + fpp),
+                         (conjunctions[3], others[3], stem + spp),
+                         (conjunctions[4], others[4], stem + tpp)))
+    else:
+        def from_stem(stem):
+            form = stem + fps
+            return _new(Category,
+                        (_new(SimpleTenseParts, (fps_pronoun(form), form)),
+                         _new(SimpleTenseParts, (others[0], stem + sps)),
+                         _new(SimpleTenseParts, (others[1], stem + tps)),
+                         _new(SimpleTenseParts, (others[2], stem + fpp)),
+                         _new(SimpleTenseParts, (others[3], stem + spp)),
+                         _new(SimpleTenseParts, (others[4], stem + tpp))))
+
+    def build(infinitive):
+        return from_stem(stem_rule(infinitive))
+    build.stem_of = stem_rule
+    build.from_stem = from_stem
+    return build
+
+
+def _paradigm_builder(builds):
+    '''
+    Combines the builders of several tenses into one function
+    infinitive -> [inflection] that calls each stem rule once,
+    however many of the tenses share it
+    '''
+    stem_rules = []
+    plan = []
+    for build in builds:
+        if build.stem_of not in stem_rules:
+            stem_rules.append(build.stem_of)
+        plan.append((stem_rules.index(build.stem_of), build.from_stem))
+
+    def build(infinitive):
+        stems = [stem_of(infinitive) for stem_of in stem_rules]
+        return [from_stem(stems[i]) for i, from_stem in plan]
+    return build
+
+
+def _compile_rules():
+    '''
+    Compiles a builder for every verb type and every tense with
+    endings in the store or an auxiliary in _COMPOUND_TENSE, a
+    paradigm builder for every verb type with all of the store's
+    tenses, and the irregular forms stored for French into an Overlay
+    '''
+    store = verb_store.get_store()
+    endings = store.endings_table()
+    rules = {}
+    for verb_type in VERB_TYPES:
+        for tense in list(_STEM_RULES) + list(_COMPOUND_TENSE):
+            if tense in _COMPOUND_TENSE or (verb_type, tense) in endings:
+                rules[verb_type, tense] = _batch_builder(verb_type, tense,
+                                                         endings)
+    tenses = store.tense_names('française')
+    paradigms = {}
+    for verb_type in VERB_TYPES:
+        if all((verb_type, tense) in rules for tense in tenses):
+            build = _paradigm_builder([rules[verb_type, tense]
+                                       for tense in tenses])
+            build.tenses = tenses
+            paradigms[verb_type] = build
+    rules[_PARADIGMS] = paradigms
+    rules[irregular.OVERLAY] = irregular.compile_overlay(
+        irregular.forms(store, 'française'), Category, VERB_TYPES,
+        lambda verb_type, tense: _changed_builder(
+            rules.get((verb_type, tense)), tense),
+        _replace_form)
+    return rules
+
+
+# Key of the paradigm builders of conjugate_all_tenses in the rule
+# table, {verb type: builder}
+_PARADIGMS = 'paradigms'
+
+# Rebuilt whenever the store or its tense_endings or irregular forms
+# change.  The overlay is compiled into the same table so that
+# construct_inflection checks for changes once, not twice
+_RULES = rule_table.RuleTable(_compile_rules, _endings_version)
+
+
+def irregular_overlay():
+    '''
+    The current irregular.Overlay
+    '''
+    return _RULES.table()[irregular.OVERLAY]
+
+
+def _replace_form(parts, i, form):
+    '''
+    One person's parts with the verb form (auxiliary and past
+    participle, in a compound tense) replaced, and the pronoun and
+    conjunction elided to match
+    '''
+    start = 1 if parts[0] in ('que', "qu'") else 0
+    count = len(parts) - start - 1
+    forms = form.split(' ', count - 1)
+    if len(forms) != count:
+        raise ValueError('irregular form {!r} does not match {!r}'
+                         .format(form, parts))
+    pronoun = _PRONOUNS[i](forms[0])
+    if start:
+        prefix = ("qu'" if pronoun[0] in _VOWELS else 'que', pronoun)
+    else:
+        prefix = (pronoun,)
+    return _new(type(parts), prefix + tuple(forms))
+
+
+def _mute_e(rest):
+    '''
+    The ending starts with a mute e: je lève, ils lèveront, but not
+    vous levez
+    '''
+    return rest[:1] == 'e' and rest[1:2] != 'z'
+
+
+def _before_a_o(rest):
+    return rest[:1] in ('a', 'â', 'o')
+
+
+_GRAVE = stem_changes.Change(stem_changes.vowel('e', 'è'), when=_mute_e)
+# préférer keeps its é in the futur and conditionnel
+_ACUTE_TO_GRAVE = stem_changes.Change(stem_changes.vowel('é', 'è'),
+                                      tenses=('présent', 'subjonctif présent'),
+                                      when=_mute_e)
+_DOUBLE = stem_changes.Change(stem_changes.double, when=_mute_e)
+
+# Stem changes by suffix, the -eler and -eter verbs following the 1990
+# spelling reform (è, except appeler, jeter and their compounds), and
+# the spelling changes that keep c and g soft before a and o
+_STEM_CHANGES = stem_changes.RuleSet(Category._fields, {
+    'stem': [('e' + c + 'er', (_GRAVE,))
+             for c in ('c', 'l', 'm', 'n', 's', 't', 'v', 'vr')]
+            + [('é' + c + 'er', (_ACUTE_TO_GRAVE,))
+               for c in ('b', 'br', 'c', 'ch', 'cr', 'd', 'g', 'gl', 'gn',
+                         'gr', 'gu', 'l', 'm', 'n', 'qu', 'r', 's', 't',
+                         'tr', 'v')]
+            + [('appeler', (_DOUBLE,)), ('jeter', (_DOUBLE,))],
+    'spelling': [('cer', (stem_changes.Change(stem_changes.final('c', 'ç'),
+                                              when=_before_a_o),)),
+                 ('ger', (stem_changes.Change(stem_changes.final('g', 'ge'),
+                                              when=_before_a_o),))]})
+
+
+@inflection_cache.memoize('french.classify')
+def classify(infinitive):
+    '''
+    The stem and spelling changes of a verb, () for none
+    '''
+    return _STEM_CHANGES.classify(infinitive)
+
+
+def _changed(infinitive, tense, inflection):
+    '''
+    A regular inflection with the verb's stem and spelling changes
+    '''
+    changes = classify(infinitive)
+    if changes:
+        return _STEM_CHANGES.apply(changes, infinitive, tense, inflection,
+                                   _replace_form)
+    return inflection
+
+
+def _changed_builder(build, tense):
+    if build is None:
+        return None
+    return lambda infinitive: _changed(infinitive, tense, build(infinitive))
+
+
+def _batch_stem_rule(verb_type, tense, endings):
+    '''
+    Same as _STEM_RULES[tense], but the stems derived from the
+    présent use the already loaded endings rather than conjugating
+    the présent again
+    '''
+    if tense == 'imparfait':
+        present_fpp = endings[verb_type, 'présent'][3]
+        return lambda x: (x[:-2] + present_fpp).rsplit('ons')[0]
+    if tense == 'subjonctif présent':
+        present_tpp = endings[verb_type, 'présent'][5]
+        return lambda x: (x[:-2] + present_tpp).rsplit('ent')[0]
+    return _STEM_RULES[tense]
+
+
+def _compound_builder(tense):
+    '''
+    The pronoun and auxiliary parts of a compound tense are the same
+    for every verb, only the past participle changes
+    '''
+    if tense in ['subjonctif passé', 'subjonctif plus-que-parfait']:
+        prefixes = [("qu'" if f(aux)[0] in _VOWELS else 'que', f(aux), aux)
+                    for f, aux in zip(_PRONOUNS, _COMPOUND_TENSE[tense])]
+    else:
+        prefixes = [(f(aux), aux)
+                    for f, aux in zip(_PRONOUNS, _COMPOUND_TENSE[tense])]
+
+    p1, p2, p3, p4, p5, p6 = prefixes
+
+    def from_stem(past_participle):
+        past_participle = (past_participle,)
+        return _new(Category, (p1 + past_participle, p2 + past_participle,
+                               p3 + past_participle, p4 + past_participle,
+                               p5 + past_participle, p6 + past_participle))
+
+    def build(infinitive):
+        return from_stem(_construct_past_participle(infinitive))
+    build.stem_of = _construct_past_participle
+    build.from_stem = from_stem
+    return build
+
+
+def _starts_with_vowel(infinitive):
+    '''
+    The only thing about a regular verb that changes its pronouns:
+    je or j'
+    '''
+    return infinitive[:1] in _VOWELS
+
+
 def elision(word1, word2):
     if word1 not in ['je', 'que']:
         raise ValueError("First parameter must be 'je' or 'que'")
@@ -1,5 +1,11 @@
 # Spanish verb conjugations
 from collections import namedtuple, OrderedDict
+import inflection_cache
+import irregular
+import paradigm
+import rule_table
+import stem_changes
+import verb_store
 
 # Spanish has two forms of the sps familiar - 'tú' and 'vos'
 SpanishCategory = namedtuple('SpanishCategory', 'fps sps spsv tps fpp spp tpp')
@@ -74,6 +80,9 @@ _ENDINGS =\
   }
 }
 
+# Infinitive endings of the regular verb groups
+VERB_TYPES = tuple(_ENDINGS)
+
 # logic for adjusting the stem of the verb for the case
 _STEM_RULES =\
     {'presente': (lambda x: x[:-2]),
@@ -113,16 +122,270 @@ def _construct_past_participle(infinitive):
     else:
         raise ValueError('parameter not a verb infinitive')
 
+def _store_version():
+    '''
+    Cached Spanish results go stale when the store is swapped out or
+    its irregular forms change
+    '''
+    store = verb_store.get_store()
+    return store, store.endings_version()
+
+
+@inflection_cache.memoize('spanish.construct_inflection', _store_version)
 def construct_inflection(infinitive, tense):
     '''
     Given an infinitive and tense, constructs the combined
     stem and ending, and then prepends the appropriate pronoun
     '''
+    overlay = _IRREGULAR.table()
+    inflection = overlay.get((infinitive, tense))
+    if inflection is not None:
+        return inflection
+    if infinitive in overlay.verbs:
+        raise irregular.MissingForms(infinitive, tense)
+    build = _RULES.get(infinitive[-2:], tense)
+    if build is not None:
+        return _changed(infinitive, tense, build(infinitive))
+
+    # not a regular verb or a known tense: the step by step
+    # construction raises the appropriate error
     stem_and_ending = construct_stem_and_ending(infinitive, tense)
     return SpanishCategory._make([item for item in zip(_PRONOUNS,
                                                        stem_and_ending)])
 
 
+# Builds a namedtuple without going through its Python-level __new__
+_new = tuple.__new__
+
+
+def conjugate_many(infinitives, tenses, compact=False, overlay=None):
+    '''
+    Batch version of construct_inflection.  Yields
+    (infinitive, tense, inflection) for every infinitive and tense,
+    in input order, resolving the endings and stem rule once per
+    (verb type, tense) instead of once per call.  With compact set
+    the inflections are paradigm.CompactParadigms, except those of
+    irregular and stem- or spelling-changing verbs.  overlay is the
+    irregular forms to use, by default the current ones; a verb in it
+    without forms for one of the tenses raises irregular.MissingForms
+    before any of its tenses are yielded
+    '''
+    tenses = list(tenses)
+    builders = {}
+    if overlay is None:
+        overlay = irregular_overlay()
+    irregular_verbs = overlay.verbs
+    # only a verb ending in one of these can have stem changes
+    suffixes, classify = _STEM_CHANGES.suffixes, _STEM_CHANGES.classify
+    for infinitive in infinitives:
+        if infinitive in irregular_verbs:
+            inflections = [overlay.inflection(infinitive, tense)
+                           for tense in tenses]
+            for tense, inflection in zip(tenses, inflections):
+                yield infinitive, tense, inflection
+            continue
+        verb_type = infinitive[-2:]
+        changes = infinitive.endswith(suffixes) and classify(infinitive)
+        if changes:
+            for tense in tenses:
+                inflection = (_RULES.get(verb_type, tense)
+                              or _batch_builder(verb_type, tense))(infinitive)
+                yield infinitive, tense, _STEM_CHANGES.apply(
+                    changes, infinitive, tense, inflection, _replace_form)
+            continue
+        group = builders.get(verb_type)
+        if group is None:
+            group = [(tense, _RULES.get(verb_type, tense)
+                      or _batch_builder(verb_type, tense))
+                     for tense in tenses]
+            if compact:
+                group = [(tense, paradigm.compact_builder(build,
+                                                          build.stem_of))
+                         for tense, build in group]
+            builders[verb_type] = group
+        for tense, build in group:
+            yield infinitive, tense, build(infinitive)
+
+
+def _batch_builder(verb_type, tense):
+    '''
+    Returns a function infinitive -> inflection for one verb type
+    and tense, with everything that doesn't depend on the
+    infinitive worked out up front
+    '''
+    if tense in ['pretérito perfecto']:
+        p1, p2, p3, p4, p5, p6, p7 = _PRONOUNS
+        a1, a2, a3, a4, a5, a6, a7 = [aux + ' ' for aux in
+                                      AUX_VERB['haber']['presente']]
+
+        def build(infinitive):
+            pp = _construct_past_participle(infinitive)
+            return _new(SpanishCategory, ((p1, a1 + pp), (p2, a2 + pp),
+                                          (p3, a3 + pp), (p4, a4 + pp),
+                                          (p5, a5 + pp), (p6, a6 + pp),
+                                          (p7, a7 + pp)))
+        build.stem_of = _construct_past_participle
+        return build
+
+    stem_rule = _STEM_RULES[tense]
+    if verb_type not in _ENDINGS:
+        raise ValueError('parameter not a verb infinitive')
+    p1, p2, p3, p4, p5, p6, p7 = _PRONOUNS
+    e1, e2, e3, e4, e5, e6, e7 = _ENDINGS[verb_type][tense]
+
+    def build(infinitive):
+        stem = stem_rule(infinitive)
+        return _new(SpanishCategory, ((p1, stem + e1), (p2, stem + e2),
+                                      (p3, stem + e3), (p4, stem + e4),
+                                      (p5, stem + e5), (p6, stem + e6),
+                                      (p7, stem + e7)))
+    build.stem_of = stem_rule
+    return build
+
+
+def _compile_rules():
+    '''
+    Compiles a builder for every verb type and tense in _ENDINGS,
+    plus the pretérito perfecto
+    '''
+    return {(verb_type, tense): _batch_builder(verb_type, tense)
+            for verb_type in _ENDINGS
+            for tense in list(_ENDINGS[verb_type]) + ['pretérito perfecto']
+            if tense in _STEM_RULES or tense == 'pretérito perfecto'}
+
+
+def _rules_version():
+    return rule_table.fingerprint(_ENDINGS, _STEM_RULES, AUX_VERB, _PRONOUNS)
+
+
+# The source tables are Python data, so they are fingerprinted, no
+# more often than the store checks its database for changes
+_RULES = rule_table.RuleTable(_compile_rules, _rules_version,
+                              verb_store.RELOAD_INTERVAL)
+
+
+def _compile_irregular():
+    '''
+    Compiles the irregular forms stored for Spanish into an Overlay
+    '''
+    found = irregular.forms(verb_store.get_store(), 'español')
+    return irregular.compile_overlay(
+        found, SpanishCategory, VERB_TYPES,
+        lambda verb_type, tense: _changed_builder(
+            _RULES.get(verb_type, tense), tense),
+        _replace_form)
+
+
+def _replace_form(parts, i, form):
+    return parts[0], form
+
+
+# The irregular forms are in the database, so they follow its changes
+# rather than those of the Python tables above
+_IRREGULAR = rule_table.RuleTable(_compile_irregular, _store_version)
+
+
+def irregular_overlay():
+    '''
+    The current irregular.Overlay
+    '''
+    return _IRREGULAR.table()
+
+
+# The persons whose stem is stressed in the presente
+_STRESSED = ('fps', 'sps', 'tps', 'tpp')
+# and the pretérito persons where -ir verbs close e to i and o to u
+_CLOSED = ('tps', 'tpp')
+
+_E_IE = stem_changes.Change(stem_changes.vowel('e', 'ie'),
+                            ('presente',), _STRESSED)
+_O_UE = stem_changes.Change(stem_changes.vowel('o', 'ue'),
+                            ('presente',), _STRESSED)
+_U_UE = stem_changes.Change(stem_changes.vowel('u', 'ue'),
+                            ('presente',), _STRESSED)
+_E_I = stem_changes.Change(stem_changes.vowel('e', 'i'),
+                           ('presente',), _STRESSED)
+_E_I_PRETERITE = stem_changes.Change(stem_changes.vowel('e', 'i'),
+                                     ('pretérito indefinido',), _CLOSED)
+_O_U_PRETERITE = stem_changes.Change(stem_changes.vowel('o', 'u'),
+                                     ('pretérito indefinido',), _CLOSED)
+
+
+def _before_e(rest):
+    return rest[:1] in ('e', 'é')
+
+
+def _before_a_o(rest):
+    return rest[:1] in ('a', 'o')
+
+
+def _spelling(old, new, when=_before_e):
+    return (stem_changes.Change(stem_changes.final(old, new), when=when),)
+
+
+# Stem-changing verbs by infinitive, which also covers the compounds
+# built on them (recontar, devolver); the longer suffixes with no
+# changes are regular verbs that would otherwise match.  The spelling
+# changes keep the sound of c, g, gu and z before the vowel of the ending
+_STEM_CHANGES = stem_changes.RuleSet(SpanishCategory._fields, {
+    'stem': [(verb, (_E_IE,)) for verb in (
+                 'atravesar', 'calentar', 'cerrar', 'comenzar', 'confesar',
+                 'defender', 'despertar', 'empezar', 'encender', 'fregar',
+                 'gobernar', 'helar', 'negar', 'nevar', 'pensar', 'perder',
+                 'querer', 'recomendar', 'regar', 'sentar', 'tender',
+                 'tentar')]
+            + [(verb, (_E_IE, _E_I_PRETERITE)) for verb in (
+                 'entir', 'erir', 'ertir', 'hervir')]
+            + [(verb, (_O_UE,)) for verb in (
+                 'acostar', 'almorzar', 'colgar', 'contar', 'costar',
+                 'doler', 'encontrar', 'llover', 'morder', 'mostrar',
+                 'mover', 'olver', 'poder', 'probar', 'recordar', 'rogar',
+                 'soler', 'sonar', 'soñar', 'volar')]
+            + [(verb, (_O_UE, _O_U_PRETERITE)) for verb in (
+                 'dormir', 'morir')]
+            + [(verb, (_E_I, _E_I_PRETERITE)) for verb in (
+                 'edir', 'egir', 'eguir', 'estir', 'etir', 'ervir')]
+            + [('jugar', (_U_UE,))]
+            + [(verb, ()) for verb in (
+                 'abrogar', 'agregar', 'anegar', 'atentar', 'ausentar',
+                 'compensar', 'congregar', 'contentar', 'derogar',
+                 'detentar', 'disgregar', 'dispensar', 'entregar',
+                 'intentar', 'interrogar', 'ostentar', 'personar',
+                 'presentar', 'pretender', 'prorrogar', 'segregar',
+                 'sustentar')],
+    'spelling': [('car', _spelling('c', 'qu')),
+                 ('gar', _spelling('g', 'gu')),
+                 ('zar', _spelling('z', 'c')),
+                 ('ger', _spelling('g', 'j', _before_a_o)),
+                 ('gir', _spelling('g', 'j', _before_a_o)),
+                 ('guir', _spelling('gu', 'g', _before_a_o))]})
+
+
+@inflection_cache.memoize('spanish.classify')
+def classify(infinitive):
+    '''
+    The stem and spelling changes of a verb, () for none
+    '''
+    return _STEM_CHANGES.classify(infinitive)
+
+
+def _changed(infinitive, tense, inflection):
+    '''
+    A regular inflection with the verb's stem and spelling changes
+    '''
+    changes = classify(infinitive)
+    if changes:
+        return _STEM_CHANGES.apply(changes, infinitive, tense, inflection,
+                                   _replace_form)
+    return inflection
+
+
+def _changed_builder(build, tense):
+    if build is None:
+        return None
+    return lambda infinitive: _changed(infinitive, tense, build(infinitive))
+
+
 def output_normal_view(infinitive, tense, conj):
     '''
     Pretty-printing for the traditional two-column output
@@ -0,0 +1,52 @@
+-- Tables of the verb_trainer database.  Every migration can be run
+-- again on a database that already has what it creates.
+
+CREATE TABLE IF NOT EXISTS languages(language_id INTEGER PRIMARY KEY,
+                                     language_name TEXT NOT NULL);
+
+CREATE TABLE IF NOT EXISTS verbs(verb_id INTEGER PRIMARY KEY,
+                                 language_id INTEGER,
+                                 verb TEXT NOT NULL,
+                                 aux TEXT NOT NULL,
+                                 past_participle TEXT NOT NULL,
+                                 present_participle TEXT NOT NULL,
+                                 is_reflexive TINYINT DEFAULT 0,
+                                 is_aux TINYINT DEFAULT 0,
+                                 is_irregular TINYINT DEFAULT 0,
+                                 FOREIGN KEY(language_id) REFERENCES languages(language_id));
+
+CREATE TABLE IF NOT EXISTS tenses(tense_id INTEGER PRIMARY KEY,
+                                  language_id INTEGER,
+                                  tense_name TEXT NOT NULL,
+                                  is_simple TINYINT DEFAULT 0,
+                                  is_compound TINYINT DEFAULT 0,
+                                  is_subjunctive TINYINT DEFAULT 0,
+                                  FOREIGN KEY(language_id) REFERENCES languages(language_id));
+
+CREATE TABLE IF NOT EXISTS tense_endings(ending_id INTEGER PRIMARY KEY,
+                                         tense_id INTEGER,
+                                         verb_type TEXT NOT NULL,
+                                         fps TEXT NOT NULL,
+                                         sps TEXT NOT NULL,
+                                         tps TEXT NOT NULL,
+                                         fpp TEXT NOT NULL,
+                                         spp TEXT NOT NULL,
+                                         tpp TEXT NOT NULL,
+                                         FOREIGN KEY(tense_id) REFERENCES tenses(tense_id));
+
+CREATE TABLE IF NOT EXISTS conjugations(conjugation_id INTEGER PRIMARY KEY,
+                                        language_id INTEGER,
+                                        verb_id INTEGER,
+                                        tense_id INTEGER,
+                                        person TEXT NOT NULL,
+                                        pronoun TEXT NOT NULL,
+                                        form TEXT NOT NULL,
+                                        FOREIGN KEY(language_id) REFERENCES languages(language_id),
+                                        FOREIGN KEY(verb_id) REFERENCES verbs(verb_id),
+                                        FOREIGN KEY(tense_id) REFERENCES tenses(tense_id));
+
+CREATE INDEX IF NOT EXISTS conjugations_verb_tense ON conjugations(verb_id, tense_id);
+
+CREATE TABLE IF NOT EXISTS conjugation_builds(verb_id INTEGER PRIMARY KEY,
+                                              fingerprint TEXT NOT NULL,
+                                              FOREIGN KEY(verb_id) REFERENCES verbs(verb_id));
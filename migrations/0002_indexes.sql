@@ -0,0 +1,41 @@
+-- Indexes for the lookups the conjugators, the conjugations table and
+-- the verb loader make, so none of them scans a table.  The unique
+-- ones also let the seed data and the verb loader insert or update
+-- rows without duplicating them.
+
+CREATE UNIQUE INDEX IF NOT EXISTS languages_name ON languages(language_name);
+
+CREATE UNIQUE INDEX IF NOT EXISTS tenses_language_name ON tenses(language_id, tense_name);
+
+-- tense_endings are looked up by tense name alone
+CREATE INDEX IF NOT EXISTS tenses_name ON tenses(tense_name);
+
+CREATE UNIQUE INDEX IF NOT EXISTS tense_endings_tense_type ON tense_endings(tense_id, verb_type);
+
+-- databases created by the old drop-and-recreate script had no unique
+-- index on verbs, so may hold a verb more than once.  The first row
+-- (lowest verb_id) is kept.  Conjugations are built from the verbs, so
+-- those of the other rows are dropped along with the build of the one
+-- kept, which the next build then redoes.
+CREATE TEMP TABLE duplicate_verbs AS
+    SELECT v.verb_id, kept.verb_id AS kept_id
+    FROM verbs v JOIN (SELECT language_id, verb, MIN(verb_id) AS verb_id
+                       FROM verbs GROUP BY language_id, verb
+                       HAVING COUNT(*) > 1) kept
+    ON v.language_id IS kept.language_id AND v.verb = kept.verb
+    AND v.verb_id > kept.verb_id;
+
+DELETE FROM conjugations
+WHERE verb_id IN (SELECT verb_id FROM duplicate_verbs);
+
+DELETE FROM conjugation_builds
+WHERE verb_id IN (SELECT verb_id FROM duplicate_verbs)
+OR verb_id IN (SELECT kept_id FROM duplicate_verbs);
+
+DELETE FROM verbs WHERE verb_id IN (SELECT verb_id FROM duplicate_verbs);
+
+DROP TABLE temp.duplicate_verbs;
+
+-- and some had a non-unique index of the same name
+DROP INDEX IF EXISTS verbs_language_verb;
+CREATE UNIQUE INDEX verbs_language_verb ON verbs(language_id, verb);
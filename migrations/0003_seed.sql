@@ -0,0 +1,49 @@
+-- The languages, tenses and regular endings the conjugators start
+-- from.  Rows already there, possibly edited, are left as they are.
+
+INSERT OR IGNORE INTO languages(language_name) VALUES('française');
+INSERT OR IGNORE INTO languages(language_name) VALUES('español');
+INSERT OR IGNORE INTO languages(language_name) VALUES('deutsch');
+INSERT OR IGNORE INTO languages(language_name) VALUES('日本語');
+
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'présent', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'passé simple', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'imparfait', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'futur', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'conditionnel', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'subjonctif présent', 1, 0, 1);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'subjonctif imparfait', 1, 0, 1);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'passé composé', 0, 1, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'plus-que-parfait', 0, 1, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'futur antérieur', 0, 1, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'passé antérieur', 0, 1, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'subjonctif passé', 0, 1, 1);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'subjonctif plus-que-parfait', 0, 1, 1);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'passé du conditionnel', 0, 1, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'presente', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'pretérito imperfecto', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'pretérito indefinido', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'futuro simple', 1, 0, 0);
+INSERT OR IGNORE INTO tenses VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'pretérito perfecto', 0, 1, 0);
+
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'présent'), 'er', 'e', 'es', 'e', 'ons', 'ez', 'ent' );
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'imparfait'), 'er', 'ais', 'ais', 'ait', 'ions', 'iez', 'aient');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'passé simple'), 'er', 'ai', 'as', 'a', 'âmes', 'âtes', 'èrent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'futur'), 'er', 'ai', 'as', 'a', 'ons', 'ez', 'ont');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'conditionnel'), 'er', 'ais', 'ais', 'ait', 'ions', 'iez', 'aient');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'subjonctif présent'), 'er', 'e', 'es', 'e', 'ions', 'iez', 'ent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'subjonctif imparfait'), 'er', 'asse', 'asses', 'ât', 'assions', 'assiez', 'assent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'présent'), 'ir', 'is', 'is', 'it', 'issons', 'issez', 'issent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'imparfait'), 'ir', 'ais', 'ais', 'ait', 'ions', 'iez', 'aient');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'passé simple'), 'ir', 'is', 'is', 'it', 'îmes', 'îtes', 'irent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'futur'), 'ir', 'ai', 'as', 'a', 'ons', 'ez', 'ont');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'conditionnel'), 'ir', 'ais', 'ais', 'ait', 'ions', 'iez', 'aient');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'subjonctif présent'), 'ir', 'e', 'es', 'e', 'ions', 'iez', 'ent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'subjonctif imparfait'), 'ir', 'isse', 'isses', 'ît', 'issions', 'issiez', 'issent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'présent'), 're', 's', 's', '', 'ons', 'ez', 'ent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'imparfait'), 're', 'ais', 'ais', 'ait', 'ions', 'iez', 'aient');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'passé simple'), 're', 'is', 'is', 'it', 'îmes', 'îtes', 'irent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'futur'), 're', 'ai', 'as', 'a', 'ons', 'ez', 'ont');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'conditionnel'), 're', 'ais', 'ais', 'ait', 'ions', 'iez', 'aient');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'subjonctif présent'), 're', 'e', 'es', 'e', 'ions', 'iez', 'ent');
+INSERT OR IGNORE INTO tense_endings VALUES(NULL, (SELECT tense_id FROM tenses WHERE tense_name = 'subjonctif imparfait'), 're', 'isse', 'isses', 'ît', 'issions', 'issiez', 'issent');
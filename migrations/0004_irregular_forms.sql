@@ -0,0 +1,62 @@
+-- Irregular forms, which take the place of the regular conjugators'
+-- forms for one verb, tense and person.  A verb only needs the
+-- persons that differ from the regular forms listed.
+
+CREATE TABLE IF NOT EXISTS irregular_forms(form_id INTEGER PRIMARY KEY,
+                                           language_id INTEGER,
+                                           verb TEXT NOT NULL,
+                                           tense_name TEXT NOT NULL,
+                                           person TEXT NOT NULL,
+                                           form TEXT NOT NULL,
+                                           FOREIGN KEY(language_id) REFERENCES languages(language_id));
+
+CREATE UNIQUE INDEX IF NOT EXISTS irregular_forms_verb_tense ON irregular_forms(language_id, verb, tense_name, person);
+
+-- The présent of the commonest irregular verbs
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'être', 'présent', 'fps', 'suis');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'être', 'présent', 'sps', 'es');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'être', 'présent', 'tps', 'est');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'être', 'présent', 'fpp', 'sommes');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'être', 'présent', 'spp', 'êtes');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'être', 'présent', 'tpp', 'sont');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'avoir', 'présent', 'fps', 'ai');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'avoir', 'présent', 'sps', 'as');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'avoir', 'présent', 'tps', 'a');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'avoir', 'présent', 'fpp', 'avons');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'avoir', 'présent', 'spp', 'avez');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'avoir', 'présent', 'tpp', 'ont');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'aller', 'présent', 'fps', 'vais');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'aller', 'présent', 'sps', 'vas');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'aller', 'présent', 'tps', 'va');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'aller', 'présent', 'tpp', 'vont');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'faire', 'présent', 'fps', 'fais');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'faire', 'présent', 'sps', 'fais');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'faire', 'présent', 'tps', 'fait');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'faire', 'présent', 'fpp', 'faisons');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'faire', 'présent', 'spp', 'faites');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'française'), 'faire', 'présent', 'tpp', 'font');
+
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ser', 'presente', 'fps', 'soy');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ser', 'presente', 'sps', 'eres');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ser', 'presente', 'spsv', 'sos');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ser', 'presente', 'tps', 'es');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ser', 'presente', 'fpp', 'somos');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ser', 'presente', 'spp', 'sois');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ser', 'presente', 'tpp', 'son');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'estar', 'presente', 'fps', 'estoy');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'estar', 'presente', 'sps', 'estás');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'estar', 'presente', 'tps', 'está');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'estar', 'presente', 'tpp', 'están');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ir', 'presente', 'fps', 'voy');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ir', 'presente', 'sps', 'vas');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ir', 'presente', 'spsv', 'vas');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ir', 'presente', 'tps', 'va');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ir', 'presente', 'fpp', 'vamos');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ir', 'presente', 'spp', 'vais');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'ir', 'presente', 'tpp', 'van');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'tener', 'presente', 'fps', 'tengo');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'tener', 'presente', 'sps', 'tienes');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'tener', 'presente', 'tps', 'tiene');
+INSERT OR IGNORE INTO irregular_forms VALUES(NULL, (SELECT language_id FROM languages WHERE language_name = 'español'), 'tener', 'presente', 'tpp', 'tienen');
+
+UPDATE verbs SET is_irregular = 1 WHERE is_irregular = 0 AND verb IN (SELECT verb FROM irregular_forms WHERE irregular_forms.language_id = verbs.language_id);
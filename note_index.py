@@ -0,0 +1,154 @@
+# Name:    note_index.py
+# Purpose: remember which Anki notes an export target already has, so
+#          incremental exports write only new or changed notes
+#
+# Each note is identified by a 64-bit hash of (infinitive, tense,
+# person) and its content by a 64-bit hash of the note line.  On disk
+# the index is the two columns as sorted arrays of signed 64-bit
+# ints, 16 bytes a note, which load with two array reads and are
+# searched by bisection without building a dict.
+
+import heapq
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from hashlib import blake2b
+
+MAGIC = b'VTNI'
+# Stored in saved files so an index written by an incompatible
+# version is rejected instead of misread
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sIQ')
+
+ExportStats = namedtuple('ExportStats', 'added changed skipped')
+
+ADDED = 'added'
+CHANGED = 'changed'
+
+
+def _hash64(text):
+    digest = blake2b(text.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+def note_key(infinitive, tense, person):
+    return _hash64('\x1f'.join((infinitive, tense, person)))
+
+
+def note_digest(note):
+    return _hash64(note)
+
+
+class NoteIndex:
+    '''
+    The content hash of every note already written to one export
+    target.  The file at path is only read on the first lookup, and
+    only rewritten by save() if something was added or changed
+    '''
+    def __init__(self, path):
+        self.path = path
+        self._keys = None
+        self._digests = None
+        # key -> digest for everything seen since loading that isn't
+        # in the arrays with that digest
+        self._pending = {}
+
+    def __len__(self):
+        self._ensure_loaded()
+        new = sum(1 for key in self._pending if self._find(key) is None)
+        return len(self._keys) + new
+
+    def _ensure_loaded(self):
+        if self._keys is not None:
+            return
+        keys, digests = array('q'), array('q')
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            pass
+        else:
+            with f:
+                header = f.read(_HEADER.size)
+                magic, version, count = (_HEADER.unpack(header)
+                                         if len(header) == _HEADER.size
+                                         else (None, None, 0))
+                if magic != MAGIC or version != FORMAT_VERSION:
+                    raise ValueError('{} is not a version {} note index'
+                                     .format(self.path, FORMAT_VERSION))
+                keys.fromfile(f, count)
+                digests.fromfile(f, count)
+            if sys.byteorder != 'little':
+                keys.byteswap()
+                digests.byteswap()
+        self._keys, self._digests = keys, digests
+
+    def _find(self, key):
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return None
+
+    def get(self, key):
+        '''
+        The digest last recorded for key, None if it has none
+        '''
+        digest = self._pending.get(key)
+        if digest is not None:
+            return digest
+        self._ensure_loaded()
+        i = self._find(key)
+        return None if i is None else self._digests[i]
+
+    def check(self, key, digest):
+        '''
+        Records digest for key.  Returns ADDED or CHANGED if the note
+        needs writing, None if the target already has it
+        '''
+        previous = self.get(key)
+        if previous == digest:
+            return None
+        self._pending[key] = digest
+        return ADDED if previous is None else CHANGED
+
+    def save(self):
+        '''
+        Merges what has been recorded into the file, replacing it
+        atomically
+        '''
+        if not self._pending:
+            return
+        self._ensure_loaded()
+        added = []
+        for key, digest in self._pending.items():
+            i = self._find(key)
+            if i is None:
+                added.append((key, digest))
+            else:
+                self._digests[i] = digest
+        if added:
+            added.sort()
+            keys, digests = array('q'), array('q')
+            for key, digest in heapq.merge(zip(self._keys, self._digests),
+                                           added):
+                keys.append(key)
+                digests.append(digest)
+            self._keys, self._digests = keys, digests
+        self._pending = {}
+        self._write()
+
+    def _write(self):
+        keys, digests = self._keys, self._digests
+        if sys.byteorder != 'little':
+            keys, digests = array('q', keys), array('q', digests)
+            keys.byteswap()
+            digests.byteswap()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(keys)))
+            keys.tofile(f)
+            digests.tofile(f)
+        os.replace(tmp, self.path)
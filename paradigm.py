@@ -0,0 +1,149 @@
+# Name:    paradigm.py
+# Purpose: compact storage for conjugated paradigms
+#
+# A regular paradigm is one verb stem combined with parts that are
+# the same for every verb of its group: pronouns, auxiliaries and
+# endings.  CompactParadigm keeps only the stem and a reference to a
+# shared Template, and rebuilds the person tuples on access, so large
+# in-memory decks don't hold millions of copies of 'il/elle/on'.
+
+import sys
+
+
+class Template:
+    '''
+    The verb-independent parts of a paradigm.  For every person the
+    last part of the tuple is head + stem + tail, everything before
+    it is fixed
+    '''
+    __slots__ = ('cls', 'part_cls', 'persons')
+
+    def __init__(self, cls, part_cls, persons):
+        self.cls = cls
+        self.part_cls = part_cls
+        self.persons = persons
+
+    @classmethod
+    def from_inflection(cls, inflection, stem):
+        '''
+        Derives the template from one conjugated paradigm and the stem
+        it was built from.  Returns None if some person's form doesn't
+        begin or end with the stem
+        '''
+        persons = []
+        for parts in inflection:
+            last = parts[-1]
+            if last.startswith(stem):
+                head, tail = '', last[len(stem):]
+            elif stem and last.endswith(stem):
+                head, tail = last[:-len(stem)], ''
+            else:
+                return None
+            persons.append((tuple(sys.intern(p) for p in parts[:-1]),
+                            sys.intern(head), sys.intern(tail)))
+        return cls(type(inflection), type(inflection[0]), tuple(persons))
+
+
+class CompactParadigm:
+    '''
+    Stands in for the namedtuple returned by construct_inflection:
+    iterating, indexing and the person attributes (.fps ... .tpp)
+    give the same tuples, built on demand from the stem and template
+    '''
+    __slots__ = ('template', 'stem')
+
+    def __init__(self, template, stem):
+        self.template = template
+        self.stem = stem
+
+    def _person(self, i):
+        prefix, head, tail = self.template.persons[i]
+        parts = prefix + (head + self.stem + tail,)
+        part_cls = self.template.part_cls
+        return parts if part_cls is tuple else part_cls._make(parts)
+
+    def __len__(self):
+        return len(self.template.persons)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self)[i]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('paradigm index out of range')
+        return self._person(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._person(i)
+
+    def __getattr__(self, name):
+        try:
+            i = self.template.cls._fields.index(name)
+        except (AttributeError, ValueError):
+            raise AttributeError(name) from None
+        return self._person(i)
+
+    @property
+    def _fields(self):
+        return self.template.cls._fields
+
+    def expand(self):
+        '''
+        The equivalent namedtuple
+        '''
+        return self.template.cls._make(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (tuple, CompactParadigm)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return 'Compact' + repr(self.expand())
+
+
+def compact_builder(build, stem_of, key=None):
+    '''
+    Wraps a batch builder (infinitive -> inflection) so it returns
+    CompactParadigms.  The template is derived from the first verb
+    seen for each key(infinitive); verbs whose forms can't be expressed
+    as stem plus template fall back to the full inflection
+    '''
+    templates = {}
+
+    def build_compact(infinitive):
+        stem = stem_of(infinitive)
+        k = key(infinitive) if key else None
+        template = templates.get(k)
+        if template is None:
+            inflection = build(infinitive)
+            template = Template.from_inflection(inflection, stem)
+            if template is None:
+                return inflection
+            templates[k] = template
+        return CompactParadigm(template, stem)
+    return build_compact
+
+
+def deep_sizeof(obj, seen=None):
+    '''
+    Bytes used by obj and everything it references that hasn't
+    already been counted, for comparing representations
+    '''
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, (CompactParadigm, Template)):
+        size += sum(deep_sizeof(getattr(obj, slot), seen)
+                    for slot in type(obj).__slots__)
+    return size
@@ -0,0 +1,261 @@
+# Name:    paradigm_file.py
+# Purpose: read-only binary file of conjugated paradigms, memory-mapped
+#          so worker processes share one copy in the page cache
+#
+# Layout (little-endian, every section 8-byte aligned):
+#
+#   header     magic, format version, entry count n, string count s,
+#              shared string count, record words r, string bytes
+#   hashes     n x u64   hash of each 'language<US>infinitive<US>tense'
+#                        key, sorted
+#   entries    n x 2 u32 key string id, offset of the record in words
+#   records    r x u32   per entry: person count, parts per person, then
+#                        the string id of every part
+#   offsets    s+1 x u32 start of each string in the string data
+#   strings    UTF-8 string data, every distinct pronoun, auxiliary,
+#              form and key once
+#
+# A lookup bisects the hashes in place and decodes only the strings of
+# the paradigm it returns, so opening a file costs next to nothing
+# however large it is, and nothing is copied into the heap but the
+# answer.  The exception is the handful of strings shared by many
+# paradigms (pronouns, auxiliaries, common endings), which get the
+# lowest ids and are decoded once when the file is opened.
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+import exporter
+import languages.french as French
+import languages.spanish as Spanish
+
+MAGIC = b'VTPF'
+# Stored in saved files so a file written by an incompatible version
+# is rejected instead of misread
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sIIIIQQ')
+_HEADER_SIZE = 40
+_ALIGN = 8
+_KEY_SEPARATOR = '\x1f'
+# Strings used by at least this many paradigms are decoded up front
+_SHARED_USES = 64
+
+_PERSON_CLASSES = {'fr': French.Category, 'es': Spanish.SpanishCategory}
+
+
+def _key(language, infinitive, tense):
+    return _KEY_SEPARATOR.join((language, infinitive, tense))
+
+
+def _hash(key):
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), 'little')
+
+
+def _write_array(f, typecode, values):
+    '''
+    Writes values as a little-endian array, padded to _ALIGN
+    '''
+    data = array(typecode, values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    data.tofile(f)
+    f.write(b'\0' * (-f.tell() % _ALIGN))
+
+
+def build(path, paradigms):
+    '''
+    Writes (language, infinitive, tense, inflection) tuples, with
+    inflections as returned by construct_inflection, to a paradigm
+    file at path, replacing it atomically.  Returns the number of
+    paradigms written
+    '''
+    # key -> (persons, parts per person, every part in order)
+    flattened = {}
+    for language, infinitive, tense, inflection in paradigms:
+        width = len(inflection[0])
+        if any(len(parts) != width for parts in inflection):
+            raise ValueError('every person of a paradigm must have the '
+                             'same number of parts')
+        flattened[_key(language, infinitive, tense)] = (
+            len(inflection), width,
+            [part for parts in inflection for part in parts])
+    # how many paradigms each string appears in
+    uses = {}
+    for persons, width, parts in flattened.values():
+        for part in set(parts):
+            uses[part] = uses.get(part, 0) + 1
+    shared = sorted(part for part, count in uses.items()
+                    if count >= _SHARED_USES)
+    strings = {part: i for i, part in enumerate(shared)}
+    string_data = [part.encode('utf-8') for part in shared]
+
+    def string_id(s):
+        i = strings.get(s)
+        if i is None:
+            i = strings[s] = len(string_data)
+            string_data.append(s.encode('utf-8'))
+        return i
+
+    entries = []
+    records = []
+    for key, (persons, width, parts) in flattened.items():
+        entries.append((_hash(key.encode('utf-8')), string_id(key),
+                        len(records)))
+        records.append(persons)
+        records.append(width)
+        records.extend(string_id(part) for part in parts)
+    entries.sort()
+    offsets = [0]
+    for data in string_data:
+        offsets.append(offsets[-1] + len(data))
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(entries),
+                             len(string_data), len(shared), len(records),
+                             offsets[-1]))
+        f.write(b'\0' * (_HEADER_SIZE - _HEADER.size))
+        _write_array(f, 'Q', (h for h, _, _ in entries))
+        _write_array(f, 'I', (n for _, key_id, offset in entries
+                              for n in (key_id, offset)))
+        _write_array(f, 'I', records)
+        _write_array(f, 'I', offsets)
+        f.writelines(string_data)
+    os.replace(tmp, path)
+    return len(entries)
+
+
+def build_from_verbs(path, language, infinitives, tenses=None):
+    '''
+    Conjugates infinitives in tenses (all supported tenses by default)
+    and writes them to a paradigm file.  Returns the number of
+    paradigms written
+    '''
+    module = exporter.LANGUAGES[language]
+    if not tenses:
+        tenses = exporter.default_tenses(language)
+    return build(path, ((language, infinitive, tense, inflection)
+                        for infinitive, tense, inflection
+                        in module.conjugate_many(infinitives, tenses)))
+
+
+def _aligned(n):
+    return n + (-n % _ALIGN)
+
+
+class ParadigmFile:
+    '''
+    A paradigm file opened for lookups.  The file is mapped read-only
+    and never read into memory as a whole; close() unmaps it
+    '''
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _open(self):
+        if len(self._map) < _HEADER_SIZE:
+            raise ValueError('{} is not a paradigm file'.format(self.path))
+        magic, version, n, s, shared, words, size = _HEADER.unpack_from(
+            self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('{} is not a version {} paradigm file'
+                             .format(self.path, FORMAT_VERSION))
+        records_pos = _HEADER_SIZE + 16 * n
+        offsets_pos = records_pos + _aligned(4 * words)
+        self._strings_pos = offsets_pos + _aligned(4 * (s + 1))
+        if len(self._map) < self._strings_pos + size:
+            raise ValueError('{} is truncated'.format(self.path))
+        offsets = struct.unpack_from('<{}I'.format(shared + 1), self._map,
+                                     offsets_pos)
+        base = self._strings_pos
+        self._shared = [self._map[base + start:base + end].decode('utf-8')
+                        for start, end in zip(offsets, offsets[1:])]
+
+        view = memoryview(self._map)
+
+        def section(pos, length, fmt):
+            data = view[pos:pos + length]
+            if sys.byteorder == 'little':
+                return data.cast(fmt)
+            # the sections are little-endian: copy them swapped instead
+            data = array(fmt, data)
+            data.byteswap()
+            return data
+
+        self._hashes = section(_HEADER_SIZE, 8 * n, 'Q')
+        self._entries = section(_HEADER_SIZE + 8 * n, 8 * n, 'I')
+        self._records = section(records_pos, 4 * words, 'I')
+        self._offsets = section(offsets_pos, 4 * (s + 1), 'I')
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # views into the map have to go before it can be closed
+        for name in ('_hashes', '_entries', '_records', '_offsets'):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._map.close()
+
+    def _string_bytes(self, i):
+        # slicing the map copies just these bytes
+        base = self._strings_pos
+        return self._map[base + self._offsets[i]:base + self._offsets[i + 1]]
+
+    def _find(self, key):
+        encoded = key.encode('utf-8')
+        h = _hash(encoded)
+        i = bisect_left(self._hashes, h)
+        while i < len(self._hashes) and self._hashes[i] == h:
+            key_id = self._entries[2 * i]
+            if self._string_bytes(key_id) == encoded:
+                return self._entries[2 * i + 1]
+            i += 1
+        return None
+
+    def lookup(self, language, infinitive, tense):
+        '''
+        The paradigm as the language's person namedtuple of part
+        tuples, equal to what construct_inflection returned when the
+        file was built, or None if the file doesn't have it
+        '''
+        offset = self._find(_key(language, infinitive, tense))
+        if offset is None:
+            return None
+        persons, width = self._records[offset:offset + 2]
+        ids = self._records[offset + 2:offset + 2 + persons * width].tolist()
+        shared, offsets = self._shared, self._offsets
+        n, data, base = len(shared), self._map, self._strings_pos
+        parts = [shared[i] if i < n else
+                 data[base + offsets[i]:base + offsets[i + 1]].decode('utf-8')
+                 for i in ids]
+        persons = [tuple(parts[i:i + width])
+                   for i in range(0, len(parts), width)]
+        person_cls = _PERSON_CLASSES.get(language)
+        if person_cls is None or len(person_cls._fields) != len(persons):
+            return tuple(persons)
+        return person_cls._make(persons)
+
+    def __contains__(self, key):
+        '''
+        key is a (language, infinitive, tense) tuple
+        '''
+        return self._find(_key(*key)) is not None
@@ -0,0 +1,249 @@
+# Name:    profiling.py
+# Purpose: opt-in per-stage timing of the conjugation pipeline
+#
+# enable() swaps timed wrappers in for the stem rules, ending lookups,
+# pronoun resolution, conjugators and formatters, and for the
+# factories of the compiled builders and stem rules, so that what they
+# make is timed too; disable() puts the originals back.  Nothing is wrapped while profiling is off, so the
+# disabled cost is zero.  Either
+#
+#     with profiling.profile():
+#         ...
+#     profiling.report()
+#
+# or set VERB_TRAINER_PROFILE=1 when running VerbTrainer.py to get a
+# summary on stderr at exit.  VerbTrainer.py reaches the conjugators
+# and formatters through the module attributes, so its interactive and
+# export paths are covered by the same wrappers.  Threads (a threaded
+# export, the server's workers) record into the same stages; worker
+# processes of a parallel export record into their own copy and are
+# not reported.
+
+import atexit
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from functools import wraps
+
+PROFILE_ENV = 'VERB_TRAINER_PROFILE'
+
+# Timings kept per stage for the percentiles; beyond this a random
+# sample of the calls is kept
+MAX_SAMPLES = 4096
+
+StageStats = namedtuple('StageStats',
+                        'calls total_s mean_us p50_us p90_us p99_us')
+
+
+class _Stage:
+    __slots__ = ('calls', 'total', 'samples', 'lock')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def record(self, elapsed):
+        with self.lock:
+            self.calls += 1
+            self.total += elapsed
+            if len(self.samples) < MAX_SAMPLES:
+                self.samples.append(elapsed)
+            else:
+                i = random.randrange(self.calls)
+                if i < MAX_SAMPLES:
+                    self.samples[i] = elapsed
+
+    def stats(self):
+        with self.lock:
+            calls, total = self.calls, self.total
+            ordered = sorted(self.samples)
+
+        def pct(p):
+            return ordered[min(len(ordered) - 1,
+                               int(p / 100 * len(ordered)))] * 1e6
+        return StageStats(calls, total, total / calls * 1e6,
+                          pct(50), pct(90), pct(99))
+
+
+_stages = OrderedDict()
+# (owner, attribute or key, original) for everything currently wrapped
+_patched = []
+
+
+def _timed(name, func):
+    stage = _stages.setdefault(name, _Stage())
+    clock = time.perf_counter
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stage.record(clock() - start)
+    wrapper.profiling_stage = name
+    return wrapper
+
+
+def _timed_factory(name, factory):
+    '''
+    Wraps a function that makes functions, e.g. a compiled builder,
+    so that what it makes is timed as stage name, unless it is
+    already timed
+    '''
+    @wraps(factory)
+    def wrapper(*args, **kwargs):
+        made = factory(*args, **kwargs)
+        if getattr(made, 'profiling_stage', None) is not None:
+            return made
+        return _timed(name, made)
+    return wrapper
+
+
+def _targets():
+    '''
+    (stage name, owner, attribute) for every instrumented function.
+    Owners are modules, classes or dicts
+    '''
+    import exporter
+    import languages.french as French
+    import languages.spanish as Spanish
+    import verb_store
+
+    targets = []
+    for prefix, module in [('french', French), ('spanish', Spanish)]:
+        for tense in module._STEM_RULES:
+            targets.append((prefix + '.stem_rule', module._STEM_RULES, tense))
+        for name in ['construct_stem_and_ending', 'construct_inflection',
+                     'output_cloze', 'output_cloze_import',
+                     'output_normal_view']:
+            targets.append(('{}.{}'.format(prefix, name), module, name))
+    for name in ['tense_endings', 'endings_table', 'tense_names']:
+        targets.append(('store.' + name, verb_store.VerbStore, name))
+    targets.append(('exporter.export_deck', exporter, 'export_deck'))
+    return targets
+
+
+def _factory_targets():
+    '''
+    (stage name, owner, attribute) for every factory whose products
+    are instrumented: the builders the rule tables are compiled from,
+    and the stem rules French compiles from the loaded endings
+    '''
+    import languages.french as French
+    import languages.spanish as Spanish
+
+    return [('french.build', French, '_batch_builder'),
+            ('french.stem_rule', French, '_batch_stem_rule'),
+            ('spanish.build', Spanish, '_batch_builder')]
+
+
+def _get(owner, key):
+    return owner[key] if isinstance(owner, dict) else getattr(owner, key)
+
+
+def _set(owner, key, value):
+    if isinstance(owner, dict):
+        owner[key] = value
+    else:
+        setattr(owner, key, value)
+
+
+def enable():
+    '''
+    Starts recording.  Builders made by conjugate_many before this
+    call keep the unwrapped functions they captured
+    '''
+    if _patched:
+        return
+    import languages.french as French
+    import rule_table
+    for name, owner, key in _targets():
+        original = _get(owner, key)
+        _patched.append((owner, key, original))
+        _set(owner, key, _timed(name, original))
+    for name, owner, key in _factory_targets():
+        original = _get(owner, key)
+        _patched.append((owner, key, original))
+        _set(owner, key, _timed_factory(name, original))
+    # the pronoun lambdas live in an immutable Category, so the whole
+    # tuple is swapped
+    original = French._PRONOUNS
+    _patched.append((French, '_PRONOUNS', original))
+    French._PRONOUNS = original._make(_timed('french.pronoun', f)
+                                      for f in original)
+    # recompile so the rule tables pick up the wrappers
+    rule_table.invalidate()
+
+
+def disable():
+    '''
+    Stops recording and restores the original functions.  What has
+    been recorded so far is kept until reset()
+    '''
+    import rule_table
+    while _patched:
+        owner, key, original = _patched.pop()
+        _set(owner, key, original)
+    rule_table.invalidate()
+
+
+def enabled():
+    return bool(_patched)
+
+
+def reset():
+    _stages.clear()
+
+
+@contextmanager
+def profile():
+    '''
+    Records every stage for the duration of the with block
+    '''
+    was_enabled = enabled()
+    enable()
+    try:
+        yield
+    finally:
+        if not was_enabled:
+            disable()
+
+
+def summary():
+    '''
+    StageStats for every stage that has been called, keyed by name
+    '''
+    return OrderedDict((name, stage.stats())
+                       for name, stage in _stages.items() if stage.calls)
+
+
+def report(out=None):
+    out = out or sys.stderr
+    stats = summary()
+    if not stats:
+        print('No stages recorded', file=out)
+        return
+    width = max(len(name) for name in stats)
+    print('{:<{}} {:>10} {:>10} {:>9} {:>9} {:>9} {:>9}'.format(
+        'stage', width, 'calls', 'total s', 'mean us', 'p50 us', 'p90 us',
+        'p99 us'), file=out)
+    for name, s in stats.items():
+        print('{:<{}} {:>10,} {:>10.3f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}'
+              .format(name, width, *s), file=out)
+
+
+def enable_from_environment():
+    '''
+    Turns profiling on, with a report at exit, if VERB_TRAINER_PROFILE
+    is set to 1
+    '''
+    if os.environ.get(PROFILE_ENV, '0') == '1':
+        enable()
+        atexit.register(report)
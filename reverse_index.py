@@ -0,0 +1,178 @@
+# Name:    reverse_index.py
+# Purpose: map conjugated forms back to (infinitive, tense, person)
+
+import pickle
+import re
+import unicodedata
+from collections import namedtuple
+import conjugation_table
+import exporter
+
+Analysis = namedtuple('Analysis', 'language infinitive tense person')
+
+# Stored in saved files so an index written by an incompatible
+# version is rejected instead of misread
+FORMAT_VERSION = 1
+
+# Bit widths of the tense and person fields of a packed analysis
+_PERSON_BITS = 3
+_TENSE_BITS = 5
+_PERSON_MASK = (1 << _PERSON_BITS) - 1
+_TENSE_MASK = (1 << _TENSE_BITS) - 1
+
+# Spanish endings such as 'aste(s)' stand for two accepted spellings
+_OPTIONAL_SUFFIX = re.compile(r'^(.*)\((\w+)\)$')
+
+
+def fold(form):
+    '''
+    Lower-cases a form and strips its accents, so 'Parlâmes' and
+    'parlames' fold to the same key
+    '''
+    decomposed = unicodedata.normalize('NFD', form.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def spellings(form):
+    '''
+    All the spellings a generated form stands for
+    '''
+    match = _OPTIONAL_SUFFIX.match(form)
+    if match:
+        return [match.group(1), match.group(1) + match.group(2)]
+    return [form]
+
+
+class ReverseIndex:
+    '''
+    Exact and accent-insensitive lookup of every analysis of a
+    conjugated form.  Forms of compound tenses are indexed with their
+    auxiliary, e.g. 'ai parlé'.
+
+    To keep the index small and quick to load, each analysis is
+    packed into one int referring to shared tables of verbs, tenses
+    and persons, and the folded map only holds forms that folding
+    actually changes
+    '''
+    def __init__(self):
+        self._exact = {}
+        self._folded = {}
+        self._verbs = []
+        self._tenses = []
+        self._persons = []
+        self._verb_codes = {}
+        self._tense_codes = {}
+        self._person_codes = {}
+
+    def __len__(self):
+        return len(self._exact)
+
+    def add(self, language, infinitive, tense, inflection):
+        '''
+        Indexes every person of one inflection as returned by
+        construct_inflection
+        '''
+        verb = _code(self._verbs, self._verb_codes, (language, infinitive))
+        tense = _code(self._tenses, self._tense_codes, tense)
+        if tense > _TENSE_MASK:
+            raise ValueError('too many tenses for one index')
+        for person, parts in zip(inflection._fields, inflection):
+            _, form = conjugation_table.split_parts(parts)
+            person = _code(self._persons, self._person_codes, person)
+            code = ((verb << _TENSE_BITS) | tense) << _PERSON_BITS | person
+            for spelling in spellings(form):
+                self._add_code(spelling, code)
+
+    def _add_code(self, spelling, code):
+        codes = self._exact.get(spelling)
+        if codes is None:
+            self._exact[spelling] = code
+            folded = fold(spelling)
+            if folded != spelling:
+                self._folded.setdefault(folded, []).append(spelling)
+        elif isinstance(codes, int):
+            if codes != code:
+                self._exact[spelling] = (codes, code)
+        elif code not in codes:
+            self._exact[spelling] = codes + (code,)
+
+    def add_verbs(self, language, infinitives, tenses=None):
+        '''
+        Conjugates infinitives in tenses (all supported tenses by
+        default) with the language's generator and indexes the results
+        '''
+        module = exporter.LANGUAGES[language]
+        if not tenses:
+            tenses = exporter.default_tenses(language)
+        for infinitive, tense, inflection in module.conjugate_many(
+                infinitives, tenses):
+            self.add(language, infinitive, tense, inflection)
+
+    def lookup(self, form):
+        '''
+        Every analysis of exactly this form
+        '''
+        codes = self._exact.get(form)
+        if codes is None:
+            return []
+        if isinstance(codes, int):
+            return [self._analysis(codes)]
+        return [self._analysis(code) for code in codes]
+
+    def lookup_folded(self, form):
+        '''
+        Every analysis of any form that matches this one ignoring
+        case and accents
+        '''
+        folded = fold(form)
+        result = self.lookup(folded)
+        for spelling in self._folded.get(folded, ()):
+            result.extend(self.lookup(spelling))
+        return result
+
+    def _analysis(self, code):
+        person = self._persons[code & _PERSON_MASK]
+        code >>= _PERSON_BITS
+        tense = self._tenses[code & _TENSE_MASK]
+        language, infinitive = self._verbs[code >> _TENSE_BITS]
+        return Analysis(language, infinitive, tense, person)
+
+    def save(self, path):
+        state = (FORMAT_VERSION, self._exact, self._folded,
+                 self._verbs, self._tenses, self._persons)
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Reads an index written by save.  Only load files you wrote
+        yourself: the format is pickle
+        '''
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state[0] != FORMAT_VERSION:
+            raise ValueError('{} has index format {}, expected {}'
+                             .format(path, state[0], FORMAT_VERSION))
+        index = cls()
+        (_, index._exact, index._folded,
+         index._verbs, index._tenses, index._persons) = state
+        index._verb_codes = _codes_of(index._verbs)
+        index._tense_codes = _codes_of(index._tenses)
+        index._person_codes = _codes_of(index._persons)
+        return index
+
+
+def _code(table, codes, value):
+    '''
+    Position of value in table, appending it if it's new
+    '''
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(table)
+        table.append(value)
+    return code
+
+
+def _codes_of(table):
+    return {value: code for code, value in enumerate(table)}
@@ -0,0 +1,85 @@
+# Name:    rule_table.py
+# Purpose: conjugators precompiled per (verb type, tense)
+#
+# A RuleTable holds one function infinitive -> inflection for every
+# (verb type, tense) a language supports.  The endings, pronouns and
+# derived stems are worked out when the table is compiled, so a
+# conjugation is one dict lookup plus a stem and six or seven
+# concatenations.  The table is recompiled whenever the data it was
+# compiled from changes.
+
+import time
+
+# Every table created, so they can be recompiled together
+_TABLES = []
+
+
+class RuleTable:
+    '''
+    compile() returns the {(verb_type, tense): build} dict; version()
+    identifies the data it was compiled from and is checked at most
+    every check_interval seconds
+    '''
+    def __init__(self, compile, version, check_interval=0.0):
+        self._compile = compile
+        self._version = version
+        self.check_interval = check_interval
+        # (version, table), replaced as a whole so readers on other
+        # threads always see a matching pair
+        self._state = None
+        self._next_check = 0.0
+        self.compilations = 0
+        _TABLES.append(self)
+
+    def get(self, verb_type, tense):
+        '''
+        The compiled function for verb_type and tense, or None if the
+        language has no regular rule for them
+        '''
+        return self.table().get((verb_type, tense))
+
+    def table(self):
+        '''
+        The compiled table, recompiled first if its data has changed
+        '''
+        state = self._state
+        if state is None:
+            state = self._recompile()
+        elif self.check_interval:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                if self._version() != state[0]:
+                    state = self._recompile()
+        elif self._version() != state[0]:
+            state = self._recompile()
+        return state[1]
+
+    def _recompile(self):
+        table = self._compile()
+        # taken after compiling, since compiling may itself load the
+        # data the version describes
+        state = self._state = (self._version(), table)
+        self._next_check = time.monotonic() + self.check_interval
+        self.compilations += 1
+        return state
+
+    def invalidate(self):
+        self._state = None
+
+
+def invalidate():
+    '''
+    Forces every table to be recompiled on next use, e.g. after the
+    functions it was compiled from have been replaced
+    '''
+    for table in _TABLES:
+        table.invalidate()
+
+
+def fingerprint(*sources):
+    '''
+    Cheap identity of plain-data rule tables (dicts, tuples, strings)
+    for use as a version
+    '''
+    return hash(repr(sources))
@@ -0,0 +1,121 @@
+# Name:    schema.py
+# Purpose: versioned migrations of the verb_trainer database
+#
+# Each migration is a numbered SQL script in migrations/, applied in
+# order, inside its own transaction, to any database that hasn't had
+# it yet.  The ones applied are recorded in the schema_migrations
+# table.  The scripts only create what isn't there already, so they
+# also bring a database made by the old drop-and-recreate
+# verb_trainer.sql up to date without losing its rows.
+
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'migrations')
+
+Migration = namedtuple('Migration', 'version name path')
+
+_FILE_NAME = re.compile(r'(\d+)_(\w+)\.sql$')
+
+_CREATE_LOG = ('CREATE TABLE IF NOT EXISTS schema_migrations('
+               'version INTEGER PRIMARY KEY, name TEXT NOT NULL, '
+               'applied TEXT NOT NULL)')
+
+
+def migrations(directory=MIGRATIONS_DIR):
+    '''
+    Every migration in directory, in the order they are applied
+    '''
+    found = []
+    for file_name in os.listdir(directory):
+        match = _FILE_NAME.match(file_name)
+        if match:
+            found.append(Migration(int(match.group(1)), match.group(2),
+                                   os.path.join(directory, file_name)))
+    found.sort()
+    versions = [migration.version for migration in found]
+    if len(set(versions)) != len(versions):
+        raise ValueError('duplicate migration numbers in ' + directory)
+    return found
+
+
+def latest_version(directory=MIGRATIONS_DIR):
+    return migrations(directory)[-1].version
+
+
+def current_version(con):
+    '''
+    The highest migration applied to the database, 0 for none
+    '''
+    if con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                   "AND name = 'schema_migrations'").fetchone() is None:
+        return 0
+    return con.execute('SELECT COALESCE(MAX(version), 0) '
+                       'FROM schema_migrations').fetchone()[0]
+
+
+def migrate(path, target=None, directory=MIGRATIONS_DIR):
+    '''
+    Applies the migrations the database at path (created if missing)
+    hasn't had, up to and including target (by default all of them).
+    Returns the versions applied
+    '''
+    con = sqlite3.connect(path, isolation_level=None)
+    try:
+        con.execute(_CREATE_LOG)
+        version = current_version(con)
+        applied = []
+        for migration in migrations(directory):
+            if migration.version <= version:
+                continue
+            if target is not None and migration.version > target:
+                break
+            _apply(con, migration)
+            applied.append(migration.version)
+        return applied
+    finally:
+        con.close()
+
+
+def _apply(con, migration):
+    '''
+    Runs one migration script and records it, all or nothing
+    '''
+    with open(migration.path, encoding='utf-8') as f:
+        sql = f.read()
+    con.execute('BEGIN')
+    try:
+        for statement in _statements(sql):
+            con.execute(statement)
+        con.execute('INSERT INTO schema_migrations VALUES (?, ?, ?)',
+                    (migration.version, migration.name,
+                     time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())))
+    except BaseException:
+        con.execute('ROLLBACK')
+        raise
+    con.execute('COMMIT')
+
+
+def _statements(sql):
+    '''
+    Splits a script into complete statements, which execute() runs one
+    at a time (executescript() would commit before starting)
+    '''
+    statement = ''
+    for line in sql.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                yield statement
+            statement = ''
+    if statement.strip() and not _is_comment(statement):
+        raise ValueError('incomplete statement: ' + statement.strip())
+
+
+def _is_comment(text):
+    return all(not line.strip() or line.lstrip().startswith('--')
+               for line in text.splitlines())
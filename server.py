@@ -0,0 +1,345 @@
+# Name:    server.py
+# Purpose: local HTTP/JSON conjugation service for drill front-ends
+#
+# Endpoints (all responses are JSON):
+#
+#   GET  /health
+#   GET  /tenses?lang=fr
+#   POST /conjugate  {"lang": "fr", "infinitive": "parler",
+#                     "tense": "présent", "format": "forms"}
+#   POST /batch      {"lang": "fr", "format": "cloze",
+#                     "items": [["parler", "présent"], ...]}
+#
+# format is 'forms' (construct_inflection), 'cloze' (output_cloze) or
+# 'import' (output_cloze_import).  Results are objects keyed by person.
+#
+# The event loop only parses and routes requests.  Everything that
+# touches SQLite or the conjugators runs on a pool of worker threads,
+# each with its own connection, so a slow query holds up neither the
+# loop nor the other workers.  The workers use the server's own
+# VerbStore, with the endings preloaded in memory for the life of the
+# server, and leave the process-wide one alone.
+
+import asyncio
+import json
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import exporter
+import irregular
+import verb_store
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+
+# Largest request body and batch accepted
+MAX_BODY = 1 << 20
+MAX_BATCH = 5000
+
+FORMATS = ('forms', 'cloze', 'import')
+
+# What a client is told of a failure that isn't a RequestError; the
+# traceback goes to stderr
+_INTERNAL_ERROR = 'internal error'
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 413: 'Payload Too Large',
+            431: 'Request Header Fields Too Large',
+            500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    '''
+    A request the server can't answer, with the HTTP status to
+    report it as
+    '''
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ConjugationService:
+    '''
+    The blocking half of the server, called from the worker threads
+    '''
+    def __init__(self):
+        self._tenses = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def warm(self):
+        '''
+        Preloads the endings and tense lists before the first request
+        '''
+        store = verb_store.get_store()
+        store.endings_table()
+        for language in exporter.LANGUAGES:
+            self.tenses(language)
+
+    def tenses(self, language):
+        generation = verb_store.get_store().endings_version()
+        with self._lock:
+            if generation != self._generation:
+                self._tenses = {}
+                self._generation = generation
+            tenses = self._tenses.get(language)
+            if tenses is None:
+                tenses = self._tenses[language] = exporter.default_tenses(
+                    language)
+            return tenses
+
+    def conjugate(self, language, infinitive, tense, fmt):
+        module = exporter.LANGUAGES[language]
+        if not isinstance(infinitive, str) or \
+                infinitive[-2:] not in module.VERB_TYPES:
+            raise RequestError(400, '{!r} is not a regular infinitive'
+                                    .format(infinitive))
+        if tense not in self.tenses(language):
+            raise RequestError(400, 'unknown tense {!r}'.format(tense))
+        try:
+            conj = module.construct_inflection(infinitive, tense)
+        except irregular.MissingForms as e:
+            raise RequestError(400, str(e)) from None
+        if fmt == 'forms':
+            return {person: list(parts)
+                    for person, parts in zip(conj._fields, conj)}
+        if fmt == 'cloze':
+            lines = module.output_cloze(infinitive, tense, conj)
+        else:
+            lines = module.output_cloze_import(infinitive, tense, [], [],
+                                               conj)
+        return dict(zip(lines._fields, lines))
+
+    def batch(self, language, items, fmt):
+        '''
+        Conjugates every (infinitive, tense) pair.  A pair that is bad,
+        or that fails, gets an error entry instead of failing the whole
+        batch
+        '''
+        results = []
+        for infinitive, tense in items:
+            entry = {'infinitive': infinitive, 'tense': tense}
+            try:
+                entry['result'] = self.conjugate(language, infinitive,
+                                                 tense, fmt)
+            except RequestError as e:
+                entry['error'] = str(e)
+            except Exception:
+                traceback.print_exc()
+                entry['error'] = _INTERNAL_ERROR
+            results.append(entry)
+        return results
+
+
+class Server:
+    '''
+    Serves ConjugationService over HTTP/1.1 with keep-alive
+    '''
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 workers=DEFAULT_WORKERS):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.service = ConjugationService()
+        self.store = None
+        self._executor = None
+        self._server = None
+
+    async def start(self):
+        self.store = verb_store.VerbStore(verb_store.get_store().path,
+                                          preload=True)
+        self._executor = ThreadPoolExecutor(
+            self.workers, thread_name_prefix='verb-store',
+            initializer=verb_store.use_store, initargs=(self.store,))
+        await self._run(self.service.warm)
+        self._server = await asyncio.start_server(self._handle,
+                                                  self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._executor.shutdown()
+        self.store.close()
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, func, *args)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers, body = request
+                    keep_alive = _keep_alive(version, headers)
+                    status, payload = 200, await self._dispatch(method,
+                                                                target, body)
+                except RequestError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception:
+                    traceback.print_exc()
+                    status, payload = 500, {'error': _INTERNAL_ERROR}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == '/health':
+            _require(method, 'GET')
+            return {'status': 'ok'}
+        if url.path == '/tenses':
+            _require(method, 'GET')
+            language = _language(parse_qs(url.query).get('lang', [None])[0])
+            return {'lang': language,
+                    'tenses': await self._run(self.service.tenses, language)}
+        if url.path == '/conjugate':
+            _require(method, 'POST')
+            request = _json(body)
+            language, fmt = _language(request.get('lang')), _format(request)
+            infinitive, tense = request.get('infinitive'), request.get('tense')
+            result = await self._run(self.service.conjugate, language,
+                                     infinitive, tense, fmt)
+            return {'infinitive': infinitive, 'tense': tense,
+                    'result': result}
+        if url.path == '/batch':
+            _require(method, 'POST')
+            request = _json(body)
+            language, fmt = _language(request.get('lang')), _format(request)
+            items = _items(request.get('items'))
+            return {'results': await self._run(self.service.batch, language,
+                                               items, fmt)}
+        raise RequestError(404, 'no such endpoint {!r}'.format(url.path))
+
+
+async def _read_request(reader):
+    '''
+    Reads one request, returning (method, target, version, headers,
+    body), or None if the client closed the connection between
+    requests
+    '''
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise RequestError(400, 'incomplete request')
+    except asyncio.LimitOverrunError:
+        raise RequestError(431, 'request headers too large')
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise RequestError(400, 'malformed request line') from None
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError(400, 'bad Content-Length') from None
+    if length > MAX_BODY:
+        raise RequestError(413, 'request body over {} bytes'.format(MAX_BODY))
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+def _keep_alive(version, headers):
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = ('HTTP/1.1 {} {}\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            'Content-Length: {}\r\n'
+            'Connection: {}\r\n\r\n').format(
+                status, _REASONS[status], len(body),
+                'keep-alive' if keep_alive else 'close')
+    return head.encode('latin-1') + body
+
+
+def _require(method, expected):
+    if method != expected:
+        raise RequestError(405, 'use {}'.format(expected))
+
+
+def _json(body):
+    try:
+        request = json.loads(body.decode('utf-8'))
+    except ValueError:
+        raise RequestError(400, 'body is not valid JSON') from None
+    if not isinstance(request, dict):
+        raise RequestError(400, 'body must be a JSON object')
+    return request
+
+
+def _language(language):
+    if language not in exporter.LANGUAGES:
+        raise RequestError(400, 'lang must be one of {}'
+                                .format(', '.join(sorted(exporter.LANGUAGES))))
+    return language
+
+
+def _format(request):
+    fmt = request.get('format', 'forms')
+    if fmt not in FORMATS:
+        raise RequestError(400, 'format must be one of {}'
+                                .format(', '.join(FORMATS)))
+    return fmt
+
+
+def _items(items):
+    '''
+    Accepts [infinitive, tense] pairs or {"infinitive", "tense"}
+    objects
+    '''
+    if not isinstance(items, list):
+        raise RequestError(400, 'items must be a list')
+    if len(items) > MAX_BATCH:
+        raise RequestError(413, 'batches are limited to {} items'
+                                .format(MAX_BATCH))
+    pairs = []
+    for item in items:
+        if isinstance(item, dict):
+            pairs.append((item.get('infinitive'), item.get('tense')))
+        elif isinstance(item, list) and len(item) == 2:
+            pairs.append(tuple(item))
+        else:
+            raise RequestError(400, 'bad batch item {!r}'.format(item))
+    return pairs
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None,
+                workers=DEFAULT_WORKERS):
+    '''
+    Runs a Server until cancelled.  ready, if given, is called with
+    the started server, e.g. to report the port it is listening on
+    '''
+    server = Server(host, port, workers)
+    await server.start()
+    try:
+        if ready:
+            ready(server)
+        await server.serve_forever()
+    finally:
+        await server.close()
@@ -0,0 +1,141 @@
+# Name:    stem_changes.py
+# Purpose: stem- and spelling-changing verbs
+#
+# Every rule is keyed by a suffix of the infinitive: a few letters for a
+# spelling rule (-car), a whole infinitive for a stem-changing verb and
+# the compounds built on it (contar, recontar).  The rules are compiled
+# into a trie of reversed suffixes, so classifying an infinitive walks it
+# once from the last letter, whatever the number of rules.  Rules come
+# in groups (stem vowel, spelling) and in each group the longest suffix
+# matched wins, so an exception to a rule is a longer suffix with no
+# changes.
+#
+# A Change rewrites the root of the verb (the infinitive less its
+# two-letter ending) in the tenses and persons it covers, and optionally
+# only where the letters that follow the root in the regular form pass
+# a test: c becomes qu before e, not before a.
+
+from collections import namedtuple
+
+# Trie key of the entries of a node, which can't be a letter
+_ENTRIES = ''
+
+# Builds a namedtuple without going through its Python-level __new__
+_new = tuple.__new__
+
+# transform(root) returns the changed root.  It applies in tenses (None
+# for all) and persons (by name, None for all) where when(rest) is true
+# of what follows the root in the regular form (None for always)
+Change = namedtuple('Change', 'transform tenses persons when',
+                    defaults=(None, None, None))
+
+
+def vowel(old, new):
+    '''
+    Replaces the last old in the root: the vowel of its last syllable
+    '''
+    def transform(root):
+        head, found, tail = root.rpartition(old)
+        return head + new + tail if found else root
+    return transform
+
+
+def final(old, new):
+    '''
+    Replaces old at the end of the root
+    '''
+    def transform(root):
+        if root.endswith(old):
+            return root[:-len(old)] + new
+        return root
+    return transform
+
+
+def double(root):
+    '''
+    Doubles the root's last consonant
+    '''
+    return root + root[-1:]
+
+
+class RuleSet:
+    '''
+    The rules of one language, {group: [(suffix, changes)]}, compiled
+    for the persons of its inflections
+    '''
+    def __init__(self, persons, groups):
+        self.persons = persons
+        self._root = {}
+        self._groups = tuple(groups)
+        # every suffix that changes something, for str.endswith
+        self.suffixes = tuple(sorted({suffix
+                                      for rules in groups.values()
+                                      for suffix, changes in rules
+                                      if changes}))
+        for group, rules in groups.items():
+            for suffix, changes in rules:
+                node = self._root
+                for letter in reversed(suffix):
+                    node = node.setdefault(letter, {})
+                entries = node.setdefault(_ENTRIES, {})
+                entries[group] = tuple(self._compile(change)
+                                       for change in changes)
+
+    def _compile(self, change):
+        persons = change.persons
+        if persons is not None:
+            persons = frozenset(self.persons.index(p) for p in persons)
+        tenses = change.tenses
+        if tenses is not None:
+            tenses = frozenset(tenses)
+        return Change(change.transform, tenses, persons, change.when)
+
+    def classify(self, infinitive):
+        '''
+        The changes of an infinitive in the order they apply, () for
+        a verb without any
+        '''
+        found = {}
+        node = self._root
+        for letter in reversed(infinitive):
+            node = node.get(letter)
+            if node is None:
+                break
+            entries = node.get(_ENTRIES)
+            if entries:
+                found.update(entries)
+        if not found:
+            return ()
+        return tuple(change for group in self._groups
+                     for change in found.get(group, ()))
+
+    def apply(self, changes, infinitive, tense, inflection, patch):
+        '''
+        The inflection with changes applied to the forms they cover.
+        patch(parts, i, form) returns person i's parts with the verb
+        form replaced
+        '''
+        root = infinitive[:-2]
+        size = len(root)
+        parts = None
+        for i, person in enumerate(inflection):
+            form = person[-1]
+            if not form.startswith(root):
+                continue
+            rest = form[size:]
+            changed = root
+            for change in changes:
+                if change.tenses is not None and tense not in change.tenses:
+                    continue
+                if change.persons is not None and i not in change.persons:
+                    continue
+                if change.when is not None and not change.when(rest):
+                    continue
+                changed = change.transform(changed)
+            if changed != root:
+                if parts is None:
+                    parts = list(inflection)
+                parts[i] = patch(person, i, changed + rest)
+        if parts is None:
+            return inflection
+        return _new(type(inflection), parts)
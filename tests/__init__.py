@@ -0,0 +1,19 @@
+# Point the verb store at a freshly seeded database so the tests
+# don't depend on a verb_trainer.db in the working directory
+import atexit
+import os
+import shutil
+import tempfile
+import verb_store
+
+_DB_DIR = tempfile.mkdtemp(prefix='verb_trainer_tests_')
+TEST_DB = os.path.join(_DB_DIR, 'verb_trainer.db')
+
+verb_store.create_database(TEST_DB)
+verb_store.configure(TEST_DB)
+
+
+@atexit.register
+def _remove_test_db():
+    verb_store.get_store().close()
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
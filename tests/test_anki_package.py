@@ -0,0 +1,142 @@
+# Unit tests for writing Anki packages
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+import zipfile
+import VerbTrainer
+import anki_package
+import exporter
+import languages.french as French
+import languages.spanish as Spanish
+
+
+class TestAnkiPackage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'deck.apkg')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_collection(self, path=None):
+        '''
+        Unpacks the package and opens its collection
+        '''
+        with zipfile.ZipFile(path or self.path) as z:
+            self.assertEqual({}, json.loads(z.read('media')))
+            z.extract('collection.anki2', self.tmp.name)
+        con = sqlite3.connect(os.path.join(self.tmp.name, 'collection.anki2'))
+        self.addCleanup(con.close)
+        return con
+
+    def test_notes_match_cloze_output(self):
+        tenses = exporter.default_tenses('fr')
+        stats = anki_package.export_package(['parler', 'finir'], 'fr',
+                                            tenses, self.path)
+        expected = [(text, infinitive) for infinitive, tense, conj
+                    in French.conjugate_many(['parler', 'finir'], tenses)
+                    for text in French.output_cloze(infinitive, tense, conj)]
+        self.assertEqual((len(expected), len(expected)), stats)
+        con = self.open_collection()
+        self.assertEqual('ok', con.execute('PRAGMA integrity_check')
+                         .fetchone()[0])
+        rows = con.execute('SELECT flds, sfld, tags, csum FROM notes '
+                           'ORDER BY id').fetchall()
+        self.assertEqual([text + '\x1f\x1f' for text, _ in expected],
+                         [flds for flds, _, _, _ in rows])
+        self.assertEqual([' {} '.format(infinitive)
+                          for _, infinitive in expected],
+                         [tags for _, _, tags, _ in rows])
+        self.assertEqual([anki_package._checksum(sfld)
+                          for _, sfld, _, _ in rows],
+                         [csum for _, _, _, csum in rows])
+
+    def test_collection(self):
+        anki_package.export_package(['hablar'], 'es', ['presente'],
+                                    self.path, 'Spanish::Verbs')
+        con = self.open_collection()
+        ver, models, decks = con.execute(
+            'SELECT ver, models, decks FROM col').fetchone()
+        self.assertEqual(11, ver)
+        (model,) = json.loads(models).values()
+        self.assertEqual(list(anki_package.FIELDS),
+                         [field['name'] for field in model['flds']])
+        deck_ids = {deck['name']: deck['id']
+                    for deck in json.loads(decks).values()}
+        self.assertIn('Spanish::Verbs', deck_ids)
+        cards = con.execute('SELECT c.did, n.mid FROM cards c '
+                            'JOIN notes n ON n.id = c.nid').fetchall()
+        self.assertEqual(len(Spanish.construct_inflection('hablar',
+                                                          'presente')),
+                         len(cards))
+        self.assertEqual({(deck_ids['Spanish::Verbs'], model['id'])},
+                         set(cards))
+        self.assertEqual([(0, 0)], con.execute(
+            'SELECT DISTINCT type, queue FROM cards').fetchall())
+
+    def test_guids_stable(self):
+        guids = []
+        for name in ('first.apkg', 'second.apkg'):
+            path = os.path.join(self.tmp.name, name)
+            anki_package.export_package(['vendre'], 'fr', ['futur'], path)
+            con = self.open_collection(path)
+            guids.append([guid for (guid,) in con.execute(
+                'SELECT guid FROM notes ORDER BY id')])
+            con.close()
+        self.assertEqual(guids[0], guids[1])
+        self.assertEqual(anki_package.note_guid('fr', 'vendre', 'futur',
+                                                'fps'), guids[0][0])
+        self.assertEqual(len(guids[0]), len(set(guids[0])))
+
+    def test_batches(self):
+        stats = anki_package.write_package(
+            self.path, French.conjugate_many(['parler', 'aimer'],
+                                             ['présent', 'futur']),
+            'fr', 'Test', batch_size=5)
+        con = self.open_collection()
+        self.assertEqual(24, stats.notes)
+        self.assertEqual([(24, 24, 1, 24)], con.execute(
+            'SELECT COUNT(*), COUNT(DISTINCT nid), MIN(due), MAX(due) '
+            'FROM cards').fetchall())
+
+    def test_failed_export_leaves_nothing(self):
+        def paradigms():
+            yield from French.conjugate_many(['parler'], ['présent'])
+            raise RuntimeError('interrupted')
+        with self.assertRaises(RuntimeError):
+            anki_package.write_package(self.path, paradigms(), 'fr', 'Test')
+        self.assertEqual([], os.listdir(self.tmp.name))
+
+    def test_command(self):
+        verbs = os.path.join(self.tmp.name, 'verbs.txt')
+        with open(verbs, 'w', encoding='utf-8') as f:
+            f.write('hablar\nxyz\n')
+        with contextlib.redirect_stderr(io.StringIO()):
+            VerbTrainer.run_command(['export', '--lang', 'es', '--tenses',
+                                     'presente', verbs, '-o', self.path,
+                                     '--deck', 'Español'])
+        con = self.open_collection()
+        self.assertEqual(7, con.execute('SELECT COUNT(*) FROM notes')
+                         .fetchone()[0])
+        decks = json.loads(con.execute('SELECT decks FROM col').fetchone()[0])
+        self.assertIn('Español', [deck['name'] for deck in decks.values()])
+
+    def test_command_rejects_other_options(self):
+        for extra in (['--gzip'], ['--incremental'], ['--max-notes', '10']):
+            with self.subTest(extra=extra), \
+                    contextlib.redirect_stderr(io.StringIO()), \
+                    self.assertRaises(SystemExit):
+                VerbTrainer.parse_command(['export', '--lang', 'fr', 'verbs',
+                                           '-o', self.path] + extra)
+        with contextlib.redirect_stderr(io.StringIO()), \
+                self.assertRaises(SystemExit):
+            VerbTrainer.parse_command(['export', '--lang', 'fr', 'verbs',
+                                       '--deck', 'French'])
+
+
+if __name__ == '__main__':
+    unittest.main()
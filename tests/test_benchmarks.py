@@ -0,0 +1,56 @@
+# Unit tests for the benchmark regression check
+import io
+import unittest
+from unittest import mock
+from benchmarks import micro, parallel, threads
+
+
+class TestCompare(unittest.TestCase):
+    def test_flags_only_slowdowns_beyond_threshold(self):
+        baseline = {'a': {'ops_per_sec': 1000.0},
+                    'b': {'ops_per_sec': 1000.0},
+                    'c': {'ops_per_sec': 1000.0}}
+        results = {'a': {'ops_per_sec': 950.0},
+                   'b': {'ops_per_sec': 800.0},
+                   'c': {'ops_per_sec': 1500.0},
+                   'new': {'ops_per_sec': 1.0}}
+        self.assertEqual([('b', 1000.0, 800.0)],
+                         micro.compare(results, baseline, 0.10))
+
+    def test_time_case(self):
+        result = micro.time_case(lambda verb, tense: None, ['x'], 'présent',
+                                 batch=10, batches=5)
+        self.assertGreater(result['ops_per_sec'], 0)
+        self.assertLessEqual(result['p50_us'], result['p99_us'])
+
+
+class TestThreadsReport(unittest.TestCase):
+    def test_says_when_scaling_cant_show(self):
+        results = {'fr': [(1, 1000.0), (2, 1000.0)]}
+        for gil, cpus, warned in ((True, 8, True), (False, 1, True),
+                                  (False, 8, False)):
+            out = io.StringIO()
+            with mock.patch.object(threads, 'gil_enabled',
+                                   return_value=gil), \
+                    mock.patch('os.cpu_count', return_value=cpus):
+                threads.report(results, out)
+            with self.subTest(gil=gil, cpus=cpus):
+                self.assertEqual(warned, 'flat speed-up is expected'
+                                 in out.getvalue())
+
+
+class TestParallelReport(unittest.TestCase):
+    def test_says_when_speed_up_cant_show(self):
+        results = [(1, 1000.0), (4, 900.0)]
+        for cpus, warned in ((1, True), (8, False)):
+            out = io.StringIO()
+            with mock.patch('os.cpu_count', return_value=cpus):
+                parallel.report(results, out)
+            with self.subTest(cpus=cpus):
+                self.assertIn('0.90x', out.getvalue())
+                self.assertEqual(warned, 'only add overhead'
+                                 in out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# Unit tests for rebuilding exports from a build manifest
+import os
+import sqlite3
+import tempfile
+import unittest
+import VerbTrainer
+import exporter
+import inflection_cache
+import languages.spanish as Spanish
+import verb_store
+from build_manifest import ManifestStats
+from tests import TEST_DB
+
+
+class TestManifestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'verb_trainer.db')
+        verb_store.create_database(self.db)
+        verb_store.configure(self.db)
+        self.verbs = os.path.join(self.tmp.name, 'verbs.txt')
+        self.deck = os.path.join(self.tmp.name, 'deck.txt')
+
+    def tearDown(self):
+        verb_store.configure(TEST_DB)
+        inflection_cache.invalidate()
+        self.tmp.cleanup()
+
+    def build(self, language, verbs, tenses):
+        with open(self.verbs, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(verbs))
+        stats, _ = exporter.export_file_manifest(self.verbs, language,
+                                                 self.deck, tenses)
+        with open(self.deck, encoding='utf-8') as f:
+            return stats, f.read()
+
+    def full_export(self, language, tenses):
+        full = os.path.join(self.tmp.name, 'full.txt')
+        exporter.export_file(self.verbs, language, tenses, full)
+        with open(full, encoding='utf-8') as f:
+            return f.read()
+
+    def test_rebuild_reuses_everything(self):
+        tenses = ['présent', 'imparfait', 'passé composé']
+        stats, first = self.build('fr', ['parler', 'finir'], tenses)
+        self.assertEqual(ManifestStats(6, 0, 0), stats)
+        self.assertEqual(self.full_export('fr', tenses), first)
+        stats, second = self.build('fr', ['parler', 'finir'], tenses)
+        self.assertEqual(ManifestStats(0, 6, 0), stats)
+        self.assertEqual(first, second)
+
+    def test_added_and_removed_verbs(self):
+        tenses = ['présent', 'futur']
+        self.build('fr', ['parler', 'finir'], tenses)
+        stats, deck = self.build('fr', ['vendre', 'parler'], tenses)
+        self.assertEqual(ManifestStats(2, 2, 2), stats)
+        self.assertEqual(self.full_export('fr', tenses), deck)
+
+    def test_changed_ending_row(self):
+        tenses = ['présent', 'imparfait', 'futur']
+        self.build('fr', ['parler', 'vendre', 'attendre'], tenses)
+        with sqlite3.connect(self.db) as con:
+            con.execute("UPDATE tense_endings SET fpp = 'XXX' "
+                        "WHERE verb_type = 're' AND tense_id = 1")
+        con.close()
+        stats, deck = self.build('fr', ['parler', 'vendre', 'attendre'],
+                                 tenses)
+        # the présent and the imparfait, whose stem comes from the
+        # présent, of the two -re verbs
+        self.assertEqual(ManifestStats(4, 5, 0), stats)
+        self.assertIn('nous {{c1::vendXXX::vendre', deck)
+        self.assertEqual(self.full_export('fr', tenses), deck)
+
+    def test_changed_python_rules(self):
+        self.build('es', ['hablar', 'vivir'], ['presente', 'futuro simple'])
+        Spanish._ENDINGS['ar']['presente'] = \
+            Spanish._ENDINGS['ar']['presente']._replace(fps='X')
+        Spanish._RULES.invalidate()
+        inflection_cache.invalidate()
+        try:
+            stats, deck = self.build('es', ['hablar', 'vivir'],
+                                     ['presente', 'futuro simple'])
+            self.assertEqual(ManifestStats(1, 3, 0), stats)
+            self.assertEqual(self.full_export(
+                'es', ['presente', 'futuro simple']), deck)
+        finally:
+            Spanish._ENDINGS['ar']['presente'] = \
+                Spanish._ENDINGS['ar']['presente']._replace(fps='o')
+            Spanish._RULES.invalidate()
+
+    def test_touched_output_rebuilds_everything(self):
+        self.build('es', ['hablar'], ['presente'])
+        with open(self.deck, 'a', encoding='utf-8') as f:
+            f.write('edited by hand\n')
+        stats, deck = self.build('es', ['hablar'], ['presente'])
+        self.assertEqual(ManifestStats(1, 0, 0), stats)
+        self.assertNotIn('edited by hand', deck)
+
+    def test_fewer_tenses(self):
+        self.build('es', ['hablar', 'vivir'], ['presente', 'futuro simple'])
+        stats, deck = self.build('es', ['vivir'], ['futuro simple'])
+        self.assertEqual(ManifestStats(0, 1, 3), stats)
+        self.assertEqual(self.full_export('es', ['futuro simple']), deck)
+
+    def test_command(self):
+        with open(self.verbs, 'w', encoding='utf-8') as f:
+            f.write('hablar\n')
+        argv = ['export', '--lang', 'es', '--tenses', 'presente', '--reuse',
+                self.verbs, '-o', self.deck]
+        VerbTrainer.run_command(argv)
+        VerbTrainer.run_command(argv)
+        self.assertTrue(os.path.exists(self.deck + '.manifest'))
+        with open(self.deck, encoding='utf-8') as f:
+            self.assertEqual(self.full_export('es', ['presente']), f.read())
+
+    def test_needs_output_file(self):
+        with self.assertRaises(ValueError):
+            exporter.export_file_manifest(self.verbs, 'es', None)
+
+
+if __name__ == '__main__':
+    unittest.main()
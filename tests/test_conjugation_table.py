@@ -0,0 +1,77 @@
+# Unit tests for the materialised conjugations table
+import os
+import sqlite3
+import tempfile
+import unittest
+import conjugation_table
+import languages.spanish as Spanish
+import verb_store
+from tests import TEST_DB
+
+_ADD_VERB = ("INSERT INTO verbs(language_id, verb, aux, past_participle, "
+             "present_participle) VALUES ((SELECT language_id FROM languages "
+             "WHERE language_name = ?), ?, '', '', '')")
+
+
+class TestConjugationTable(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'verb_trainer.db')
+        verb_store.create_database(self.path)
+        verb_store.configure(self.path)
+        self.add_verbs(('française', 'parler'), ('française', 'vendre'),
+                       ('español', 'vivir'))
+
+    def tearDown(self):
+        verb_store.configure(TEST_DB)
+        self.tmp.cleanup()
+
+    def execute(self, sql, *params):
+        with sqlite3.connect(self.path) as con:
+            con.executemany(sql, params or [()])
+        con.close()
+
+    def add_verbs(self, *verbs):
+        self.execute(_ADD_VERB, *verbs)
+
+    def test_rows_match_conjugator(self):
+        conjugation_table.build()
+        rows = conjugation_table.fetch('française', 'vendre',
+                                       'subjonctif présent')
+        self.assertEqual(('fps', 'que je', 'vende'), rows[0])
+        self.assertEqual(("qu'ils/elles", 'vendent'), rows[5][1:])
+        rows = conjugation_table.fetch('française', 'parler', 'passé composé')
+        self.assertEqual(("j'", 'ai parlé'), rows[0][1:])
+        rows = conjugation_table.fetch('español', 'vivir', 'presente')
+        expected = Spanish.construct_inflection('vivir', 'presente')
+        self.assertEqual(list(expected), [row[1:] for row in rows])
+
+    def test_incremental(self):
+        self.assertEqual((3, 0, 0, 0), conjugation_table.build())
+        self.assertEqual((0, 3, 0, 0), conjugation_table.build())
+        self.add_verbs(('française', 'finir'), ('française', 'xyz'))
+        self.assertEqual((1, 3, 0, 1), conjugation_table.build())
+        self.execute("UPDATE verbs SET verb = 'parlar' "
+                     "WHERE verb = 'vivir'")
+        self.assertEqual((1, 3, 0, 1), conjugation_table.build())
+        self.execute('DELETE FROM verbs WHERE verb = ?', ('parlar',))
+        self.assertEqual((0, 3, 1, 1), conjugation_table.build())
+
+    def test_ending_change_rebuilds_verb_type(self):
+        conjugation_table.build()
+        self.execute("UPDATE tense_endings SET fps = 'X' "
+                     "WHERE verb_type = 're' AND tense_id = 1")
+        self.assertEqual((1, 2, 0, 0), conjugation_table.build())
+        rows = conjugation_table.fetch('française', 'vendre', 'présent')
+        self.assertEqual('vendX', rows[0].form)
+
+    def test_full_rebuild(self):
+        conjugation_table.build()
+        self.assertEqual((3, 0, 0, 0), conjugation_table.build(full=True))
+        count = verb_store.get_store().connection.execute(
+            'SELECT COUNT(*) FROM conjugations').fetchone()[0]
+        self.assertEqual(2 * 14 * 6 + 5 * 7, count)
+
+
+if __name__ == '__main__':
+    unittest.main()
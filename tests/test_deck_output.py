@@ -0,0 +1,140 @@
+# Unit tests for the compressed, sharded export targets
+import gzip
+import os
+import tempfile
+import unittest
+import unittest.mock
+import VerbTrainer
+import exporter
+from deck_output import (DeckWriter, OutputOptions, existing_paths,
+                         holds_notes, parse_size, shard_path)
+
+
+def read(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+class TestDeckWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_shard_path(self):
+        self.assertEqual('deck.001.txt.gz', shard_path('deck.txt.gz', 1))
+        self.assertEqual('out/deck.012.txt', shard_path('out/deck.txt', 12))
+        self.assertEqual('deck.003', shard_path('deck', 3))
+
+    def test_parse_size(self):
+        self.assertEqual(500, parse_size('500'))
+        self.assertEqual(64 << 10, parse_size('64K'))
+        self.assertEqual(10 << 20, parse_size('10mb'))
+
+    def test_gzip(self):
+        with DeckWriter(self.path('deck.txt'), compress=True,
+                        buffer_size=8) as out:
+            out.write('a\nb')
+            out.write('\nc\n')
+        self.assertEqual([self.path('deck.txt.gz')], out.paths)
+        self.assertEqual('a\nb\nc\n', read(out.paths[0]))
+        self.assertEqual(3, out.notes)
+
+    def test_rotates_by_notes_between_lines(self):
+        with DeckWriter(self.path('deck.txt.gz'), max_notes=2) as out:
+            out.write('1\n2\n3')
+            out.write('\n4\n5')
+        self.assertEqual(['1\n2\n', '3\n4\n', '5'],
+                         [read(path) for path in out.paths])
+        self.assertEqual(self.path('deck.003.txt.gz'), out.paths[-1])
+        self.assertEqual(5, out.notes)
+
+    def test_rotates_by_size(self):
+        with DeckWriter(self.path('deck.txt'), max_bytes=10) as out:
+            out.write('é' * 3 + '\n')       # 7 bytes
+            out.write('abc\n')              # 4 more would make 11
+            out.write('x' * 20 + '\n')      # too big alone: own shard
+            out.write('y\n')
+        self.assertEqual(['ééé\n', 'abc\n', 'x' * 20 + '\n', 'y\n'],
+                         [read(path) for path in out.paths])
+
+    def test_empty_output(self):
+        with DeckWriter(self.path('deck.txt.gz'), max_notes=5) as out:
+            pass
+        self.assertEqual('', read(out.paths[0]))
+
+    def test_removes_stale_shards(self):
+        with DeckWriter(self.path('deck.txt.gz'), max_notes=1) as out:
+            out.write('1\n2\n3\n')
+        with DeckWriter(self.path('deck.txt.gz'), max_notes=2) as out:
+            out.write('1\n2\n3\n')
+        self.assertEqual([self.path('deck.001.txt.gz'),
+                          self.path('deck.002.txt.gz')],
+                         existing_paths(self.path('deck.txt.gz')))
+        self.assertEqual(['1\n2\n', '3\n'],
+                         [read(path) for path in out.paths])
+        # and all of them when the export is no longer sharded
+        with DeckWriter(self.path('deck.txt.gz')) as out:
+            out.write('1\n')
+        self.assertEqual([self.path('deck.txt.gz')],
+                         existing_paths(self.path('deck.txt.gz')))
+
+    def test_existing_paths(self):
+        with DeckWriter(self.path('deck.txt.gz'), max_notes=1) as out:
+            out.write('1\n2\n')
+        with DeckWriter(self.path('deck.txt')) as out:
+            pass
+        self.assertEqual([self.path('deck.txt'), self.path('deck.001.txt.gz'),
+                          self.path('deck.002.txt.gz')],
+                         existing_paths(self.path('deck.txt')))
+        self.assertEqual([False, True, True],
+                         [holds_notes(path) for path in
+                          existing_paths(self.path('deck.txt'))])
+
+    def test_bad_limits(self):
+        with self.assertRaises(ValueError):
+            DeckWriter(self.path('deck.txt'), max_notes=0)
+
+
+class TestShardedExport(unittest.TestCase):
+    def test_matches_plain_export(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            verbs = os.path.join(tmp, 'verbs.txt')
+            with open(verbs, 'w', encoding='utf-8') as f:
+                f.write('parler\nfinir\nvendre\n')
+            plain = os.path.join(tmp, 'plain.txt')
+            exporter.export_file(verbs, 'fr', ['présent', 'futur'], plain)
+            written, _ = exporter.export_file(
+                verbs, 'fr', ['présent', 'futur'],
+                os.path.join(tmp, 'deck.txt'), workers=2, threads=True,
+                output_options=OutputOptions(True, 10))
+            shards = sorted(name for name in os.listdir(tmp)
+                            if name.startswith('deck.'))
+            self.assertEqual(['deck.{:03d}.txt.gz'.format(i)
+                              for i in range(1, 5)], shards)
+            self.assertEqual(read(plain), ''.join(
+                read(os.path.join(tmp, name)) for name in shards))
+            self.assertEqual(36, written)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            verbs = os.path.join(tmp, 'verbs.txt')
+            with open(verbs, 'w', encoding='utf-8') as f:
+                f.write('hablar\n')
+            deck = os.path.join(tmp, 'deck.txt.gz')
+            VerbTrainer.run_command(['export', '--lang', 'es', '--tenses',
+                                     'presente', verbs, '-o', deck])
+            self.assertEqual(7, len(read(deck).splitlines()))
+            with self.assertRaises(SystemExit), \
+                    unittest.mock.patch('sys.stderr'):
+                VerbTrainer.run_command(['export', '--lang', 'es', '--reuse',
+                                         verbs, '-o', deck])
+
+
+if __name__ == '__main__':
+    unittest.main()
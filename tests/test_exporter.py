@@ -0,0 +1,236 @@
+# Unit tests for the bulk Anki exporter
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import VerbTrainer
+import deck_output
+import exporter
+import inflection_cache
+import languages.french as French
+import languages.spanish as Spanish
+import note_index
+
+
+class TestExportDeck(unittest.TestCase):
+    def test_matches_output_cloze_import(self):
+        out = io.StringIO()
+        written = exporter.export_deck(['parler', 'vendre'], 'fr',
+                                       ['présent', 'passé composé'], out)
+        expected = []
+        for verb in ['parler', 'vendre']:
+            for tense in ['présent', 'passé composé']:
+                conj = French.construct_inflection(verb, tense)
+                expected.extend(French.output_cloze_import(verb, tense,
+                                                           [], [], conj))
+        self.assertEqual(expected, out.getvalue().splitlines())
+        self.assertEqual(len(expected), written)
+
+    def test_spanish(self):
+        out = io.StringIO()
+        exporter.export_deck(['hablar'], 'es', ['presente'], out)
+        conj = Spanish.construct_inflection('hablar', 'presente')
+        expected = Spanish.output_cloze_import('hablar', 'presente',
+                                               [], [], conj)
+        self.assertEqual(list(expected), out.getvalue().splitlines())
+
+    def test_parallel_matches_serial(self):
+        verbs = ['parler', 'finir', 'vendre', 'abandonner',
+                 'attendre', 'choisir', 'donner']
+        tenses = ['présent', 'subjonctif présent', 'plus-que-parfait']
+        serial = io.StringIO()
+        parallel = io.StringIO()
+        written = exporter.export_deck(verbs, 'fr', tenses, serial)
+        self.assertEqual(written,
+                         exporter.export_deck_parallel(verbs, 'fr', tenses,
+                                                       parallel, workers=2,
+                                                       chunk_size=2))
+        self.assertEqual(serial.getvalue(), parallel.getvalue())
+
+    def test_threads_match_serial(self):
+        verbs = ['parler', 'finir', 'vendre', 'abandonner',
+                 'attendre', 'choisir', 'donner']
+        tenses = ['présent', 'imparfait', 'subjonctif présent', 'futur']
+        serial = io.StringIO()
+        threaded = io.StringIO()
+        exporter.export_deck(verbs, 'fr', tenses, serial)
+        exporter.export_deck_parallel(verbs, 'fr', tenses, threaded,
+                                      workers=4, chunk_size=1, threads=True)
+        self.assertEqual(serial.getvalue(), threaded.getvalue())
+
+    def test_read_infinitives(self):
+        skipped = []
+        lines = ['parler\n', '\n', '# comment\n', '  finir \n', 'xyz\n']
+        actual = list(exporter.read_infinitives(lines, French.VERB_TYPES,
+                                                skipped.append))
+        self.assertEqual(['parler', 'finir'], actual)
+        self.assertEqual(['xyz'], skipped)
+
+    def test_skips_counted_not_kept(self):
+        reported = []
+        skipped = exporter.SkipCount(reported.append)
+        lines = ('xyz{}\n'.format(i) if i % 2 else 'parler\n'
+                 for i in range(10))
+        self.assertEqual(5, len(list(exporter.read_infinitives(
+            lines, French.VERB_TYPES, skipped))))
+        self.assertEqual(5, skipped.count)
+        self.assertEqual(['xyz1', 'xyz3'], reported[:2])
+
+
+class TestExportCommand(unittest.TestCase):
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            verbs = os.path.join(tmp, 'verbs.txt')
+            deck = os.path.join(tmp, 'deck.txt')
+            with open(verbs, 'w', encoding='utf-8') as f:
+                f.write('hablar\nvivir\n')
+            VerbTrainer.run_command(['export', '--lang', 'es',
+                                     '--tenses', 'presente, futuro simple',
+                                     verbs, '-o', deck])
+            with open(deck, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        self.assertEqual(2 * 2 * 7, len(lines))
+        self.assertEqual('yo {{c1::hablo::hablar, presente}}|||hablar',
+                         lines[0])
+
+    def test_skipped_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            verbs = os.path.join(tmp, 'verbs.txt')
+            with open(verbs, 'w', encoding='utf-8') as f:
+                f.write('hablar\nxyz\nvivir\nabc\n')
+            err = io.StringIO()
+            with contextlib.redirect_stderr(err):
+                VerbTrainer.run_command(['export', '--lang', 'es', verbs,
+                                         '-o', os.path.join(tmp, 'deck.txt')])
+            written, skipped = exporter.export_file(
+                verbs, 'es', ['presente'], os.path.join(tmp, 'deck2.txt'))
+        self.assertEqual((14, 2), (written, skipped))
+        self.assertEqual(["Skipped 'xyz': not a regular infinitive",
+                          "Skipped 'abc': not a regular infinitive"],
+                         err.getvalue().splitlines()[:2])
+
+    def test_irregular_tense_missing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            verbs = os.path.join(tmp, 'verbs.txt')
+            with open(verbs, 'w', encoding='utf-8') as f:
+                f.write('parler\nêtre\n')
+            err = io.StringIO()
+            with contextlib.redirect_stderr(err):
+                status = VerbTrainer.run_command(
+                    ['export', '--lang', 'fr', '--tenses', 'futur', verbs,
+                     '-o', os.path.join(tmp, 'deck.txt')])
+        self.assertEqual(2, status)
+        self.assertIn("export: no irregular forms of 'être' are stored for "
+                      "the futur", err.getvalue())
+
+    def test_unknown_tense(self):
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err), \
+                self.assertRaises(SystemExit) as raised:
+            VerbTrainer.parse_command(['export', '--lang', 'fr',
+                                       '--tenses', 'présent, futurr',
+                                       'verbs.txt'])
+        self.assertEqual(2, raised.exception.code)
+        self.assertIn("unknown tenses for --lang fr: futurr",
+                      err.getvalue())
+
+
+class TestIncrementalExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.verbs = os.path.join(self.tmp.name, 'verbs.txt')
+        self.deck = os.path.join(self.tmp.name, 'deck.txt')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def export(self, verbs):
+        with open(self.verbs, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(verbs))
+        stats, _ = exporter.export_file_incremental(
+            self.verbs, 'es', ['presente'], self.deck)
+        with open(self.deck, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        # as though imported into Anki
+        os.remove(self.deck)
+        return stats, lines
+
+    def test_only_new_notes_written(self):
+        stats, lines = self.export(['hablar'])
+        self.assertEqual((7, 0, 0), stats)
+        self.assertEqual(7, len(lines))
+        stats, lines = self.export(['hablar'])
+        self.assertEqual((0, 0, 7), stats)
+        self.assertEqual([], lines)
+        stats, lines = self.export(['hablar', 'vivir'])
+        self.assertEqual((7, 0, 7), stats)
+        self.assertTrue(all('vivir' in line for line in lines))
+
+    def test_changed_notes_rewritten(self):
+        self.export(['hablar', 'vivir'])
+        Spanish._ENDINGS['ar']['presente'] = \
+            Spanish._ENDINGS['ar']['presente']._replace(fps='X')
+        Spanish._RULES.invalidate()
+        inflection_cache.invalidate()
+        try:
+            stats, lines = self.export(['hablar', 'vivir'])
+        finally:
+            Spanish._ENDINGS['ar']['presente'] = \
+                Spanish._ENDINGS['ar']['presente']._replace(fps='o')
+            Spanish._RULES.invalidate()
+            inflection_cache.invalidate()
+        self.assertEqual(note_index.ExportStats(0, 1, 13), stats)
+        self.assertEqual(['yo {{c1::hablX::hablar, presente}}|||hablar'],
+                         lines)
+
+    def test_keeps_unimported_notes(self):
+        with open(self.verbs, 'w', encoding='utf-8') as f:
+            f.write('hablar\n')
+        exporter.export_file_incremental(self.verbs, 'es', ['presente'],
+                                         self.deck)
+        with open(self.deck, encoding='utf-8') as f:
+            before = f.read()
+        with self.assertRaises(ValueError):
+            exporter.export_file_incremental(self.verbs, 'es', ['presente'],
+                                             self.deck)
+        with open(self.deck, encoding='utf-8') as f:
+            self.assertEqual(before, f.read())
+        # nor shards of it, compressed or not
+        os.remove(self.deck)
+        options = deck_output.OutputOptions(True, 3)
+        with open(self.verbs, 'w', encoding='utf-8') as f:
+            f.write('vivir\n')
+        exporter.export_file_incremental(self.verbs, 'es', ['presente'],
+                                         self.deck, None, options)
+        with self.assertRaises(ValueError):
+            exporter.export_file_incremental(self.verbs, 'es', ['presente'],
+                                             self.deck, None, options)
+        with self.assertRaises(ValueError):
+            exporter.export_file_incremental(self.verbs, 'es', ['presente'],
+                                             self.deck)
+
+    def test_stdout_needs_index(self):
+        with self.assertRaises(ValueError):
+            exporter.export_file_incremental(self.verbs, 'es')
+
+    def test_command(self):
+        with open(self.verbs, 'w', encoding='utf-8') as f:
+            f.write('hablar\n')
+        index = os.path.join(self.tmp.name, 'notes.index')
+        argv = ['export', '--lang', 'es', '--tenses', 'presente',
+                '--incremental', '--index', index, self.verbs, '-o', self.deck]
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            self.assertEqual(0, VerbTrainer.run_command(argv))
+            self.assertEqual(2, VerbTrainer.run_command(argv))
+        self.assertTrue(os.path.exists(index))
+        self.assertIn('still holds notes', err.getvalue())
+        os.remove(self.deck)
+        with contextlib.redirect_stderr(err):
+            self.assertEqual(0, VerbTrainer.run_command(argv))
+        self.assertEqual(0, os.path.getsize(self.deck))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,10 @@
 # Author: Michael Ealem
 
 import unittest
+import inflection_cache
+import irregular
 import languages.french as French
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from category import Category
 
@@ -408,6 +411,80 @@ class TestClozeDeletionOutputRules(unittest.TestCase):
             self.assertEqual(expected.tpp, actual.tpp)
 
 
+class TestConjugateMany(unittest.TestCase):
+    def test_matches_construct_inflection(self):
+        verbs = ['parler', 'finir', 'vendre', 'abandonner', 'obéir']
+        tenses = list(French._STEM_RULES) + list(French._COMPOUND_TENSE)
+        actual = list(French.conjugate_many(verbs, tenses))
+        self.assertEqual(len(verbs) * len(tenses), len(actual))
+        for infinitive, tense, inflection in actual:
+            with self.subTest(verb=infinitive, tense=tense):
+                self.assertEqual(French.construct_inflection(infinitive,
+                                                             tense),
+                                 inflection)
+
+    def test_input_order(self):
+        verbs = ['vendre', 'parler', 'finir', 'attendre']
+        tenses = ['futur', 'présent']
+        actual = [(inf, tense) for inf, tense, _ in
+                  French.conjugate_many(iter(verbs), tenses)]
+        expected = [(inf, tense) for inf in verbs for tense in tenses]
+        self.assertEqual(expected, actual)
+
+    def test_not_an_infinitive(self):
+        with self.assertRaises(ValueError):
+            list(French.conjugate_many(['parlar'], ['présent']))
+
+
+class TestConjugateAllTenses(unittest.TestCase):
+    def test_matches_construct_inflection(self):
+        # regular and stem-changing
+        for infinitive in ['parler', 'finir', 'vendre', 'aimer', 'acheter',
+                           'appeler', 'commencer', 'préférer']:
+            actual = French.conjugate_all_tenses(infinitive)
+            self.assertEqual(French._RULES.table()[French._PARADIGMS]
+                             ['er'].tenses, list(actual))
+            for tense, inflection in actual.items():
+                with self.subTest(verb=infinitive, tense=tense):
+                    self.assertEqual(
+                        French.construct_inflection(infinitive, tense),
+                        inflection)
+
+    def test_every_tense(self):
+        actual = French.conjugate_all_tenses('finir')
+        self.assertEqual(14, len(actual))
+        self.assertEqual(('je', 'finirai'), actual['futur'].fps)
+        self.assertEqual(('que', 'je', 'finisse'),
+                         actual['subjonctif présent'].fps)
+        self.assertEqual(('ils/elles', 'ont', 'fini'),
+                         actual['passé composé'].tpp)
+
+    def test_not_an_infinitive(self):
+        with self.assertRaises(ValueError):
+            French.conjugate_all_tenses('parlar')
+
+    def test_irregular_tenses_missing(self):
+        # only the présent of être and aller is stored
+        for infinitive in ['être', 'aller']:
+            with self.subTest(verb=infinitive), \
+                    self.assertRaises(irregular.MissingForms):
+                French.conjugate_all_tenses(infinitive)
+
+
+class TestThreads(unittest.TestCase):
+    def test_concurrent_matches_serial(self):
+        verbs = ['parler', 'finir', 'vendre', 'abandonner', 'obéir',
+                 'attendre', 'choisir', 'aimer']
+        tenses = list(French._STEM_RULES) + list(French._COMPOUND_TENSE)
+        pairs = [(verb, tense) for verb in verbs for tense in tenses] * 4
+        inflection_cache.invalidate()
+        with ThreadPoolExecutor(8) as pool:
+            concurrent = list(pool.map(
+                lambda pair: French.construct_inflection(*pair), pairs))
+        inflection_cache.invalidate()
+        serial = [French.construct_inflection(*pair) for pair in pairs]
+        self.assertEqual(serial, concurrent)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,137 @@
+# Unit tests for the conjugation caches
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import inflection_cache
+import languages.french as French
+import languages.spanish as Spanish
+import verb_store
+from tests import TEST_DB
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction_order(self):
+        cache = inflection_cache.LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual((3, 1, 1, 0, 2, 2), tuple(cache.stats()))
+
+    def test_resize(self):
+        cache = inflection_cache.LRUCache(3)
+        for key in 'abc':
+            cache.put(key, key)
+        cache.resize(1)
+        self.assertEqual(1, cache.stats().size)
+        self.assertEqual(2, cache.stats().evictions)
+        self.assertEqual('c', cache.get('c'))
+
+    def test_concurrent_use(self):
+        cache = inflection_cache.LRUCache(8)
+        errors = []
+
+        def hammer(offset):
+            try:
+                for i in range(5000):
+                    key = (i + offset) % 12
+                    if cache.get(key) is None:
+                        cache.put(key, key)
+                    if i % 1000 == 0:
+                        cache.clear()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=hammer, args=(n,))
+                   for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        stats = cache.stats()
+        self.assertEqual(8 * 5000, stats.hits + stats.misses)
+        self.assertLessEqual(stats.size, 8)
+
+    def test_stale_put_is_dropped(self):
+        cache = inflection_cache.LRUCache(8)
+        cache.validate(1)
+        cache.validate(2)
+        cache.put('a', 'computed under 1', 1)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 'computed under 2', 2)
+        self.assertEqual('computed under 2', cache.get('a'))
+
+
+class TestMemoize(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+        self.version = 1
+
+        def square(x):
+            self.calls += 1
+            return x * x
+
+        self.square = inflection_cache.memoize(
+            'test.square', lambda: self.version)(square)
+
+    def tearDown(self):
+        del inflection_cache._CACHES['test.square']
+
+    def test_hits_and_misses(self):
+        self.assertEqual(4, self.square(2))
+        self.assertEqual(4, self.square(2))
+        self.assertEqual(1, self.calls)
+        stats = inflection_cache.stats()['test.square']
+        self.assertEqual((1, 1), (stats.hits, stats.misses))
+
+    def test_version_change_invalidates(self):
+        self.square(2)
+        self.version = 2
+        self.square(2)
+        self.assertEqual(2, self.calls)
+        self.assertEqual(1, self.square.cache.stats().invalidations)
+
+    def test_disabled(self):
+        self.square.cache.resize(0)
+        self.square(2)
+        self.square(2)
+        self.assertEqual(2, self.calls)
+        self.assertEqual(0, self.square.cache.stats().hits)
+
+
+class TestConjugatorCaches(unittest.TestCase):
+    def test_spanish_repeat_is_hit(self):
+        cache = Spanish.construct_inflection.cache
+        Spanish.construct_inflection('cantar', 'presente')
+        hits = cache.hits
+        self.assertEqual(Spanish.construct_inflection('cantar', 'presente'),
+                         Spanish.construct_inflection.__wrapped__('cantar',
+                                                                  'presente'))
+        self.assertEqual(hits + 1, cache.hits)
+
+    def test_french_invalidated_by_ending_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'verb_trainer.db')
+            verb_store.create_database(path)
+            store = verb_store.configure(path)
+            try:
+                self.assertEqual('parle', French.construct_inflection(
+                    'parler', 'présent').fps.verb)
+                with sqlite3.connect(path) as con:
+                    con.execute("UPDATE tense_endings SET fps = 'X' "
+                                "WHERE verb_type = 'er' AND tense_id = 1")
+                con.close()
+                store._next_check = 0.0
+                self.assertEqual('parlX', French.construct_inflection(
+                    'parler', 'présent').fps.verb)
+            finally:
+                verb_store.configure(TEST_DB)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+# Unit tests for the irregular forms overlay
+import os
+import sqlite3
+import tempfile
+import unittest
+import build_manifest
+import conjugation_table
+import irregular
+import languages.french as French
+import languages.spanish as Spanish
+import verb_loader
+import verb_store
+from tests import TEST_DB
+
+_INSERT = ('INSERT OR REPLACE INTO irregular_forms(language_id, verb, '
+           'tense_name, person, form) VALUES ((SELECT language_id '
+           'FROM languages WHERE language_name = ?), ?, ?, ?, ?)')
+
+
+class TestIrregular(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'verb_trainer.db')
+        verb_store.create_database(self.path)
+        self.store = verb_store.configure(self.path)
+
+    def tearDown(self):
+        verb_store.configure(TEST_DB)
+        self.tmp.cleanup()
+
+    def add(self, language_name, verb, tense, forms):
+        con = sqlite3.connect(self.path)
+        with con:
+            con.executemany(_INSERT, [(language_name, verb, tense, person,
+                                       form)
+                                      for person, form in forms.items()])
+        con.close()
+        self.store.reload()
+
+    def test_full_paradigm(self):
+        inflection = French.construct_inflection('être', 'présent')
+        self.assertEqual([('je', 'suis'), ('tu', 'es'), ('il/elle/on', 'est'),
+                          ('nous', 'sommes'), ('vous', 'êtes'),
+                          ('ils/elles', 'sont')], list(inflection))
+        self.assertEqual('suis', inflection.fps.verb)
+        self.assertEqual(('vos', 'sos'),
+                         Spanish.construct_inflection('ser', 'presente').spsv)
+
+    def test_partial_paradigm(self):
+        inflection = French.construct_inflection('aller', 'présent')
+        self.assertEqual(['vais', 'vas', 'va', 'allons', 'allez', 'vont'],
+                         [form for _, form in inflection])
+        inflection = Spanish.construct_inflection('tener', 'presente')
+        self.assertEqual(('vos', 'tenés'), inflection.spsv)
+
+    def test_missing_tenses_refused(self):
+        # only the présent is stored: the regular rules would give
+        # êtais, avoirai, sía and a passé composé of aller with avoir
+        for module, infinitive, tense in (
+                (French, 'être', 'imparfait'), (French, 'avoir', 'futur'),
+                (French, 'aller', 'passé composé'),
+                (Spanish, 'ser', 'pretérito imperfecto')):
+            with self.subTest(infinitive=infinitive, tense=tense):
+                with self.assertRaises(irregular.MissingForms):
+                    module.construct_inflection(infinitive, tense)
+                batch = module.conjugate_many(['parler', infinitive],
+                                              [tense])
+                next(batch)
+                with self.assertRaises(irregular.MissingForms):
+                    next(batch)
+        self.add('française', 'être', 'imparfait',
+                 dict(zip(('fps', 'sps', 'tps', 'fpp', 'spp', 'tpp'),
+                          'étais étais était étions étiez étaient'.split())))
+        self.assertEqual(('je', 'étais'),
+                         French.construct_inflection('être',
+                                                     'imparfait').fps)
+
+    def test_elision(self):
+        self.add('française', 'avoir', 'subjonctif présent',
+                 {'fps': 'aie', 'tps': 'ait'})
+        self.add('française', 'aller', 'passé composé',
+                 {'fps': 'suis allé', 'sps': 'es allé'})
+        inflection = French.construct_inflection('avoir',
+                                                  'subjonctif présent')
+        self.assertEqual(('que', "j'", 'aie'), inflection.fps)
+        self.assertEqual(("qu'", 'il/elle/on', 'ait'), inflection.tps)
+        inflection = French.construct_inflection('aller', 'passé composé')
+        self.assertEqual(('je', 'suis', 'allé'), inflection.fps)
+        self.assertEqual(('nous', 'avons', 'allé'), inflection.fpp)
+
+    def test_compound_form_must_have_auxiliary(self):
+        self.add('française', 'venir', 'passé composé', {'fps': 'venu'})
+        with self.assertRaises(ValueError):
+            French.construct_inflection('venir', 'présent')
+
+    def test_regular_verbs_unchanged(self):
+        self.assertEqual(("j'", 'aime'),
+                         French.construct_inflection('aimer', 'présent').fps)
+        self.assertEqual(('yo', 'hablo'),
+                         Spanish.construct_inflection('hablar',
+                                                      'presente').fps)
+        self.assertEqual('', French.irregular_overlay().fingerprint('aimer'))
+        self.assertNotIn('aimer', French.irregular_overlay().verbs)
+
+    def test_follows_database(self):
+        self.assertEqual(('yo', 'como'),
+                         Spanish.construct_inflection('comer', 'presente').fps)
+        self.add('español', 'comer', 'presente', {'fps': 'comí'})
+        self.assertEqual(('yo', 'comí'),
+                         Spanish.construct_inflection('comer', 'presente').fps)
+
+    def test_conjugate_many_matches(self):
+        for module, verbs, tenses in (
+                (French, ['parler', 'être', 'aller', 'finir'], ['présent']),
+                (Spanish, ['hablar', 'ser', 'ir', 'tener'], ['presente'])):
+            for compact in (False, True):
+                for infinitive, tense, inflection in module.conjugate_many(
+                        verbs, tenses, compact=compact):
+                    with self.subTest(infinitive=infinitive, tense=tense,
+                                      compact=compact):
+                        self.assertEqual(
+                            module.construct_inflection(infinitive, tense),
+                            inflection)
+
+    def test_stem_changes_outside_overlay(self):
+        # persons the overlay leaves out still get the stem changes, in
+        # batches as one at a time
+        self.add('française', 'appeler', 'présent', {'fps': 'appele'})
+        self.add('español', 'pensar', 'presente', {'fps': 'penso'})
+        for module, infinitive, tense in ((French, 'appeler', 'présent'),
+                                          (Spanish, 'pensar', 'presente')):
+            [(_, _, inflection)] = module.conjugate_many([infinitive],
+                                                         [tense])
+            self.assertEqual(module.construct_inflection(infinitive, tense),
+                             inflection)
+        self.assertEqual(("j'", 'appele'),
+                         French.construct_inflection('appeler',
+                                                     'présent').fps)
+        self.assertEqual(('ils/elles', 'appellent'),
+                         French.construct_inflection('appeler',
+                                                     'présent').tpp)
+        self.assertEqual(('él/ella/usted', 'piensa'),
+                         Spanish.construct_inflection('pensar',
+                                                      'presente').tps)
+
+    def test_irregular_verb_type(self):
+        # a full paradigm needs no regular verb type, a partial one does
+        full = dict(zip(('fps', 'sps', 'spsv', 'tps', 'fpp', 'spp', 'tpp'),
+                        'me voy,te vas,te vas,se va,nos vamos,os vais,'
+                        'se van'.split(',')))
+        self.add('español', 'irse', 'presente', full)
+        self.assertEqual(('yo', 'me voy'),
+                         Spanish.construct_inflection('irse', 'presente').fps)
+        self.add('español', 'oírse', 'presente', {'fps': 'me oigo'})
+        with self.assertRaisesRegex(ValueError, 'every person'):
+            Spanish.construct_inflection('hablar', 'presente')
+
+    def test_bad_rows_rejected(self):
+        self.add('française', 'parler', 'présent', {'xps': 'parle'})
+        with self.assertRaisesRegex(ValueError, 'unknown persons xps'):
+            French.construct_inflection('finir', 'présent')
+
+    def test_rebuilds_changed_verbs(self):
+        verb_loader.load(['parler\n', 'aller\n'], 'fr')
+        conjugation_table.build()
+        rows = conjugation_table.fetch('française', 'aller', 'présent')
+        self.assertEqual('vais', rows[0].form)
+        self.add('française', 'aller', 'futur', {'fps': 'irai'})
+        self.assertEqual((1, 1, 0, 0), conjugation_table.build())
+        rows = conjugation_table.fetch('française', 'aller', 'futur')
+        self.assertEqual(('fps', "j'", 'irai'), rows[0])
+        # no guesses for the tenses without forms
+        self.assertEqual([], conjugation_table.fetch('française', 'aller',
+                                                     'imparfait'))
+
+    def test_manifest_keys(self):
+        fingerprints = build_manifest.RuleFingerprints('es')
+        self.assertEqual('ir', fingerprints.key('vivir'))
+        self.assertNotEqual('ir', fingerprints.key('ir'))
+        self.assertNotEqual(fingerprints('ir', 'presente'),
+                            fingerprints(fingerprints.key('ir'), 'presente'))
+
+
+class TestOverlay(unittest.TestCase):
+    def test_verbs_and_fingerprint(self):
+        overlay = irregular.Overlay({('ser', 'presente'): ('a',),
+                                     ('ser', 'futuro simple'): ('b',),
+                                     ('ir', 'presente'): ('c',)})
+        self.assertEqual(frozenset(['ser', 'ir']), overlay.verbs)
+        self.assertIn("'b'", overlay.fingerprint('ser'))
+        self.assertNotEqual(overlay.fingerprint('ser'),
+                            overlay.fingerprint('ir'))
+        self.assertIsNone(overlay.get(('ser', 'imperativo')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# Unit tests for the incremental export note index
+import os
+import tempfile
+import unittest
+import note_index
+from note_index import ADDED, CHANGED, NoteIndex, note_digest, note_key
+
+
+class TestNoteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'deck.txt.index')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_check(self):
+        index = NoteIndex(self.path)
+        key = note_key('parler', 'présent', 'fps')
+        self.assertEqual(ADDED, index.check(key, note_digest('je parle')))
+        self.assertIsNone(index.check(key, note_digest('je parle')))
+        self.assertEqual(CHANGED, index.check(key, note_digest('je parlx')))
+        self.assertEqual(1, len(index))
+
+    def test_round_trip(self):
+        index = NoteIndex(self.path)
+        keys = [note_key('parler', 'présent', person)
+                for person in ('fps', 'sps', 'tps')]
+        for i, key in enumerate(keys):
+            index.check(key, i)
+        index.save()
+        reloaded = NoteIndex(self.path)
+        self.assertEqual([0, 1, 2], [reloaded.get(key) for key in keys])
+        self.assertIsNone(reloaded.get(note_key('finir', 'présent', 'fps')))
+
+    def test_save_merges_and_updates(self):
+        index = NoteIndex(self.path)
+        for key in range(0, 100, 2):
+            index.check(key, key)
+        index.save()
+        index = NoteIndex(self.path)
+        for key in range(-1, 101, 3):
+            index.check(key, -key)
+        index.save()
+        reloaded = NoteIndex(self.path)
+        self.assertEqual(len(set(range(0, 100, 2)) | set(range(-1, 101, 3))),
+                         len(reloaded))
+        self.assertEqual(sorted(reloaded._keys), list(reloaded._keys))
+        self.assertEqual(-8, reloaded.get(8))
+        self.assertEqual(4, reloaded.get(4))
+        self.assertEqual(1, reloaded.get(-1))
+
+    def test_loads_lazily(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not an index')
+        # nothing is read until the first lookup
+        index = NoteIndex(self.path)
+        with self.assertRaises(ValueError):
+            index.get(1)
+
+    def test_unchanged_save_leaves_file_alone(self):
+        index = NoteIndex(self.path)
+        index.check(1, 1)
+        index.save()
+        mtime = os.stat(self.path).st_mtime_ns
+        index = NoteIndex(self.path)
+        index.check(1, 1)
+        index.save()
+        self.assertEqual(mtime, os.stat(self.path).st_mtime_ns)
+
+    def test_stats(self):
+        self.assertEqual((1, 2, 3),
+                         tuple(note_index.ExportStats(1, 2, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
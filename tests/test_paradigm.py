@@ -0,0 +1,54 @@
+# Unit tests for the compact paradigm representation
+import unittest
+import paradigm
+import languages.french as French
+import languages.spanish as Spanish
+
+
+class TestCompactParadigm(unittest.TestCase):
+    def check_language(self, module, verbs, tenses):
+        regular = list(module.conjugate_many(verbs, tenses))
+        compact = list(module.conjugate_many(verbs, tenses, compact=True))
+        for (inf, tense, expected), (_, _, actual) in zip(regular, compact):
+            with self.subTest(verb=inf, tense=tense):
+                self.assertIsInstance(actual, paradigm.CompactParadigm)
+                self.assertEqual(expected, actual)
+                self.assertEqual(actual, expected)
+                self.assertEqual(expected.tpp, actual.tpp)
+                self.assertEqual(expected, actual.expand())
+                self.assertEqual(module.output_cloze(inf, tense, expected),
+                                 module.output_cloze(inf, tense, actual))
+
+    def test_french(self):
+        tenses = list(French._STEM_RULES) + list(French._COMPOUND_TENSE)
+        self.check_language(French, ['parler', 'abandonner', 'finir',
+                                     'obéir', 'vendre', 'attendre'], tenses)
+
+    def test_spanish(self):
+        tenses = list(Spanish._STEM_RULES) + ['pretérito perfecto']
+        self.check_language(Spanish, ['hablar', 'amar', 'vender', 'vivir'],
+                            tenses)
+
+    def test_attribute_access(self):
+        [(_, _, conj)] = French.conjugate_many(['parler'], ['présent'],
+                                               compact=True)
+        self.assertEqual('parle', conj.fps.verb)
+        self.assertEqual('ils/elles', conj.tpp.pronoun)
+        self.assertEqual(['je parle', 'tu parles', 'il/elle/on parle',
+                          'nous parlons', 'vous parlez', 'ils/elles parlent'],
+                         list(French.construct_simple_tense_output(conj)))
+        with self.assertRaises(AttributeError):
+            conj.nonexistent
+
+    def test_smaller(self):
+        verbs = ['v{:04d}er'.format(i) for i in range(200)]
+        regular = [conj for _, _, conj in
+                   French.conjugate_many(verbs, ['présent'])]
+        compact = [conj for _, _, conj in
+                   French.conjugate_many(verbs, ['présent'], compact=True)]
+        self.assertLess(paradigm.deep_sizeof(compact) * 3,
+                        paradigm.deep_sizeof(regular))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# Unit tests for the memory-mapped paradigm file
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import VerbTrainer
+import exporter
+import languages.french as French
+import languages.spanish as Spanish
+import paradigm_file
+from paradigm_file import ParadigmFile
+
+_FRENCH_VERBS = ['parler', 'finir', 'vendre', 'aimer', 'obéir', 'attendre']
+_SPANISH_VERBS = ['hablar', 'vender', 'vivir']
+
+
+def _lookup_in_child(path, key):
+    with ParadigmFile(path) as paradigms:
+        return tuple(paradigms.lookup(*key))
+
+
+class TestParadigmFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'paradigms.vtp')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_conjugators(self):
+        paradigms = []
+        for language, module, verbs in (('fr', French, _FRENCH_VERBS),
+                                        ('es', Spanish, _SPANISH_VERBS)):
+            for infinitive, tense, inflection in module.conjugate_many(
+                    verbs, exporter.default_tenses(language)):
+                paradigms.append((language, infinitive, tense, inflection))
+        self.assertEqual(len(paradigms),
+                         paradigm_file.build(self.path, paradigms))
+        with ParadigmFile(self.path) as f:
+            self.assertEqual(len(paradigms), len(f))
+            for language, infinitive, tense, inflection in paradigms:
+                with self.subTest(infinitive=infinitive, tense=tense):
+                    found = f.lookup(language, infinitive, tense)
+                    self.assertEqual(inflection, found)
+                    self.assertEqual(inflection._fields, found._fields)
+
+    def test_missing(self):
+        paradigm_file.build_from_verbs(self.path, 'es', ['hablar'],
+                                       ['presente'])
+        with ParadigmFile(self.path) as f:
+            self.assertIsNone(f.lookup('es', 'hablar', 'futuro simple'))
+            self.assertIsNone(f.lookup('fr', 'hablar', 'presente'))
+            self.assertIn(('es', 'hablar', 'presente'), f)
+            self.assertNotIn(('es', 'vivir', 'presente'), f)
+
+    def test_shared_strings_decoded_once(self):
+        verbs = ['parl{}er'.format(i) for i in range(80)]
+        paradigm_file.build_from_verbs(self.path, 'fr', verbs,
+                                       ['passé composé'])
+        with ParadigmFile(self.path) as f:
+            self.assertIn('ai', f._shared)
+            self.assertNotIn('parl1é', f._shared)
+            self.assertEqual(French.construct_inflection('parl7er',
+                                                         'passé composé'),
+                             f.lookup('fr', 'parl7er', 'passé composé'))
+
+    def test_rejects_other_files(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a paradigm file at all, not even close')
+        with self.assertRaises(ValueError):
+            ParadigmFile(self.path)
+        paradigm_file.build_from_verbs(self.path, 'es', ['hablar'])
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(data[:-10])
+        with self.assertRaises(ValueError):
+            ParadigmFile(self.path)
+
+    def test_other_process(self):
+        paradigm_file.build_from_verbs(self.path, 'fr', ['parler'],
+                                       ['présent'])
+        with ProcessPoolExecutor(1) as pool:
+            found = pool.submit(_lookup_in_child, self.path,
+                                ('fr', 'parler', 'présent')).result()
+        self.assertEqual(tuple(French.construct_inflection('parler',
+                                                           'présent')),
+                         found)
+
+    def test_command(self):
+        verbs = os.path.join(self.tmp.name, 'verbs.txt')
+        with open(verbs, 'w', encoding='utf-8') as f:
+            f.write('hablar\nvivir\nxyz\n')
+        VerbTrainer.run_command(['build-paradigms', '--lang', 'es',
+                                 '--tenses', 'presente', verbs,
+                                 '-o', self.path])
+        with ParadigmFile(self.path) as f:
+            self.assertEqual(2, len(f))
+            self.assertEqual(Spanish.construct_inflection('vivir',
+                                                          'presente'),
+                             f.lookup('es', 'vivir', 'presente'))
+
+
+if __name__ == '__main__':
+    unittest.main()
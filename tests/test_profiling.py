@@ -0,0 +1,86 @@
+# Unit tests for the per-stage profiling hooks
+import io
+import threading
+import unittest
+import inflection_cache
+import profiling
+import languages.french as French
+import languages.spanish as Spanish
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        profiling.reset()
+        inflection_cache.invalidate()
+
+    def tearDown(self):
+        profiling.disable()
+        profiling.reset()
+
+    def test_records_stages(self):
+        with profiling.profile():
+            conj = French.construct_inflection('finir', 'présent')
+            French.output_cloze('finir', 'présent', conj)
+            French.construct_stem_and_ending('finir', 'imparfait')
+            Spanish.construct_stem_and_ending('hablar', 'presente')
+        stats = profiling.summary()
+        self.assertEqual(1, stats['french.construct_inflection'].calls)
+        self.assertEqual(2, stats['french.construct_stem_and_ending'].calls)
+        self.assertEqual(1, stats['french.output_cloze'].calls)
+        self.assertEqual(1, stats['spanish.stem_rule'].calls)
+        self.assertIn('store.tense_endings', stats)
+        # présent stems of the compiled rules, plus the two above
+        self.assertGreaterEqual(stats['french.stem_rule'].calls, 3)
+        self.assertGreaterEqual(stats['french.pronoun'].calls, 6)
+
+    def test_compiled_builders(self):
+        with profiling.profile():
+            list(French.conjugate_many(['parler'], ['imparfait']))
+            before = profiling.summary()['french.stem_rule'].calls
+            list(French.conjugate_many(['aimer'], ['imparfait',
+                                                   'subjonctif présent']))
+            after = profiling.summary()['french.stem_rule'].calls
+            list(Spanish.conjugate_many(['hablar'], ['presente'],
+                                        compact=True))
+        # the imparfait and subjonctif présent stems compiled from the
+        # présent endings
+        self.assertEqual(2, after - before)
+        self.assertIn('spanish.build', profiling.summary())
+
+    def test_threads(self):
+        threads = [threading.Thread(target=lambda: [
+            French.construct_stem_and_ending('parler', 'présent')
+            for _ in range(2000)]) for _ in range(4)]
+        with profiling.profile():
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(8000, profiling.summary()[
+            'french.construct_stem_and_ending'].calls)
+
+    def test_disable_restores_originals(self):
+        stem_rule = French._STEM_RULES['présent']
+        pronouns = French._PRONOUNS
+        cloze = Spanish.output_cloze
+        batch_builder = French._batch_builder
+        profiling.enable()
+        self.assertIsNot(cloze, Spanish.output_cloze)
+        profiling.disable()
+        self.assertIs(stem_rule, French._STEM_RULES['présent'])
+        self.assertIs(pronouns, French._PRONOUNS)
+        self.assertIs(cloze, Spanish.output_cloze)
+        self.assertIs(batch_builder, French._batch_builder)
+        French.construct_inflection('parler', 'futur')
+        self.assertEqual({}, profiling.summary())
+
+    def test_report(self):
+        with profiling.profile():
+            Spanish.construct_stem_and_ending('vivir', 'futuro simple')
+        out = io.StringIO()
+        profiling.report(out)
+        self.assertIn('spanish.construct_stem_and_ending', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# Unit tests for the conjugated form -> infinitive index
+import os
+import tempfile
+import unittest
+import reverse_index
+from reverse_index import Analysis
+
+
+class TestReverseIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.index = reverse_index.ReverseIndex()
+        cls.index.add_verbs('fr', ['parler', 'vendre', 'finir'])
+        cls.index.add_verbs('es', ['hablar', 'vender', 'vivir'])
+
+    def test_exact(self):
+        self.assertEqual([Analysis('fr', 'parler', 'passé simple', 'fpp')],
+                         self.index.lookup('parlâmes'))
+        self.assertEqual([Analysis('es', 'vender',
+                                   'pretérito imperfecto', 'fpp')],
+                         self.index.lookup('vendíamos'))
+        self.assertEqual([], self.index.lookup('parlames'))
+
+    def test_ambiguous_form(self):
+        actual = self.index.lookup('finis')
+        self.assertIn(Analysis('fr', 'finir', 'présent', 'fps'), actual)
+        self.assertIn(Analysis('fr', 'finir', 'passé simple', 'sps'), actual)
+        self.assertEqual(4, len(actual))
+
+    def test_folded(self):
+        self.assertEqual([Analysis('fr', 'parler', 'passé simple', 'fpp')],
+                         self.index.lookup_folded('Parlames'))
+        self.assertIn(Analysis('es', 'vender', 'pretérito imperfecto', 'fpp'),
+                      self.index.lookup_folded('vendiamos'))
+
+    def test_compound_and_optional_spellings(self):
+        self.assertIn(Analysis('fr', 'parler', 'passé composé', 'tps'),
+                      self.index.lookup('a parlé'))
+        for form in ['hablaste', 'hablastes']:
+            with self.subTest(form=form):
+                self.assertIn(Analysis('es', 'hablar',
+                                       'pretérito indefinido', 'sps'),
+                              self.index.lookup(form))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'forms.idx')
+            self.index.save(path)
+            loaded = reverse_index.ReverseIndex.load(path)
+        self.assertEqual(len(self.index), len(loaded))
+        self.assertEqual(self.index.lookup_folded('vendiamos'),
+                         loaded.lookup_folded('vendiamos'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# Unit tests for the precompiled conjugation rule tables
+import os
+import sqlite3
+import tempfile
+import unittest
+import inflection_cache
+import languages.french as French
+import languages.spanish as Spanish
+import rule_table
+import verb_store
+from tests import TEST_DB
+
+_FRENCH_VERBS = ['parler', 'finir', 'vendre', 'abandonner', 'obéir',
+                 'attendre', 'consoler', 'aimer']
+_SPANISH_VERBS = ['hablar', 'vender', 'vivir', 'amar', 'comer', 'abrir']
+
+
+def french_step_by_step(infinitive, tense):
+    '''
+    construct_inflection as it was before the rule tables
+    '''
+    if tense in ['subjonctif présent', 'subjonctif imparfait']:
+        return French.construct_simple_tense_subjunctive(infinitive, tense)
+    if tense in ['subjonctif passé', 'subjonctif plus-que-parfait']:
+        return French.construct_compound_tense_subjunctive(infinitive, tense)
+    if tense in French._COMPOUND_TENSE:
+        return French.construct_compound_tense(infinitive, tense)
+    return French.construct_simple_tense(infinitive, tense)
+
+
+def spanish_step_by_step(infinitive, tense):
+    return Spanish.SpanishCategory._make(zip(
+        Spanish._PRONOUNS,
+        Spanish.construct_stem_and_ending(infinitive, tense)))
+
+
+class TestRuleTable(unittest.TestCase):
+    def test_recompiles_on_version_change(self):
+        version = [1]
+        table = rule_table.RuleTable(lambda: {('er', 't'): version[0]},
+                                     lambda: version[0])
+        self.assertEqual(1, table.get('er', 't'))
+        self.assertEqual(1, table.get('er', 't'))
+        self.assertIsNone(table.get('ir', 't'))
+        self.assertEqual(1, table.compilations)
+        version[0] = 2
+        self.assertEqual(2, table.get('er', 't'))
+        self.assertEqual(2, table.compilations)
+        rule_table._TABLES.remove(table)
+
+    def test_check_interval(self):
+        version = [1]
+        table = rule_table.RuleTable(lambda: {('er', 't'): version[0]},
+                                     lambda: version[0], check_interval=60)
+        table.get('er', 't')
+        version[0] = 2
+        self.assertEqual(1, table.get('er', 't'))
+        table.invalidate()
+        self.assertEqual(2, table.get('er', 't'))
+        rule_table._TABLES.remove(table)
+
+
+class TestCompiledConjugators(unittest.TestCase):
+    def setUp(self):
+        inflection_cache.invalidate()
+
+    def test_french_identical(self):
+        tenses = list(French._STEM_RULES) + list(French._COMPOUND_TENSE)
+        for verb in _FRENCH_VERBS:
+            for tense in tenses:
+                with self.subTest(verb=verb, tense=tense):
+                    self.assertIsNotNone(French._RULES.get(verb[-2:], tense))
+                    self.assertEqual(french_step_by_step(verb, tense),
+                                     French.construct_inflection(verb, tense))
+
+    def test_spanish_identical(self):
+        tenses = list(Spanish._STEM_RULES) + ['pretérito perfecto']
+        for verb in _SPANISH_VERBS:
+            for tense in tenses:
+                with self.subTest(verb=verb, tense=tense):
+                    self.assertIsNotNone(Spanish._RULES.get(verb[-2:], tense))
+                    self.assertEqual(spanish_step_by_step(verb, tense),
+                                     Spanish.construct_inflection(verb, tense))
+
+    def test_errors_unchanged(self):
+        with self.assertRaises(ValueError):
+            French.construct_inflection('xyz', 'passé composé')
+        with self.assertRaises(KeyError):
+            French.construct_inflection('parler', 'no such tense')
+        with self.assertRaises(KeyError):
+            Spanish.construct_inflection('xyz', 'presente')
+
+    def test_french_recompiled_when_endings_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'verb_trainer.db')
+            verb_store.create_database(path)
+            store = verb_store.configure(path, preload=True)
+            try:
+                self.assertEqual('finissons', French.construct_inflection(
+                    'finir', 'présent').fpp.verb)
+                with sqlite3.connect(path) as con:
+                    con.execute("UPDATE tense_endings SET fpp = 'issXons' "
+                                "WHERE verb_type = 'ir' AND tense_id = 1")
+                con.close()
+                store._next_check = 0.0
+                self.assertEqual('finissXions', French.construct_inflection(
+                    'finir', 'imparfait').fpp.verb)
+            finally:
+                verb_store.configure(TEST_DB)
+
+    def test_spanish_recompiled_when_source_changes(self):
+        compilations = Spanish._RULES.compilations
+        Spanish._ENDINGS['ar']['presente'] = \
+            Spanish._ENDINGS['ar']['presente']._replace(fps='X')
+        Spanish._RULES._next_check = 0.0
+        try:
+            self.assertEqual('hablX', Spanish.construct_inflection.__wrapped__(
+                'hablar', 'presente').fps[1])
+            self.assertEqual(compilations + 1, Spanish._RULES.compilations)
+        finally:
+            Spanish._ENDINGS['ar']['presente'] = \
+                Spanish._ENDINGS['ar']['presente']._replace(fps='o')
+            Spanish._RULES.invalidate()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+# Unit tests for the database migrations and the query plans of the
+# queries run against the database
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+import VerbTrainer
+import conjugation_table
+import schema
+import verb_loader
+import verb_store
+from tests import TEST_DB
+
+# verb_trainer.sql as it was before the migrations replaced it
+_OLD_SCRIPT = os.path.join(os.path.dirname(__file__), 'old_verb_trainer.sql')
+
+_TABLES = ('languages', 'verbs', 'tenses', 'tense_endings', 'conjugations',
+           'conjugation_builds')
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'verb_trainer.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def counts(self):
+        con = sqlite3.connect(self.path)
+        try:
+            return {table: con.execute('SELECT COUNT(*) FROM ' + table)
+                    .fetchone()[0] for table in _TABLES}
+        finally:
+            con.close()
+
+    def test_migrate(self):
+        versions = [m.version for m in schema.migrations()]
+        self.assertEqual(versions, schema.migrate(self.path))
+        self.assertEqual([], schema.migrate(self.path))
+        counts = self.counts()
+        self.assertEqual(4, counts['languages'])
+        self.assertEqual(19, counts['tenses'])
+        self.assertEqual(21, counts['tense_endings'])
+        con = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(schema.latest_version(),
+                             schema.current_version(con))
+        finally:
+            con.close()
+
+    def test_rerun_keeps_rows(self):
+        schema.migrate(self.path)
+        verb_loader.load(['parler\n'], 'fr', db_path=self.path)
+        con = sqlite3.connect(self.path)
+        with con:
+            con.execute("UPDATE tense_endings SET fps = 'X' "
+                        "WHERE ending_id = 1")
+            con.execute('DELETE FROM schema_migrations')
+        con.close()
+        before = self.counts()
+        schema.migrate(self.path)
+        self.assertEqual(before, self.counts())
+        con = sqlite3.connect(self.path)
+        try:
+            self.assertEqual('X', con.execute(
+                'SELECT fps FROM tense_endings WHERE ending_id = 1')
+                .fetchone()[0])
+        finally:
+            con.close()
+
+    def test_old_database(self):
+        # as the drop-and-recreate verb_trainer.sql left it: no
+        # migrations table, no unique index on verbs, and so possibly a
+        # verb twice
+        with open(_OLD_SCRIPT, encoding='utf-8') as f:
+            script = f.read()
+        con = sqlite3.connect(self.path)
+        with con:
+            con.executescript(script)
+            con.executemany("INSERT INTO verbs(language_id, verb, aux, "
+                            "past_participle, present_participle) "
+                            "VALUES (1, ?, 'avoir', ?, ?)",
+                            [('parler', 'parlé', 'parlant'),
+                             ('finir', 'fini', 'finissant'),
+                             ('parler', 'parlé', 'parlant'),
+                             ('parler', 'parlé', 'parlant')])
+        con.close()
+        schema.migrate(self.path, target=1)
+        # as though the conjugations had been built before the index
+        con = sqlite3.connect(self.path)
+        with con:
+            con.executemany("INSERT INTO conjugations(language_id, verb_id, "
+                            "tense_id, person, pronoun, form) "
+                            "VALUES (1, ?, 1, 'fps', 'je', 'parle')",
+                            [(1,), (3,)])
+            con.executemany("INSERT INTO conjugation_builds VALUES (?, 'x')",
+                            [(1,), (2,), (3,)])
+        con.close()
+        self.assertEqual([2, 3, 4], schema.migrate(self.path))
+        con = sqlite3.connect(self.path)
+        try:
+            self.assertEqual([(1, 'parler'), (2, 'finir')], con.execute(
+                'SELECT verb_id, verb FROM verbs ORDER BY verb_id')
+                .fetchall())
+            self.assertEqual([1], [row[0] for row in con.execute(
+                'SELECT verb_id FROM conjugations')])
+            self.assertEqual([2], [row[0] for row in con.execute(
+                'SELECT verb_id FROM conjugation_builds')])
+        finally:
+            con.close()
+        verb_loader.load(['parler\n'], 'fr', db_path=self.path)
+        self.assertEqual(2, self.counts()['verbs'])
+        verb_store.configure(self.path)
+        self.addCleanup(verb_store.configure, TEST_DB)
+        self.assertEqual((2, 0, 0, 0), conjugation_table.build())
+        self.assertEqual(('fps', 'je', 'parle'), conjugation_table.fetch(
+            'française', 'parler', 'présent')[0])
+
+    def test_command(self):
+        verb_store.configure(self.path)
+        self.addCleanup(verb_store.configure, TEST_DB)
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            VerbTrainer.run_command(['migrate'])
+            VerbTrainer.run_command(['migrate'])
+        self.assertEqual(['applied migrations 1, 2, 3, 4', 'up to date'],
+                         [line.split(': ', 1)[1]
+                          for line in err.getvalue().splitlines()])
+        self.assertEqual(['présent', 'passé simple'],
+                         verb_store.get_store().tense_names('française')[:2])
+
+    def test_failed_migration_rolls_back(self):
+        directory = os.path.join(self.tmp.name, 'migrations')
+        os.mkdir(directory)
+        with open(os.path.join(directory, '0001_good.sql'), 'w') as f:
+            f.write('CREATE TABLE a(x);\n')
+        with open(os.path.join(directory, '0002_bad.sql'), 'w') as f:
+            f.write('-- half of this applies\n'
+                    'CREATE TABLE b(x);\nINSERT INTO missing VALUES (1);\n')
+        with self.assertRaises(sqlite3.OperationalError):
+            schema.migrate(self.path, directory=directory)
+        con = sqlite3.connect(self.path)
+        try:
+            tables = {row[0] for row in con.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            self.assertIn('a', tables)
+            self.assertNotIn('b', tables)
+            self.assertEqual(1, schema.current_version(con))
+        finally:
+            con.close()
+
+
+class TestQueryPlans(unittest.TestCase):
+    '''
+    Every query the conjugators, the conjugations table and the verb
+    loader run per verb or per lookup finds its rows through an index
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, 'verb_trainer.db')
+        verb_store.create_database(cls.path)
+        verb_store.configure(cls.path)
+        for language, suffixes in (('fr', ('er', 'ir', 're')),
+                                   ('es', ('ar', 'er', 'ir'))):
+            verb_loader.load(['v{}{}\n'.format(i, suffixes[i % 3])
+                              for i in range(3000)], language)
+        conjugation_table.build()
+        cls.con = sqlite3.connect(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.con.close()
+        verb_store.configure(TEST_DB)
+        cls.tmp.cleanup()
+
+    def assertIndexed(self, sql, params, scans=()):
+        '''
+        No table is scanned, except those in scans
+        '''
+        plan = [row[3] for row in
+                self.con.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        for step in plan:
+            if step.startswith('SCAN '):
+                self.assertIn(step.split()[1], scans, plan)
+
+    def test_conjugator_queries(self):
+        self.assertIndexed(verb_store._ENDINGS_QUERY, ('er', 'présent'))
+        self.assertIndexed(verb_store._TENSES_QUERY, ('française',))
+        self.assertIndexed(verb_store._IRREGULAR_QUERY, ('française',))
+
+    def test_conjugation_table_queries(self):
+        for sql, params in (
+                (conjugation_table._LANGUAGE_ID, ('française',)),
+                (conjugation_table._TENSE_IDS, (1,)),
+                (conjugation_table._VERBS, (1,)),
+                (conjugation_table._PREVIOUS_BUILDS, (1,)),
+                (conjugation_table._DELETE_VERB, (1,)),
+                (conjugation_table._ENDINGS_ROWS, ('er', 1)),
+                (conjugation_table._SELECT, (1, 'v0er', 1, 'présent'))):
+            with self.subTest(sql=sql):
+                self.assertIndexed(sql, params)
+        # finding deleted verbs has to look at each verb's build once,
+        # but never at every conjugation
+        self.assertIndexed(conjugation_table._DELETE_REMOVED, (),
+                           scans=('conjugation_builds',))
+
+    def test_upsert_uses_unique_index(self):
+        self.assertIndexed(verb_loader._UPSERT, (1,) + ('v0er',) * 7)
+        stats = verb_loader.load(['v0er,être\n', 'v0er,être\n'], 'fr')
+        self.assertEqual((0, 1, 1), stats[:3])
+        self.assertEqual(6000, self.con.execute('SELECT COUNT(*) FROM verbs')
+                         .fetchone()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+# Unit tests for the local conjugation server
+import asyncio
+import contextlib
+import io
+import unittest
+from unittest import mock
+import languages.french as French
+import server
+import verb_store
+from benchmarks import load
+from tests import TEST_DB
+
+
+class TestServer(unittest.TestCase):
+    def tearDown(self):
+        verb_store.configure(TEST_DB)
+
+    def exchange(self, *requests):
+        '''
+        Starts a server, sends (method, path, payload) requests over
+        one connection and returns the (status, body) responses
+        '''
+        async def run():
+            srv = server.Server(port=0)
+            await srv.start()
+            try:
+                reader, writer = await asyncio.open_connection(srv.host,
+                                                               srv.port)
+                responses = [await load.fetch(reader, writer, *request)
+                             for request in requests]
+                writer.close()
+                return responses
+            finally:
+                await srv.close()
+        return asyncio.run(run())
+
+    def test_conjugate(self):
+        [(status, body)] = self.exchange(
+            ('POST', '/conjugate', {'lang': 'fr', 'infinitive': 'parler',
+                                    'tense': 'présent'}))
+        self.assertEqual(200, status)
+        expected = French.construct_inflection('parler', 'présent')
+        self.assertEqual([list(parts) for parts in expected],
+                         list(body['result'].values()))
+        self.assertEqual(list(expected._fields), list(body['result']))
+
+    def test_formats(self):
+        conj = French.construct_inflection('finir', 'imparfait')
+        responses = self.exchange(*[
+            ('POST', '/conjugate', {'lang': 'fr', 'infinitive': 'finir',
+                                    'tense': 'imparfait', 'format': fmt})
+            for fmt in ['cloze', 'import']])
+        self.assertEqual(
+            list(French.output_cloze('finir', 'imparfait', conj)),
+            list(responses[0][1]['result'].values()))
+        self.assertEqual(
+            list(French.output_cloze_import('finir', 'imparfait', [], [],
+                                            conj)),
+            list(responses[1][1]['result'].values()))
+
+    def test_batch_reports_bad_items(self):
+        [(status, body)] = self.exchange(
+            ('POST', '/batch', {'lang': 'es', 'format': 'cloze',
+                                'items': [['hablar', 'presente'],
+                                          {'infinitive': 'vivir',
+                                           'tense': 'futuro simple'},
+                                          ['ser', 'no such tense'],
+                                          ['xyz', 'presente'],
+                                          ['ser', 'futuro simple']]}))
+        self.assertEqual(200, status)
+        results = body['results']
+        self.assertEqual(5, len(results))
+        self.assertIn('result', results[0])
+        self.assertEqual('vivir', results[1]['infinitive'])
+        self.assertIn('unknown tense', results[2]['error'])
+        self.assertIn('not a regular infinitive', results[3]['error'])
+        self.assertIn('no irregular forms', results[4]['error'])
+
+    def test_batch_reports_failed_items(self):
+        construct_inflection = French.construct_inflection
+
+        def failing(infinitive, tense):
+            if infinitive == 'finir':
+                raise RuntimeError('secret detail')
+            return construct_inflection(infinitive, tense)
+
+        err = io.StringIO()
+        with mock.patch.object(French, 'construct_inflection', failing), \
+                contextlib.redirect_stderr(err):
+            [(status, body)] = self.exchange(
+                ('POST', '/batch', {'lang': 'fr',
+                                    'items': [['parler', 'présent'],
+                                              ['finir', 'présent']]}))
+        self.assertEqual(200, status)
+        self.assertIn('result', body['results'][0])
+        self.assertEqual('internal error', body['results'][1]['error'])
+        self.assertNotIn('secret', str(body))
+        self.assertIn('secret detail', err.getvalue())
+
+    def test_keeps_process_store(self):
+        store = verb_store.get_store()
+        self.assertFalse(store.preload)
+        self.exchange(('GET', '/health'))
+        self.assertIs(store, verb_store.get_store())
+        self.assertFalse(store.preload)
+
+    def test_errors_keep_connection_open(self):
+        responses = self.exchange(
+            ('GET', '/conjugate'),
+            ('POST', '/conjugate', {'lang': 'de'}),
+            ('GET', '/nowhere'),
+            ('GET', '/tenses?lang=es'),
+            ('GET', '/health'))
+        self.assertEqual([405, 400, 404, 200, 200],
+                         [status for status, _ in responses])
+        self.assertIn('pretérito perfecto', responses[3][1]['tenses'])
+
+    def test_bad_json(self):
+        async def run():
+            srv = server.Server(port=0)
+            await srv.start()
+            try:
+                reader, writer = await asyncio.open_connection(srv.host,
+                                                               srv.port)
+                writer.write(b'POST /batch HTTP/1.1\r\n'
+                             b'Connection: close\r\n'
+                             b'Content-Length: 3\r\n\r\n{x}')
+                response = await reader.read()
+                writer.close()
+                return response
+            finally:
+                await srv.close()
+        response = asyncio.run(run())
+        self.assertTrue(response.startswith(b'HTTP/1.1 400 '))
+        self.assertIn(b'not valid JSON', response)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -97,6 +97,27 @@ class TestSpanishConjugator(unittest.TestCase):
         self.run_sub_tests(expected, 'pretérito perfecto')
 
 
+class TestConjugateMany(unittest.TestCase):
+    def test_matches_construct_inflection(self):
+        verbs = ['hablar', 'vender', 'vivir', 'amar']
+        tenses = list(Spanish._STEM_RULES) + ['pretérito perfecto']
+        actual = list(Spanish.conjugate_many(verbs, tenses))
+        self.assertEqual(len(verbs) * len(tenses), len(actual))
+        for infinitive, tense, inflection in actual:
+            with self.subTest(verb=infinitive, tense=tense):
+                self.assertEqual(Spanish.construct_inflection(infinitive,
+                                                              tense),
+                                 inflection)
+
+    def test_input_order(self):
+        verbs = ['vivir', 'hablar', 'vender', 'comer']
+        tenses = ['futuro simple', 'presente']
+        actual = [(inf, tense) for inf, tense, _ in
+                  Spanish.conjugate_many(iter(verbs), tenses)]
+        expected = [(inf, tense) for inf in verbs for tense in tenses]
+        self.assertEqual(expected, actual)
+
+
 class TestcompoundTenses(unittest.TestCase):
         def test_past_participle(self):
             expected = ['hablado', 'vendido', 'vivido']
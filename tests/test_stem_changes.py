@@ -0,0 +1,229 @@
+# Unit tests for the stem- and spelling-change rules
+import unittest
+import inflection_cache
+import languages.french as French
+import languages.spanish as Spanish
+import stem_changes
+
+
+def _forms(module, infinitive, tense):
+    return [person[-1]
+            for person in module.construct_inflection(infinitive, tense)]
+
+
+class TestFrench(unittest.TestCase):
+    def test_grave_accent(self):
+        self.assertEqual(['achète', 'achètes', 'achète', 'achetons',
+                          'achetez', 'achètent'],
+                         _forms(French, 'acheter', 'présent'))
+        self.assertEqual('achèterai', _forms(French, 'acheter', 'futur')[0])
+        self.assertEqual('achetais', _forms(French, 'acheter',
+                                            'imparfait')[0])
+
+    def test_acute_to_grave(self):
+        self.assertEqual(['préfère', 'préfères', 'préfère', 'préférons',
+                          'préférez', 'préfèrent'],
+                         _forms(French, 'préférer', 'présent'))
+        # only where the ending is a mute e of the présent
+        self.assertEqual('préférerai', _forms(French, 'préférer', 'futur')[0])
+        self.assertEqual(('que', 'je', 'préfère'),
+                         French.construct_inflection(
+                             'préférer', 'subjonctif présent').fps)
+
+    def test_doubled_consonant(self):
+        self.assertEqual(['appelle', 'appelles', 'appelle', 'appelons',
+                          'appelez', 'appellent'],
+                         _forms(French, 'appeler', 'présent'))
+        self.assertEqual('jetterai', _forms(French, 'jeter', 'futur')[0])
+        # rappeler is built on appeler, geler isn't
+        self.assertEqual('rappelle', _forms(French, 'rappeler',
+                                            'présent')[0])
+        self.assertEqual('gèle', _forms(French, 'geler', 'présent')[0])
+
+    def test_spelling(self):
+        self.assertEqual('commençons', _forms(French, 'commencer',
+                                              'présent')[3])
+        self.assertEqual(['commençais', 'commencions'],
+                         _forms(French, 'commencer', 'imparfait')[::3])
+        self.assertEqual('mangeons', _forms(French, 'manger', 'présent')[3])
+        self.assertEqual('mangeai', _forms(French, 'manger',
+                                           'passé simple')[0])
+
+    def test_both(self):
+        self.assertEqual(['protège', 'protégeons'],
+                         _forms(French, 'protéger', 'présent')[::3])
+        self.assertEqual(['dépèce', 'dépeçons'],
+                         _forms(French, 'dépecer', 'présent')[::3])
+
+    def test_elision(self):
+        self.assertEqual(("j'", 'achète'),
+                         French.construct_inflection('acheter',
+                                                     'présent').fps)
+        self.assertEqual(("qu'", 'il/elle/on', 'achète'),
+                         French.construct_inflection(
+                             'acheter', 'subjonctif présent').tps)
+
+    def test_regular_verbs_unchanged(self):
+        self.assertEqual((), French.classify('parler'))
+        self.assertEqual(['parle', 'parlons'],
+                         _forms(French, 'parler', 'présent')[::3])
+
+
+class TestSpanish(unittest.TestCase):
+    def test_diphthongs(self):
+        self.assertEqual(['pienso', 'piensas', 'pensás', 'piensa',
+                          'pensamos', 'pensáis', 'piensan'],
+                         _forms(Spanish, 'pensar', 'presente'))
+        self.assertEqual(['duermo', 'dormimos'],
+                         _forms(Spanish, 'dormir', 'presente')[::4])
+        self.assertEqual('juego', _forms(Spanish, 'jugar', 'presente')[0])
+        self.assertEqual('devuelvo', _forms(Spanish, 'devolver',
+                                            'presente')[0])
+
+    def test_preterite(self):
+        self.assertEqual(['sentí', 'sintió', 'sintieron'],
+                         _forms(Spanish, 'sentir',
+                                'pretérito indefinido')[::3])
+        self.assertEqual(['durmió', 'durmieron'],
+                         _forms(Spanish, 'dormir',
+                                'pretérito indefinido')[3::3])
+        self.assertEqual(['pido', 'pidió'],
+                         [_forms(Spanish, 'pedir', 'presente')[0],
+                          _forms(Spanish, 'pedir',
+                                 'pretérito indefinido')[3]])
+        # -ar and -er verbs keep their stem in the pretérito
+        self.assertEqual('pensó', _forms(Spanish, 'pensar',
+                                         'pretérito indefinido')[3])
+
+    def test_spelling(self):
+        for infinitive, form in (('buscar', 'busqué'), ('pagar', 'pagué'),
+                                 ('empezar', 'empecé'),
+                                 ('colgar', 'colgué')):
+            with self.subTest(infinitive=infinitive):
+                self.assertEqual(form, _forms(Spanish, infinitive,
+                                              'pretérito indefinido')[0])
+        self.assertEqual(['cojo', 'coges'],
+                         _forms(Spanish, 'coger', 'presente')[:2])
+        self.assertEqual(['sigo', 'sigues'],
+                         _forms(Spanish, 'seguir', 'presente')[:2])
+        self.assertEqual('elijo', _forms(Spanish, 'elegir', 'presente')[0])
+
+    def test_exceptions(self):
+        # longer suffixes than the rules they'd otherwise match
+        for infinitive in ('presentar', 'compensar', 'pretender',
+                           'interrogar'):
+            with self.subTest(infinitive=infinitive):
+                self.assertEqual(infinitive[:-2] + 'o',
+                                 _forms(Spanish, infinitive, 'presente')[0])
+        # an exception in one group leaves the other
+        self.assertEqual('interrogué',
+                         _forms(Spanish, 'interrogar',
+                                'pretérito indefinido')[0])
+
+    def test_regular_verbs_on_stem_changing_suffixes(self):
+        # -regar, -sentar and -tentar verbs that keep their e
+        for infinitive in ('agregar', 'entregar', 'congregar', 'segregar',
+                           'ausentar', 'sustentar', 'ostentar', 'atentar'):
+            root = infinitive[:-2]
+            with self.subTest(infinitive=infinitive):
+                self.assertEqual([root + 'o', root + 'as', root + 'ás',
+                                  root + 'a', root + 'amos', root + 'áis',
+                                  root + 'an'],
+                                 _forms(Spanish, infinitive, 'presente'))
+                self.assertEqual([root + 'aba', root + 'aré'],
+                                 [_forms(Spanish, infinitive,
+                                         'pretérito imperfecto')[0],
+                                  _forms(Spanish, infinitive,
+                                         'futuro simple')[0]])
+                self.assertEqual(
+                    [root + 'o', root + 'an'],
+                    [inflection.fps[-1] for _, _, inflection in
+                     Spanish.conjugate_many([infinitive], ['presente'])] +
+                    [inflection.tpp[-1] for _, _, inflection in
+                     Spanish.conjugate_many([infinitive], ['presente'],
+                                            compact=True)])
+        # the spelling change still applies
+        self.assertEqual('entregué',
+                         _forms(Spanish, 'entregar',
+                                'pretérito indefinido')[0])
+        # the verbs they're built on do change
+        self.assertEqual(['riego', 'siento', 'tiento'],
+                         [_forms(Spanish, infinitive, 'presente')[0]
+                          for infinitive in ('regar', 'sentar', 'tentar')])
+
+    def test_pronoun_kept(self):
+        self.assertEqual(('vos', 'pensás'),
+                         Spanish.construct_inflection('pensar',
+                                                      'presente').spsv)
+        self.assertEqual(('él/ella/usted', 'piensa'),
+                         Spanish.construct_inflection('pensar',
+                                                      'presente').tps)
+
+
+class TestConjugateMany(unittest.TestCase):
+    def test_matches_construct_inflection(self):
+        for module, verbs, tenses in (
+                (French, ['parler', 'acheter', 'appeler', 'commencer',
+                          'préférer', 'manger', 'finir'],
+                 ['présent', 'imparfait', 'futur', 'subjonctif présent',
+                  'passé composé']),
+                (Spanish, ['hablar', 'pensar', 'dormir', 'pedir', 'buscar',
+                           'seguir', 'comer'],
+                 ['presente', 'pretérito indefinido', 'futuro simple'])):
+            for compact in (False, True):
+                for infinitive, tense, inflection in module.conjugate_many(
+                        verbs, tenses, compact=compact):
+                    with self.subTest(infinitive=infinitive, tense=tense,
+                                      compact=compact):
+                        self.assertEqual(
+                            module.construct_inflection(infinitive, tense),
+                            inflection)
+
+
+class TestRuleSet(unittest.TestCase):
+    def setUp(self):
+        self.change = stem_changes.Change(stem_changes.vowel('o', 'ue'))
+        self.rules = stem_changes.RuleSet(
+            ('a', 'b'), {'stem': [('ontar', (self.change,)),
+                                  ('contar', ()),
+                                  ('recontar', (self.change,))],
+                         'spelling': [('ar', (self.change,))]})
+
+    def test_longest_suffix_wins(self):
+        self.assertEqual((self.change,) * 2, self.rules.classify('montar'))
+        self.assertEqual((self.change,), self.rules.classify('contar'))
+        self.assertEqual((self.change,) * 2,
+                         self.rules.classify('recontar'))
+        self.assertEqual((), self.rules.classify('comer'))
+
+    def test_suffixes(self):
+        self.assertEqual(('ar', 'ontar', 'recontar'), self.rules.suffixes)
+
+    def test_persons_and_tenses(self):
+        change = stem_changes.Change(stem_changes.final('c', 'qu'),
+                                     ('t',), ('b',), lambda rest: rest == 'é')
+        rules = stem_changes.RuleSet(('a', 'b'), {'x': [('car', (change,))]})
+        changes = rules.classify('buscar')
+        patch = lambda parts, i, form: (parts[0], form)  # noqa: E731
+        self.assertEqual(((1, 'buscé'), (2, 'busqué')),
+                         rules.apply(changes, 'buscar', 't',
+                                     ((1, 'buscé'), (2, 'buscé')), patch))
+        self.assertEqual(((1, 'busco'), (2, 'busco')),
+                         rules.apply(changes, 'buscar', 't',
+                                     ((1, 'busco'), (2, 'busco')), patch))
+        inflection = ((1, 'buscé'), (2, 'buscé'))
+        self.assertIs(inflection, rules.apply(changes, 'buscar', 'u',
+                                              inflection, patch))
+
+    def test_classify_cached(self):
+        inflection_cache.invalidate()
+        before = inflection_cache.stats()['spanish.classify']
+        Spanish.classify('pensar')
+        Spanish.classify('pensar')
+        after = inflection_cache.stats()['spanish.classify']
+        self.assertEqual((1, 1), (after.hits - before.hits,
+                                  after.misses - before.misses))
+
+
+if __name__ == '__main__':
+    unittest.main()
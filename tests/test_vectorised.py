@@ -0,0 +1,112 @@
+# Unit tests for the whole-array conjugation backends
+import unittest
+import warnings
+import irregular
+import languages.french as French
+import languages.spanish as Spanish
+import vectorised
+
+_VERBS = {'fr': ['parler', 'finir', 'vendre', 'consoler', 'obéir',
+                 'attendre', 'aimer', 'choisir'],
+          'es': ['hablar', 'vender', 'vivir', 'amar', 'comer', 'abrir']}
+_MODULES = {'fr': French, 'es': Spanish}
+
+
+def _tenses(language):
+    if language == 'fr':
+        return list(French._STEM_RULES)
+    return list(Spanish._STEM_RULES) + ['pretérito perfecto']
+
+
+def _available():
+    return ['python'] + (['numpy'] if vectorised.numpy_available() else [])
+
+
+class TestConjugateColumns(unittest.TestCase):
+    def check_backend(self, backend):
+        for language, verbs in _VERBS.items():
+            module = _MODULES[language]
+            for tense in _tenses(language):
+                with self.subTest(language=language, tense=tense):
+                    columns = vectorised.conjugate_columns(language, verbs,
+                                                           tense, backend)
+                    rows = [tuple(str(form) for form in row)
+                            for row in zip(*columns)]
+                    expected = [tuple(parts[-1] for parts in
+                                      module.construct_inflection(verb, tense))
+                                for verb in verbs]
+                    self.assertEqual(expected, rows)
+                    self.assertEqual(len(columns._fields), len(columns))
+
+    def test_python_backend(self):
+        self.check_backend('python')
+
+    @unittest.skipUnless(vectorised.numpy_available(), 'needs NumPy')
+    def test_numpy_backend(self):
+        self.check_backend('numpy')
+
+    def test_stem_changes_and_irregular_forms(self):
+        verbs = {'fr': ['parler', 'acheter', 'être', 'manger', 'appeler'],
+                 'es': ['hablar', 'pensar', 'ser', 'dormir', 'pedir']}
+        tenses = {'fr': 'présent', 'es': 'presente'}
+        for backend in _available():
+            for language, infinitives in verbs.items():
+                with self.subTest(backend=backend, language=language):
+                    module = _MODULES[language]
+                    tense = tenses[language]
+                    columns = vectorised.conjugate_columns(
+                        language, infinitives, tense, backend)
+                    rows = [tuple(str(form) for form in row)
+                            for row in zip(*columns)]
+                    expected = [tuple(parts[-1] for parts in
+                                      module.construct_inflection(verb, tense))
+                                for verb in infinitives]
+                    self.assertEqual(expected, rows)
+
+    def test_irregular_tense_missing(self):
+        for backend in _available():
+            with self.subTest(backend=backend):
+                with self.assertRaises(irregular.MissingForms):
+                    vectorised.conjugate_columns('fr', ['parler', 'aller'],
+                                                 'imparfait', backend)
+
+    def test_irregular_infinitive(self):
+        for backend in _available():
+            with self.subTest(backend=backend):
+                with self.assertRaises(ValueError):
+                    vectorised.conjugate_columns('es', ['hablar', 'xyz'],
+                                                 'presente', backend)
+                with self.assertRaises(KeyError):
+                    vectorised.conjugate_columns('fr', ['parler'],
+                                                 'passé composé', backend)
+
+    def test_empty(self):
+        for backend in _available():
+            with self.subTest(backend=backend):
+                columns = vectorised.conjugate_columns('fr', [], 'imparfait',
+                                                       backend)
+                self.assertEqual([0] * 6, [len(c) for c in columns])
+
+    def test_fallback_without_numpy(self):
+        numpy = vectorised.numpy
+        vectorised.numpy = None
+        try:
+            self.assertEqual('python', vectorised.resolve_backend('auto'))
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                self.assertEqual('python',
+                                 vectorised.resolve_backend('numpy'))
+                columns = vectorised.conjugate_columns('fr', ['parler'],
+                                                       'présent', 'numpy')
+            self.assertEqual(2, len(caught))
+            self.assertEqual(['parlons'], columns.fpp)
+        finally:
+            vectorised.numpy = numpy
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            vectorised.resolve_backend('fortran')
+
+
+if __name__ == '__main__':
+    unittest.main()
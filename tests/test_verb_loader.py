@@ -0,0 +1,164 @@
+# Unit tests for the bulk verb loader
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+import VerbTrainer
+import conjugation_table
+import verb_loader
+import verb_store
+from tests import TEST_DB
+
+_SELECT = ('SELECT verb_id, verb, aux, past_participle, present_participle, '
+           'is_reflexive, is_aux, is_irregular FROM verbs ORDER BY verb_id')
+
+
+class TestVerbLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'verb_trainer.db')
+        verb_store.create_database(self.path)
+        verb_store.configure(self.path)
+
+    def tearDown(self):
+        verb_store.configure(TEST_DB)
+        self.tmp.cleanup()
+
+    def rows(self):
+        con = sqlite3.connect(self.path)
+        try:
+            return con.execute(_SELECT).fetchall()
+        finally:
+            con.close()
+
+    def test_defaults(self):
+        stats = verb_loader.load(['parler\n', 'finir\n', 'vendre\n'], 'fr')
+        self.assertEqual((3, 0, 0, 0), stats[:4])
+        self.assertEqual([('parler', 'avoir', 'parlé', 'parlant', 0, 0, 0),
+                          ('finir', 'avoir', 'fini', 'finissant', 0, 0, 0),
+                          ('vendre', 'avoir', 'vendu', 'vendant', 0, 0, 0)],
+                         [row[1:] for row in self.rows()])
+
+    def test_tsv_with_header(self):
+        rejected = []
+        stats = verb_loader.load(
+            ['verb\tis_irregular\tpast_participle\n',
+             'vivir\t1\tvivido\n',
+             'hablar\t\t\n',
+             'xyz\t0\t\n',
+             'comer\tmaybe\t\n'], 'es', rejected.append)
+        self.assertEqual((2, 0, 0, 2), stats[:4])
+        self.assertEqual([(4, 'xyz', 'not a regular infinitive'),
+                          (5, 'comer', "bad flag 'maybe'")], rejected)
+        self.assertEqual([('vivir', 'haber', 'vivido', 'viviendo', 0, 0, 1),
+                          ('hablar', 'haber', 'hablado', 'hablando', 0, 0, 0)],
+                         [row[1:] for row in self.rows()])
+
+    def test_rejected_counted(self):
+        stats = verb_loader.load(['parler\n', 'xyz\n', 'abc\n'], 'fr')
+        self.assertEqual((1, 0, 0, 2), stats[:4])
+
+    def test_byte_order_mark(self):
+        verbs = os.path.join(self.tmp.name, 'verbs.csv')
+        with open(verbs, 'w', encoding='utf-8-sig') as f:
+            f.write('verb,is_irregular\nvivir,1\n')
+        stats = verb_loader.load_file(verbs, 'es')
+        self.assertEqual((1, 0, 0, 0), stats[:4])
+        self.assertEqual([('vivir', 1)],
+                         [(row[1], row[7]) for row in self.rows()])
+        # and in lines read without utf-8-sig
+        stats = verb_loader.load(['\ufeffverb,is_irregular\n', 'vivir,0\n'],
+                                 'es')
+        self.assertEqual((0, 1, 0, 0), stats[:4])
+
+    def test_upsert(self):
+        verb_loader.load(['parler\n', 'vendre\n'], 'fr')
+        before = self.rows()
+        stats = verb_loader.load(['parler\n', 'vendre,être\n', 'aimer\n'],
+                                 'fr', batch_size=1)
+        self.assertEqual((1, 1, 1, 0), stats[:4])
+        after = self.rows()
+        self.assertEqual(3, len(after))
+        self.assertEqual(before[0], after[0])
+        # updated in place, keeping its id
+        self.assertEqual((before[1][0], 'vendre', 'être'), after[1][:3])
+
+    def test_keeps_journal_mode(self):
+        verb_loader.load(['parler\n'], 'fr')
+        con = sqlite3.connect(self.path)
+        try:
+            self.assertEqual('delete', con.execute('PRAGMA journal_mode')
+                             .fetchone()[0])
+        finally:
+            con.close()
+
+    def test_keeps_irregular_flag(self):
+        verb_loader.load(['verb,is_irregular\n', 'vivir,1\n',
+                          'hablar,1\n'], 'es')
+        # no is_irregular column, with and without a header
+        stats = verb_loader.load(['vivir\n', 'comer\n'], 'es')
+        self.assertEqual((1, 0, 1, 0), stats[:4])
+        stats = verb_loader.load(['verb,past_participle\n',
+                                  'hablar,hablado\n'], 'es')
+        self.assertEqual((0, 0, 1, 0), stats[:4])
+        self.assertEqual([('vivir', 1), ('hablar', 1), ('comer', 0)],
+                         [(row[1], row[7]) for row in self.rows()])
+        # but a list that gives it is followed
+        verb_loader.load(['verb,is_irregular\n', 'vivir,0\n'], 'es')
+        self.assertEqual(0, self.rows()[0][7])
+
+    def test_restores_synchronous(self):
+        settings = []
+
+        class Connection(sqlite3.Connection):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.execute('PRAGMA synchronous = NORMAL')
+
+            def close(self):
+                settings.append(self.execute('PRAGMA synchronous')
+                                .fetchone()[0])
+                super().close()
+
+        connect = sqlite3.connect
+        with mock.patch.object(
+                verb_loader.sqlite3, 'connect',
+                lambda *args: connect(*args, factory=Connection)):
+            verb_loader.load(['parler\n'], 'fr')
+        self.assertEqual([1], settings)
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            verb_loader.load(['verb,gender\n', 'parler,m\n'], 'fr')
+
+    def test_command_unknown_column(self):
+        verbs = os.path.join(self.tmp.name, 'verbs.csv')
+        with open(verbs, 'w', encoding='utf-8') as f:
+            f.write('verb,gender\nparler,m\n')
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            status = VerbTrainer.run_command(['load-verbs', '--lang', 'fr',
+                                              verbs])
+        self.assertEqual(2, status)
+        self.assertEqual('load-verbs: unknown columns: gender\n',
+                         err.getvalue())
+
+    def test_command(self):
+        verbs = os.path.join(self.tmp.name, 'verbs.csv')
+        with open(verbs, 'w', encoding='utf-8') as f:
+            f.write('parler\nvendre\n')
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            VerbTrainer.run_command(['load-verbs', '--lang', 'fr', verbs])
+            VerbTrainer.run_command(['load-verbs', '--lang', 'fr', verbs])
+        self.assertIn('0 verbs added, 0 updated, 2 unchanged', err.getvalue())
+        self.assertEqual((2, 0, 0, 0), conjugation_table.build())
+        rows = conjugation_table.fetch('française', 'vendre', 'présent')
+        self.assertEqual(('fps', 'je', 'vends'), rows[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
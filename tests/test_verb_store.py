@@ -0,0 +1,114 @@
+# Unit tests for the verb_trainer database access layer
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import verb_store
+from tests import TEST_DB
+
+
+class TestVerbStore(unittest.TestCase):
+    def test_connection_is_reused(self):
+        store = verb_store.VerbStore(TEST_DB)
+        self.assertIs(store.connection, store.connection)
+        store.close()
+
+    def test_connection_per_thread(self):
+        store = verb_store.VerbStore(TEST_DB)
+        connections = []
+        thread = threading.Thread(
+            target=lambda: connections.append(store.connection))
+        thread.start()
+        thread.join()
+        self.assertIsNot(connections[0], store.connection)
+        self.assertEqual(('française',), store.connection.execute(
+            'SELECT language_name FROM languages WHERE language_id = 1'
+        ).fetchone())
+        store.close()
+
+    def test_thread_store(self):
+        store = verb_store.VerbStore(TEST_DB)
+        seen = []
+
+        def run():
+            verb_store.use_store(store)
+            seen.append(verb_store.get_store())
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        self.assertEqual([store], seen)
+        self.assertIsNot(store, verb_store.get_store())
+
+    def test_path_from_environment(self):
+        old = os.environ.get(verb_store.DB_PATH_ENV)
+        os.environ[verb_store.DB_PATH_ENV] = TEST_DB
+        try:
+            self.assertEqual(TEST_DB, verb_store.VerbStore().path)
+        finally:
+            if old is None:
+                del os.environ[verb_store.DB_PATH_ENV]
+            else:
+                os.environ[verb_store.DB_PATH_ENV] = old
+
+    def test_tense_endings(self):
+        store = verb_store.VerbStore(TEST_DB)
+        self.assertEqual(('e', 'es', 'e', 'ons', 'ez', 'ent'),
+                         store.tense_endings('er', 'présent'))
+        self.assertIsNone(store.tense_endings('ar', 'présent'))
+        store.close()
+
+    def test_tense_names(self):
+        store = verb_store.VerbStore(TEST_DB)
+        names = store.tense_names('française')
+        self.assertEqual(14, len(names))
+        self.assertEqual('présent', names[0])
+        self.assertEqual(5, len(store.tense_names('español')))
+        self.assertEqual([], store.tense_names('deutsch'))
+        store.close()
+
+
+class TestPreloadedEndings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'verb_trainer.db')
+        verb_store.create_database(self.path)
+        self.store = verb_store.VerbStore(self.path, preload=True)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_matches_database(self):
+        uncached = verb_store.VerbStore(self.path, preload=False)
+        for verb_type in ['er', 'ir', 're']:
+            for tense in ['présent', 'imparfait', 'subjonctif imparfait']:
+                with self.subTest(verb_type=verb_type, tense=tense):
+                    self.assertEqual(
+                        uncached.tense_endings(verb_type, tense),
+                        self.store.tense_endings(verb_type, tense))
+        uncached.close()
+        self.assertEqual(21, len(self.store.endings_table()))
+
+    def test_reload_on_change(self):
+        self.assertEqual('e', self.store.tense_endings('er', 'présent')[0])
+        generation = self.store.generation
+        with sqlite3.connect(self.path) as con:
+            con.execute("UPDATE tense_endings SET fps = 'X' "
+                        "WHERE verb_type = 'er' AND tense_id = 1")
+            con.execute('PRAGMA user_version = 7')
+        con.close()
+        self.store._next_check = 0.0
+        self.assertEqual('X', self.store.tense_endings('er', 'présent')[0])
+        self.assertEqual(generation + 1, self.store.generation)
+
+    def test_no_reload_when_unchanged(self):
+        self.store.endings_table()
+        generation = self.store.generation
+        self.store._next_check = 0.0
+        self.store.endings_table()
+        self.assertEqual(generation, self.store.generation)
+
+
+if __name__ == '__main__':
+    unittest.main()
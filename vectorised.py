@@ -0,0 +1,326 @@
+# Name:    vectorised.py
+# Purpose: whole-array conjugation for corpus-sized verb lists
+#
+# conjugate_columns(language, infinitives, tense) gives the verb forms
+# of construct_inflection for every infinitive at once and returns one
+# column of forms per person, in input order.  Stems and endings are
+# built with a handful of whole-array string operations: the Python
+# backend works on one list per verb type, the NumPy backend on the
+# whole array at once with per-row endings picked by verb type.
+#
+# The recipes only know the regular rules.  Verbs with stem or spelling
+# changes (the language's classify()) and verbs in the irregular forms
+# overlay are conjugated one at a time with construct_inflection and
+# written over their rows, so a tense an irregular verb has no forms
+# for raises irregular.MissingForms as it does there.  Every infinitive
+# still has to end in one of the language's verb types.
+#
+# Two backends run the same recipes: 'numpy' (NumPy 2.3 or later, using
+# numpy.strings on fixed-width unicode arrays) and 'python' (lists).  The
+# backend is chosen per call, or by VERB_TRAINER_BACKEND
+# ('auto', 'numpy' or 'python'); 'auto' uses NumPy when it is
+# installed.  Without NumPy everything falls back to 'python'.
+
+import os
+import warnings
+import languages.french as French
+import languages.spanish as Spanish
+import verb_store
+
+try:
+    import numpy
+    if not hasattr(getattr(numpy, 'strings', None), 'slice'):
+        numpy = None
+except ImportError:
+    numpy = None
+
+BACKEND_ENV = 'VERB_TRAINER_BACKEND'
+BACKENDS = ('auto', 'numpy', 'python')
+
+# construct_stem_and_ending builds these from infinitive[-2:]
+_VERB_TYPE_LENGTH = 2
+
+
+def numpy_available():
+    return numpy is not None
+
+
+def resolve_backend(backend=None):
+    '''
+    The backend that will actually run for a requested one, None
+    meaning the VERB_TRAINER_BACKEND setting
+    '''
+    backend = backend or os.environ.get(BACKEND_ENV, 'auto')
+    if backend not in BACKENDS:
+        raise ValueError('backend must be one of {}'
+                         .format(', '.join(BACKENDS)))
+    if backend == 'auto':
+        return 'numpy' if numpy is not None else 'python'
+    if backend == 'numpy' and numpy is None:
+        warnings.warn('NumPy 2.3 or later is not installed, '
+                      'using the pure-Python backend')
+        return 'python'
+    return backend
+
+
+class _Python:
+    '''
+    List backend.  The infinitives are partitioned by verb type, so
+    within a partition by_type() and ending() are plain strings
+    '''
+    @staticmethod
+    def drop(xs, n):
+        return [x[:-n] for x in xs] if n else xs
+
+    @staticmethod
+    def add(xs, suffix):
+        return [x + suffix for x in xs]
+
+    @staticmethod
+    def prepend(prefix, xs):
+        return [prefix + x for x in xs]
+
+    @staticmethod
+    def before(xs, marker):
+        '''
+        Everything before the first marker, the whole string if none
+        '''
+        return [x.partition(marker)[0] for x in xs]
+
+    @staticmethod
+    def run(recipe, infinitives, verb_types, endings, tense, persons):
+        xs = list(infinitives)
+        groups = {}
+        for i, x in enumerate(xs):
+            groups.setdefault(x[-_VERB_TYPE_LENGTH:], []).append(i)
+        for verb_type, index in groups.items():
+            if verb_type not in verb_types:
+                raise ValueError('not a regular infinitive: {!r}'
+                                 .format(xs[index[0]]))
+        if len(groups) == 1:
+            [verb_type] = groups
+            return recipe(_Python, xs, _Group(verb_type, endings, persons),
+                          tense)
+        columns = [[None] * len(xs) for _ in range(persons)]
+        for verb_type, index in groups.items():
+            part = recipe(_Python, [xs[i] for i in index],
+                          _Group(verb_type, endings, persons), tense)
+            for column, values in zip(columns, part):
+                for i, value in zip(index, values):
+                    column[i] = value
+        return columns
+
+    @staticmethod
+    def put(column, index, forms):
+        for i, form in zip(index, forms):
+            column[i] = form
+        return column
+
+
+class _Group:
+    def __init__(self, verb_type, endings, persons):
+        self.verb_type = verb_type
+        self.persons = persons
+        self._endings = endings
+
+    def by_type(self, values, default):
+        return values.get(self.verb_type, default)
+
+    def ending(self, tense, person):
+        endings = self._endings(self.verb_type, tense)
+        if endings is None:
+            raise ValueError('no {} endings for -{} verbs'
+                             .format(tense, self.verb_type))
+        return endings[person]
+
+
+class _Numpy:
+    '''
+    Array backend.  by_type() and ending() give per-row arrays
+    indexed by each infinitive's verb type code
+    '''
+    @staticmethod
+    def drop(xs, n):
+        if isinstance(n, int):
+            return numpy.strings.slice(xs, 0, -n) if n else xs
+        return numpy.strings.slice(xs, 0, numpy.strings.str_len(xs) - n)
+
+    @staticmethod
+    def add(xs, suffix):
+        return numpy.strings.add(xs, suffix)
+
+    @staticmethod
+    def prepend(prefix, xs):
+        return numpy.strings.add(prefix, xs)
+
+    @staticmethod
+    def before(xs, marker):
+        return numpy.strings.partition(xs, marker)[0]
+
+    @staticmethod
+    def run(recipe, infinitives, verb_types, endings, tense, persons):
+        xs = numpy.asarray(infinitives, dtype=str)
+        if not len(xs):
+            return [xs] * persons
+        suffixes = numpy.strings.slice(xs, -_VERB_TYPE_LENGTH, None)
+        codes = numpy.full(len(xs), -1, dtype=numpy.intp)
+        for code, verb_type in enumerate(verb_types):
+            codes[suffixes == verb_type] = code
+        if codes.min() < 0:
+            raise ValueError('not a regular infinitive: {!r}'
+                             .format(str(xs[numpy.argmin(codes)])))
+        return recipe(_Numpy, xs,
+                      _Rows(codes, verb_types, endings, persons), tense)
+
+    @staticmethod
+    def put(column, index, forms):
+        width = max(len(form) for form in forms)
+        column = column.astype(numpy.promote_types(column.dtype,
+                                                   'U{}'.format(width)))
+        column[index] = forms
+        return column
+
+
+class _Rows:
+    def __init__(self, codes, verb_types, endings, persons):
+        self.persons = persons
+        self._codes = codes
+        self._verb_types = verb_types
+        self._endings = endings
+        self._present = numpy.unique(codes)
+
+    def by_type(self, values, default):
+        table = [values.get(verb_type, default)
+                 for verb_type in self._verb_types]
+        return numpy.asarray(table)[self._codes]
+
+    def ending(self, tense, person):
+        table = []
+        for code, verb_type in enumerate(self._verb_types):
+            endings = self._endings(verb_type, tense)
+            if endings is None:
+                if code in self._present:
+                    raise ValueError('no {} endings for -{} verbs'
+                                     .format(tense, verb_type))
+                table.append('')
+            else:
+                table.append(endings[person])
+        return numpy.asarray(table, dtype=str)[self._codes]
+
+
+_BACKENDS = {'python': _Python, 'numpy': _Numpy}
+
+
+# Recipes: (backend, infinitives, verb type context, tense) -> one
+# column per person, mirroring each language's construct_stem_and_ending
+
+def _simple(stem):
+    '''
+    Stem plus the tense's ending for each person
+    '''
+    def recipe(ops, xs, types, tense):
+        stems = stem(ops, xs, types)
+        return [ops.add(stems, types.ending(tense, person))
+                for person in range(types.persons)]
+    return recipe
+
+
+def _drop_type(ops, xs, types):
+    return ops.drop(xs, _VERB_TYPE_LENGTH)
+
+
+def _whole(ops, xs, types):
+    return xs
+
+
+def _french_future(ops, xs, types):
+    return ops.drop(xs, types.by_type({'re': 1}, 0))
+
+
+def _from_present(person, marker):
+    '''
+    Stem taken from one person of the présent, up to marker, as
+    French.imparfait and French.présent_subjonctif do
+    '''
+    def stem(ops, xs, types):
+        present = ops.add(ops.drop(xs, _VERB_TYPE_LENGTH),
+                          types.ending('présent', person))
+        return ops.before(present, marker)
+    return stem
+
+
+def _spanish_perfect(ops, xs, types, tense):
+    '''
+    haber + past participle
+    '''
+    participle = ops.add(ops.drop(xs, _VERB_TYPE_LENGTH),
+                         types.by_type({'ar': 'ado'}, 'ido'))
+    return [ops.prepend(aux + ' ', participle)
+            for aux in Spanish.AUX_VERB['haber']['presente']]
+
+
+_RECIPES = {
+    'fr': {'présent': _simple(_drop_type),
+           'futur': _simple(_french_future),
+           'imparfait': _simple(_from_present(3, 'ons')),
+           'passé simple': _simple(_drop_type),
+           'conditionnel': _simple(_french_future),
+           'subjonctif présent': _simple(_from_present(5, 'ent')),
+           'subjonctif imparfait': _simple(_drop_type)},
+    'es': {'presente': _simple(_drop_type),
+           'pretérito imperfecto': _simple(_drop_type),
+           'futuro simple': _simple(_whole),
+           'pretérito indefinido': _simple(_drop_type),
+           'pretérito perfecto': _spanish_perfect}}
+
+
+def _endings_lookup(language):
+    if language == 'fr':
+        table = verb_store.get_store().endings_table()
+        return lambda verb_type, tense: table.get((verb_type, tense))
+    return lambda verb_type, tense: Spanish._ENDINGS.get(
+        verb_type, {}).get(tense)
+
+
+def tenses(language):
+    '''
+    The tenses conjugate_columns supports for a language
+    '''
+    return list(_RECIPES[language])
+
+
+def _exceptions(module, infinitives):
+    '''
+    Positions of the verbs the regular recipes get wrong
+    '''
+    irregular_verbs = module.irregular_overlay().verbs
+    rules = module._STEM_CHANGES
+    suffixes, classify = rules.suffixes, rules.classify
+    return [i for i, infinitive in enumerate(infinitives)
+            if infinitive in irregular_verbs
+            or (infinitive.endswith(suffixes) and classify(infinitive))]
+
+
+def conjugate_columns(language, infinitives, tense, backend=None):
+    '''
+    The verb forms of construct_inflection for many infinitives at
+    once.  Returns the language's person namedtuple (Category or
+    SpanishCategory) holding one column of forms per person, as a
+    NumPy array or a list depending on the backend
+    '''
+    recipe = _RECIPES[language][tense]
+    ops = _BACKENDS[resolve_backend(backend)]
+    if language == 'es':
+        module, person_cls = Spanish, Spanish.SpanishCategory
+    else:
+        module, person_cls = French, French.Category
+    columns = ops.run(recipe, infinitives, module.VERB_TYPES,
+                      _endings_lookup(language), tense,
+                      len(person_cls._fields))
+    index = _exceptions(module, infinitives)
+    if index:
+        rows = [module.construct_inflection(infinitives[i], tense)
+                for i in index]
+        columns = [ops.put(column, index, [row[person][-1] for row in rows])
+                   for person, column in enumerate(columns)]
+    return person_cls._make(columns)
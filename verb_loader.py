@@ -0,0 +1,215 @@
+# Name:    verb_loader.py
+# Purpose: bulk load CSV/TSV verb lists into the verbs table
+#
+# A verb list has one verb per row.  The columns are those of the verbs
+# table, in its order unless the first row is a header naming them:
+#
+#   verb, aux, past_participle, present_participle,
+#   is_reflexive, is_aux, is_irregular
+#
+# Only verb is required.  The auxiliary and participles of a regular
+# verb are filled in when missing, and the flags default to 0, except
+# that a verb already loaded keeps its is_irregular flag (which the
+# irregular forms migration sets) when the list doesn't give one.  Rows
+# are read as they are loaded, so a list of any length loads in the
+# same memory.  Loading a list again updates the verbs already there,
+# keeping their verb_ids (and so their built conjugations), rather
+# than adding them twice.
+
+import csv
+import itertools
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+import exporter
+import languages.french as French
+import languages.spanish as Spanish
+import verb_store
+
+# Rows inserted per transaction
+BATCH_SIZE = 20000
+
+LANGUAGE_NAMES = {'fr': 'française',
+                  'es': 'español'}
+
+COLUMNS = ('verb', 'aux', 'past_participle', 'present_participle',
+           'is_reflexive', 'is_aux', 'is_irregular')
+
+LoadStats = namedtuple('LoadStats', 'inserted updated unchanged rejected '
+                                    'seconds')
+
+# A row that couldn't be loaded: its line number, verb and why
+Rejected = namedtuple('Rejected', 'line verb reason')
+
+_MODULES = {'fr': French,
+            'es': Spanish}
+
+_DEFAULT_AUX = {'fr': 'avoir',
+                'es': 'haber'}
+
+_PRESENT_PARTICIPLE_ENDINGS = {'fr': {'er': 'ant', 'ir': 'issant',
+                                      're': 'ant'},
+                               'es': {'ar': 'ando', 'er': 'iendo',
+                                      'ir': 'iendo'}}
+
+_FLAGS = {'': 0, '0': 0, 'false': 0, 'no': 0, 'n': 0,
+          '1': 1, 'true': 1, 'yes': 1, 'y': 1}
+
+# Only rows that actually differ are rewritten, so the change count
+# tells updated rows from unchanged ones.  A NULL is_irregular (?8) is
+# one the list doesn't give: 0 for a new verb, left alone for another
+_UPSERT = ('INSERT INTO verbs(language_id, verb, aux, past_participle, '
+           'present_participle, is_reflexive, is_aux, is_irregular) '
+           'VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, COALESCE(?8, 0)) '
+           'ON CONFLICT(language_id, verb) DO UPDATE SET '
+           'aux = excluded.aux, '
+           'past_participle = excluded.past_participle, '
+           'present_participle = excluded.present_participle, '
+           'is_reflexive = excluded.is_reflexive, '
+           'is_aux = excluded.is_aux, '
+           'is_irregular = COALESCE(?8, is_irregular) '
+           'WHERE (aux, past_participle, present_participle, is_reflexive, '
+           'is_aux, is_irregular) IS NOT (excluded.aux, '
+           'excluded.past_participle, excluded.present_participle, '
+           'excluded.is_reflexive, excluded.is_aux, '
+           'COALESCE(?8, is_irregular))')
+
+
+def _delimiter(first_line):
+    return '\t' if '\t' in first_line else ','
+
+
+def read_rows(lines, language, rejected=None, delimiter=None):
+    '''
+    Yields a tuple of COLUMNS values for every valid row of a verb
+    list, read from lines as it goes.  Rows whose verb doesn't end in
+    one of the language's verb types, or with too many columns or a
+    bad flag value, are passed over and, if given, handed to
+    rejected(Rejected) as they are read.  The delimiter is a tab if
+    the first line has one and a comma otherwise, unless given.
+    Raises ValueError for a header naming an unknown column
+    '''
+    module = _MODULES[language]
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    # a byte order mark left by a reader that didn't decode utf-8-sig
+    first = first.lstrip('\ufeff')
+    if delimiter is None:
+        delimiter = _delimiter(first)
+    reader = csv.reader(itertools.chain([first], lines),
+                        delimiter=delimiter)
+    columns = COLUMNS
+    for row in reader:
+        line = reader.line_num
+        if line == 1 and row and row[0].strip().lower() == 'verb':
+            columns = tuple(name.strip().lower() for name in row)
+            unknown = set(columns) - set(COLUMNS)
+            if unknown:
+                raise ValueError('unknown columns: {}'.format(
+                    ', '.join(sorted(unknown))))
+            continue
+        values = dict(zip(columns, (value.strip() for value in row)))
+        verb = values.get('verb', '')
+        if not verb or verb.startswith('#'):
+            continue
+        if len(row) > len(columns):
+            reason = 'too many columns'
+        elif verb[-2:] not in module.VERB_TYPES:
+            reason = 'not a regular infinitive'
+        else:
+            try:
+                yield _complete(language, module, values)
+                continue
+            except KeyError as e:
+                reason = 'bad flag {}'.format(e)
+        if rejected is not None:
+            rejected(Rejected(line, verb, reason))
+
+
+def _complete(language, module, values):
+    '''
+    One row's values with the missing ones filled in, but for an
+    is_irregular of None when the row has no such column
+    '''
+    verb = values['verb']
+    is_irregular = values.get('is_irregular')
+    return (verb,
+            values.get('aux') or _DEFAULT_AUX[language],
+            values.get('past_participle')
+            or module._construct_past_participle(verb),
+            values.get('present_participle')
+            or verb[:-2] + _PRESENT_PARTICIPLE_ENDINGS[language][verb[-2:]],
+            _FLAGS[values.get('is_reflexive', '').lower()],
+            _FLAGS[values.get('is_aux', '').lower()],
+            None if is_irregular is None else _FLAGS[is_irregular.lower()])
+
+
+def load(lines, language, rejected=None, batch_size=BATCH_SIZE,
+         db_path=None):
+    '''
+    Upserts the verb list read from lines into the verbs table of the
+    database at db_path (by default the current store's), batch_size
+    rows per transaction.  Rejected rows are counted, and handed to
+    rejected(Rejected) if given.  The journal is switched to WAL, and
+    syncing off, for the duration of the load, then both are put back
+    as they were.  Returns a LoadStats
+    '''
+    if db_path is None:
+        db_path = verb_store.get_store().path
+    rejects = exporter.SkipCount(rejected)
+    start = time.perf_counter()
+    con = sqlite3.connect(db_path)
+    try:
+        row = con.execute('SELECT language_id FROM languages '
+                          'WHERE language_name = ?',
+                          (LANGUAGE_NAMES[language],)).fetchone()
+        if row is None:
+            raise ValueError('no {} language in {}'.format(
+                LANGUAGE_NAMES[language], db_path))
+        language_id = row[0]
+        journal_mode = con.execute('PRAGMA journal_mode').fetchone()[0]
+        synchronous = con.execute('PRAGMA synchronous').fetchone()[0]
+        con.execute('PRAGMA journal_mode = WAL')
+        con.execute('PRAGMA synchronous = OFF')
+        try:
+            count = con.execute('SELECT COUNT(*) FROM verbs').fetchone()[0]
+            changes = con.total_changes
+            loaded = 0
+            rows = read_rows(lines, language, rejects)
+            while True:
+                batch = [(language_id,) + row
+                         for row in itertools.islice(rows, batch_size)]
+                if not batch:
+                    break
+                with con:
+                    con.executemany(_UPSERT, batch)
+                loaded += len(batch)
+            changes = con.total_changes - changes
+            inserted = (con.execute('SELECT COUNT(*) FROM verbs')
+                        .fetchone()[0] - count)
+        finally:
+            con.execute('PRAGMA synchronous = {:d}'.format(synchronous))
+            # a no-op if another connection still has the database open
+            con.execute('PRAGMA journal_mode = {}'.format(journal_mode))
+    finally:
+        con.close()
+    return LoadStats(inserted, changes - inserted, loaded - changes,
+                     rejects.count, time.perf_counter() - start)
+
+
+def load_file(path, language, rejected=None, batch_size=BATCH_SIZE,
+              db_path=None):
+    '''
+    Loads the verb list at path ('-' for stdin), which may start with
+    a byte order mark.  Returns a LoadStats
+    '''
+    infile = (sys.stdin if path == '-'
+              else open(path, encoding='utf-8-sig', newline=''))
+    try:
+        return load(infile, language, rejected, batch_size, db_path)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
@@ -0,0 +1,261 @@
+# Name:    verb_store.py
+# Purpose: single point of access to the verb_trainer database
+
+import os
+import sqlite3
+import threading
+import time
+import schema
+
+DEFAULT_DB_PATH = 'verb_trainer.db'
+
+# Environment variables that override the database location and
+# whether tense_endings is preloaded into memory ('1' or '0')
+DB_PATH_ENV = 'VERB_TRAINER_DB'
+PRELOAD_ENV = 'VERB_TRAINER_PRELOAD'
+
+# Minimum number of seconds between checks of the database file
+# for changes to the endings
+RELOAD_INTERVAL = 1.0
+
+# Parameterised queries - sqlite3 keeps a per-connection cache of
+# prepared statements keyed on the SQL text, so reusing these exact
+# strings on a long-lived connection skips re-preparing them
+_ENDINGS_QUERY = ("SELECT fps, sps, tps, fpp, spp, tpp FROM tense_endings "
+                  "WHERE verb_type = ? AND tense_id = "
+                  "(SELECT tense_id FROM tenses WHERE tense_name = ?)")
+
+_ALL_ENDINGS_QUERY = ("SELECT te.verb_type, t.tense_name, "
+                      "te.fps, te.sps, te.tps, te.fpp, te.spp, te.tpp "
+                      "FROM tense_endings te JOIN tenses t "
+                      "ON te.tense_id = t.tense_id")
+
+_TENSES_QUERY = ("SELECT tense_name FROM tenses WHERE language_id = "
+                 "(SELECT language_id FROM languages WHERE language_name = ?) "
+                 "ORDER BY tense_id")
+
+_IRREGULAR_QUERY = ("SELECT verb, tense_name, person, form "
+                    "FROM irregular_forms WHERE language_id = "
+                    "(SELECT language_id FROM languages WHERE language_name = ?)")
+
+
+class VerbStore:
+    '''
+    Owns one long-lived connection to the verb_trainer database
+    per process and thread and answers the lookups the conjugators
+    need.
+
+    With preload set, the whole tense_endings table is read once into
+    a dict keyed by (verb_type, tense_name) and reloaded whenever the
+    database file or its schema version changes.  The dict is never
+    modified once built, only replaced, so threads can read it
+    without locking
+    '''
+    def __init__(self, path=None, preload=None):
+        self.path = path or os.environ.get(DB_PATH_ENV, DEFAULT_DB_PATH)
+        if preload is None:
+            preload = os.environ.get(PRELOAD_ENV, '0') == '1'
+        self.preload = preload
+        # bumped every time the endings are (re)loaded so that callers
+        # holding derived data can tell when it has gone stale
+        self.generation = 0
+        self._local = threading.local()
+        # serialises reloads and change checks
+        self._lock = threading.RLock()
+        # connection used for reloads and change checks, only ever
+        # touched while holding _lock.  data_version counts commits
+        # seen by one connection, so it has to be the same one each time
+        self._monitor = None
+        self._monitor_pid = None
+        self._endings = None
+        self._signature = None
+        self._next_check = 0.0
+
+    @property
+    def connection(self):
+        '''
+        The calling thread's connection, opened on first use.  A forked
+        child gets its own rather than sharing the parent's file handle
+        '''
+        local = self._local
+        con = getattr(local, 'con', None)
+        if con is None or local.pid != os.getpid():
+            con = local.con = sqlite3.connect(self.path)
+            local.pid = os.getpid()
+        return con
+
+    def tense_endings(self, verb_type, tense):
+        '''
+        Returns the six person endings for a verb type and tense,
+        or None if the database has no such row
+        '''
+        if self.preload:
+            return self.endings_table().get((verb_type, tense))
+        return self.connection.execute(_ENDINGS_QUERY,
+                                       (verb_type, tense)).fetchone()
+
+    def endings_table(self):
+        '''
+        Returns every row of tense_endings as a dict keyed by
+        (verb_type, tense_name), loading or reloading it as needed
+        '''
+        endings = self._endings
+        if endings is None or time.monotonic() >= self._next_check:
+            with self._lock:
+                if self._endings is None:
+                    self.reload()
+                elif time.monotonic() >= self._next_check:
+                    self._next_check = time.monotonic() + RELOAD_INTERVAL
+                    if self._current_signature() != self._signature:
+                        self.reload()
+                endings = self._endings
+        return endings
+
+    def endings_version(self):
+        '''
+        Returns the current generation of the endings, first checking
+        (at most once per RELOAD_INTERVAL) whether the database has
+        changed since it was last looked at
+        '''
+        if self.preload:
+            self.endings_table()
+        elif time.monotonic() >= self._next_check:
+            with self._lock:
+                if time.monotonic() >= self._next_check:
+                    self._next_check = time.monotonic() + RELOAD_INTERVAL
+                    signature = self._current_signature()
+                    if signature != self._signature:
+                        if self._endings is not None:
+                            # keep endings_table() in step
+                            self.reload()
+                        else:
+                            self._signature = signature
+                            self.generation += 1
+        return self.generation
+
+    def reload(self):
+        '''
+        Unconditionally rereads tense_endings from the database
+        '''
+        with self._lock:
+            signature = self._current_signature()
+            rows = self._monitor_connection().execute(_ALL_ENDINGS_QUERY)
+            self._endings = {(row[0], row[1]): tuple(row[2:])
+                             for row in rows}
+            self._signature = signature
+            self._next_check = time.monotonic() + RELOAD_INTERVAL
+            self.generation += 1
+
+    def _current_signature(self):
+        '''
+        Identifies the current state of the database: file mtime and
+        size, SQLite's schema_version and the user_version pragma, and
+        data_version, which moves when another connection commits.
+        Call with _lock held
+        '''
+        try:
+            st = os.stat(self.path)
+            file_state = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            file_state = None
+        con = self._monitor_connection()
+        return (file_state,
+                con.execute('PRAGMA schema_version').fetchone()[0],
+                con.execute('PRAGMA user_version').fetchone()[0],
+                con.execute('PRAGMA data_version').fetchone()[0])
+
+    def _monitor_connection(self):
+        if self._monitor is None or self._monitor_pid != os.getpid():
+            self._monitor = sqlite3.connect(self.path,
+                                            check_same_thread=False)
+            self._monitor_pid = os.getpid()
+        return self._monitor
+
+    def tense_names(self, language):
+        '''
+        Returns the names of all tenses stored for a language
+        '''
+        rows = self.connection.execute(_TENSES_QUERY, (language,))
+        return [row[0] for row in rows]
+
+    def irregular_forms(self, language):
+        '''
+        Returns every (verb, tense_name, person, form) row of the
+        irregular forms stored for a language
+        '''
+        try:
+            return self.connection.execute(_IRREGULAR_QUERY,
+                                           (language,)).fetchall()
+        except sqlite3.OperationalError as e:
+            # a database from before the irregular_forms migration
+            if 'no such table' not in str(e):
+                raise
+            return []
+
+    def close(self):
+        '''
+        Closes the calling thread's connection.  Other threads'
+        connections are dropped and closed when they are collected
+        '''
+        local = self._local
+        if getattr(local, 'con', None) is not None \
+                and local.pid == os.getpid():
+            local.con.close()
+        with self._lock:
+            if self._monitor is not None \
+                    and self._monitor_pid == os.getpid():
+                self._monitor.close()
+            self._monitor = None
+        self._local = threading.local()
+        self._endings = None
+        self._signature = None
+
+
+_store = None
+
+# a store set by use_store() for one thread, e.g. a server's workers
+_thread = threading.local()
+
+
+def get_store():
+    '''
+    Returns the calling thread's VerbStore if use_store() gave it one,
+    and otherwise the process-wide VerbStore, creating it on first use
+    '''
+    global _store
+    store = getattr(_thread, 'store', None)
+    if store is not None:
+        return store
+    if _store is None:
+        _store = VerbStore()
+    return _store
+
+
+def use_store(store):
+    '''
+    Makes store the calling thread's VerbStore in place of the
+    process-wide one, or with None goes back to the process-wide one
+    '''
+    _thread.store = store
+
+
+def configure(path=None, preload=None):
+    '''
+    Replaces the process-wide VerbStore with one pointing at path
+    (or the default location when path is None)
+    '''
+    global _store
+    if _store is not None:
+        _store.close()
+    _store = VerbStore(path, preload)
+    return _store
+
+
+def create_database(path):
+    '''
+    Creates a fresh database at path, replacing any database already
+    there, with every schema migration applied
+    '''
+    if os.path.exists(path):
+        os.remove(path)
+    schema.migrate(path)